@@ -0,0 +1,79 @@
+"""
+API throughput with access logging off and on.
+
+Hammers GET /api/health from concurrent clients, once with the access
+log disabled and once with every request logged, and reports requests
+per second and latency percentiles for each.
+
+Usage:
+    python -m benchmarks.accesslog [--workers 2] [--clients 8] [--duration 5]
+"""
+# Batteries
+import argparse
+import threading
+import time
+
+# Local Imports
+from .server import PingServer, percentile
+
+
+def hammer(server, deadline, samples):
+    """
+    Requests the liveness check until the deadline.
+
+    Args:
+        server (PingServer): The instance.
+        deadline (float): The monotonic time to stop at.
+        samples (list): The latencies in milliseconds, appended to.
+    """
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        status, _ = server.request('GET', '/api/health')
+        samples.append((time.perf_counter() - start) * 1000)
+        assert status == 200, status
+
+
+def measure(enabled, workers, clients, duration):
+    """
+    Measures the request throughput of an instance.
+
+    Args:
+        enabled (bool): Whether to log every request.
+        workers (int): The number of API workers.
+        clients (int): The number of concurrent clients.
+        duration (float): Seconds to request for.
+
+    Returns:
+        list: The request latencies in milliseconds.
+    """
+    config = {'api': {'workers': workers}, 'log': {'access': {'enabled': enabled}}}
+
+    with PingServer(**config) as server:
+        samples, deadline = [], time.monotonic() + duration
+        threads = [threading.Thread(target=hammer, args=(server, deadline, samples)) for _ in range(clients)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f'{"access log":<10} {"requests":>9} {"req/s":>9} {"p50":>10} {"p99":>10}')
+    for name, enabled in (('off', False), ('on', True)):
+        samples = measure(enabled, args.workers, args.clients, args.duration)
+        print(
+            f'{name:<10} {len(samples):>9} {len(samples) / args.duration:9.1f} '
+            f'{percentile(samples, 0.5):7.2f} ms {percentile(samples, 0.99):7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Capacity report cost with GROUP BY scans against summary tables.
+
+Seeds hosts spread over types, accounts and cabinets, with guests
+running on the racked hosts, and builds the summaries. Then times the
+report of each dimension computed with GROUP BY over the host table
+and read from the summaries, checking both agree. Also times what-if
+projections of proposed hosts with and without NumPy.
+
+Usage:
+    python -m benchmarks.capacity [--hosts 200000] [--proposed 100000] [--repeat 5]
+"""
+# Batteries
+import argparse
+import os
+import random
+import tempfile
+import time
+
+# Third-party Imports
+import sqlalchemy
+import sqlalchemy.orm
+
+# Local Imports
+from shared import capacity
+from shared.models import Base
+
+# Accounts and cabinets the hosts are spread over, and hosts per cabinet
+ACCOUNTS, CABINETS, RACK = 1000, 500, 40
+
+
+def seed(connection, hosts):
+    """
+    Inserts hosts, racks one in every three and runs the next two on it.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+        hosts (int): The number of hosts.
+    """
+    rows = {
+        'INSERT INTO host (id, type, hostname, cpucores, ram, disk_size, account_id) VALUES (?, ?, ?, ?, ?, ?, ?)': [
+            (index, ('bm', 'vm', 'ct')[index % 3], f'host{index:07d}', random.randint(1, 64),
+             random.randint(1, 512), random.randint(1, 4096), random.randint(1, ACCOUNTS) if index % 5 else None)
+            for index in range(hosts)],
+        'INSERT INTO cabinet (id, name, height) VALUES (?, ?, ?)': [
+            (index, f'rack{index}', 42) for index in range(1, CABINETS + 1)],
+        'INSERT INTO host_cabinet (cabinet_id, host_id) VALUES (?, ?)': [
+            (index // 3 % CABINETS + 1, index) for index in range(0, hosts, 3)],
+        'INSERT INTO contentorized_hosts (bm_id, virt_id) VALUES (?, ?)': [
+            (index - index % 3, index) for index in range(hosts) if index % 3],
+    }
+
+    for statement, values in rows.items():
+        connection.connection.executemany(statement, values)
+
+
+def measure(function, repeat):
+    """
+    Times a function.
+
+    Args:
+        function (callable): The function.
+        repeat (int): The number of calls.
+
+    Returns:
+        tuple: The mean milliseconds per call and the last result.
+    """
+    start = time.perf_counter()
+
+    for _ in range(repeat):
+        result = function()
+
+    return (time.perf_counter() - start) * 1000 / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hosts', type=int, default=200000)
+    parser.add_argument('--proposed', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='ping-') as directory:
+        engine = sqlalchemy.create_engine(f'sqlite:///{os.path.join(directory, "ping.sqlite")}')
+        Base.metadata.create_all(engine)
+
+        with engine.begin() as connection:
+            seed(connection, args.hosts)
+            capacity.rebuild(connection)
+
+        session = sqlalchemy.orm.sessionmaker(bind=engine)()
+
+        print(f'{args.hosts} hosts')
+        print(f'{"dimension":<10} {"group by":>11} {"summaries":>11} {"speedup":>8} {"rows":>6}')
+        for dimension in capacity.DIMENSIONS:
+            scanned, expected = measure(lambda: capacity.aggregate(session, dimension), args.repeat)
+            summarized, current = measure(lambda: capacity.totals(session, dimension), args.repeat)
+
+            assert current == expected, f'the {dimension} summaries differ from GROUP BY'
+            print(f'{dimension:<10} {scanned:8.2f} ms {summarized:8.2f} ms {scanned / summarized:7.1f}x {len(current):>6}')
+
+        session.close()
+        engine.dispose()
+
+    # What-if projections of proposed hosts
+    records = [
+        {'type': ('bm', 'vm', 'ct')[index % 3], 'cpucores': random.randint(1, 64), 'ram': random.randint(1, 512),
+         'disk_size': random.randint(1, 4096), 'account_id': random.randint(1, ACCOUNTS),
+         'cabinet_id': random.randint(1, CABINETS)}
+        for index in range(args.proposed)]
+
+    print(f'{args.proposed} proposed hosts, numpy {"installed" if capacity.numpy is not None else "not installed"}')
+    print(f'{"dimension":<10} {"python":>11} {"numpy":>11} {"speedup":>8}')
+
+    numpy = capacity.numpy
+    for dimension in capacity.DIMENSIONS:
+        try:
+            capacity.numpy = None
+            plain, expected = measure(lambda: capacity.project(records, dimension), args.repeat)
+        finally:
+            capacity.numpy = numpy
+
+        if numpy is None:
+            print(f'{dimension:<10} {plain:8.2f} ms')
+            continue
+
+        vectorized, projected = measure(lambda: capacity.project(records, dimension), args.repeat)
+
+        assert projected == expected, f'the {dimension} projections differ'
+        print(f'{dimension:<10} {plain:8.2f} ms {vectorized:8.2f} ms {plain / vectorized:7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
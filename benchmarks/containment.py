@@ -0,0 +1,225 @@
+"""
+Host containment lookups on deep and wide trees.
+
+Links a deep chain of nested hosts and a wide tree of virtual machines
+running containers through the closure table maintenance, checks the
+closure against a full rebuild, then times descendant and ancestor
+lookups read from the closure table against walking the containment
+links, with a recursive CTE and with one query per level, as lookups
+did before the closure table.
+
+Usage:
+    python -m benchmarks.containment [--depth 30] [--vms 200] [--containers 10] [--repeat 20]
+"""
+# Batteries
+import argparse
+import contextlib
+import os
+import random
+import tempfile
+import time
+
+# Third-party Imports
+import sqlalchemy
+import sqlalchemy.orm
+
+# Local Imports
+from shared import containment
+from shared.models import Base, ContentorizedHosts, HostClosure
+
+# Links per import batch
+BATCH_SIZE = 1000
+
+
+def trees(depth, vms, containers):
+    """
+    Builds the benchmarked trees.
+
+    Args:
+        depth (int): The number of nested hosts below the root of the chain.
+        vms (int): The virtual machines on the root of the wide tree.
+        containers (int): The containers in each virtual machine.
+
+    Returns:
+        dict: The (root, deepest host, links) of each tree, by name.
+    """
+    chain = [(host, host + 1) for host in range(1, depth + 1)]
+
+    root = depth + 2
+    machines = range(root + 1, root + 1 + vms)
+    wide = [(root, vm) for vm in machines]
+    wide += [(vm, root + vms + 1 + index * containers + slot) for index, vm in enumerate(machines)
+             for slot in range(containers)]
+
+    return {
+        f'chain of {depth}': (1, depth + 1, chain),
+        f'{vms} vms x {containers} containers': (root, wide[-1][1], wide),
+    }
+
+
+def load(session, links):
+    """
+    Links hosts in batches and commits them.
+
+    Args:
+        session (sqlalchemy.orm.Session): The database session.
+        links (list): The (host id, guest id) links.
+
+    Returns:
+        list: No reached hosts.
+    """
+    for start in range(0, len(links), BATCH_SIZE):
+        containment.link(session, links[start:start + BATCH_SIZE])
+
+    session.commit()
+
+    return []
+
+
+def walk(session, host_id, up, cte):
+    """
+    Walks the containment links from a host, the lookup the closure
+    table replaced.
+
+    Args:
+        session (sqlalchemy.orm.Session): The database session.
+        host_id (int): The host id.
+        up (bool): Walk to the hosts it runs on instead of its guests.
+        cte (bool): Walk with a recursive CTE instead of one query per level.
+
+    Returns:
+        list: The (host id, depth) of each reached host.
+    """
+    links = ContentorizedHosts.__table__
+    source, target = ('virt_id', 'bm_id') if up else ('bm_id', 'virt_id')
+
+    if cte:
+        tree = sqlalchemy.select([links.c[target].label('id'), sqlalchemy.literal(1).label('depth')]).where(
+            links.c[source] == host_id).cte('tree', recursive=True)
+
+        step = links.alias()
+        tree = tree.union_all(
+            sqlalchemy.select([step.c[target], tree.c.depth + 1])
+            .where(step.c[source] == tree.c.id)
+            .where(tree.c.depth < containment.MAX_DEPTH))
+
+        return [tuple(row) for row in session.execute(sqlalchemy.select([tree.c.id, tree.c.depth]))]
+
+    reached, level, depth = [], [host_id], 0
+    while level and depth < containment.MAX_DEPTH:
+        depth += 1
+        level = [row[0] for row in session.execute(
+            sqlalchemy.select([links.c[target]]).where(links.c[source].in_(level)))]
+        reached.extend((host, depth) for host in level)
+
+    return reached
+
+
+@contextlib.contextmanager
+def levels():
+    """
+    Makes closure rebuilds issue one query per level.
+    """
+    recursive = containment.recursive
+    containment.recursive = lambda bind: False
+
+    try:
+        yield
+    finally:
+        containment.recursive = recursive
+
+
+def measure(engine, function, repeat):
+    """
+    Counts the statements issued and times a lookup.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The database engine.
+        function (callable): Called with a session, returns the reached hosts.
+        repeat (int): The number of lookups.
+
+    Returns:
+        tuple: The statements per lookup, the mean milliseconds and the reached hosts.
+    """
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    session = sqlalchemy.orm.sessionmaker(bind=engine)()
+    sqlalchemy.event.listen(engine, 'before_cursor_execute', count)
+    start = time.perf_counter()
+
+    try:
+        for _ in range(repeat):
+            reached = function(session)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000 / repeat
+        sqlalchemy.event.remove(engine, 'before_cursor_execute', count)
+        session.close()
+
+    return len(statements) // repeat, elapsed, sorted(reached)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--depth', type=int, default=30)
+    parser.add_argument('--vms', type=int, default=200)
+    parser.add_argument('--containers', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.depth >= containment.MAX_DEPTH:
+        parser.error(f'walks stop at {containment.MAX_DEPTH} levels')
+
+    with tempfile.TemporaryDirectory(prefix='ping-') as directory:
+        engine = sqlalchemy.create_engine(f'sqlite:///{os.path.join(directory, "ping.sqlite")}')
+        Base.metadata.create_all(engine)
+        Session = sqlalchemy.orm.sessionmaker(bind=engine)
+
+        benchmarked = trees(args.depth, args.vms, args.containers)
+        links = [pair for _, _, pairs in benchmarked.values() for pair in pairs]
+        hosts = max(host for pair in links for host in pair)
+
+        with engine.begin() as connection:
+            connection.connection.executemany(
+                'INSERT INTO host (id, type) VALUES (?, ?)', [(host, 'vm') for host in range(1, hosts + 1)])
+
+        # Link in shuffled batches, as imports would, parents in any order
+        random.shuffle(links)
+        statements, elapsed, _ = measure(engine, lambda session: load(session, links), 1)
+        print(f'inserted {len(links)} links in {elapsed:.0f} ms with {statements} statements')
+
+        # The incrementally maintained closure matches a full rebuild
+        with engine.connect() as connection:
+            incremental = sorted(tuple(row) for row in connection.execute(HostClosure.__table__.select()))
+
+            for name, context in (('recursive cte', contextlib.nullcontext()), ('per level', levels())):
+                with context, connection.begin():
+                    containment.rebuild(connection)
+                    rebuilt = sorted(tuple(row) for row in connection.execute(HostClosure.__table__.select()))
+                assert rebuilt == incremental, f'the closure differs from a {name} rebuild'
+
+        print(f'{"tree":<26} {"lookup":<12} {"method":<14} {"statements":>10} {"time":>11} {"hosts":>6}')
+        for name, (root, deepest, _) in benchmarked.items():
+            for lookup, host, up in (('descendants', root, False), ('ancestors', deepest, True)):
+                closure = containment.ancestors if up else containment.descendants
+                methods = (
+                    ('recursive cte', lambda session: walk(session, host, up, True)),
+                    ('per level', lambda session: walk(session, host, up, False)),
+                    ('closure', lambda session: [tuple(row) for row in closure(session, host)]),
+                )
+
+                results = []
+                for method, function in methods:
+                    statements, elapsed, reached = measure(engine, function, args.repeat)
+                    results.append(reached)
+                    print(f'{name:<26} {lookup:<12} {method:<14} {statements:>10} {elapsed:8.2f} ms {len(reached):>6}')
+
+                assert results[0] == results[1] == results[2], f'{lookup} of {name} differ between methods'
+
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
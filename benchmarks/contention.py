@@ -0,0 +1,83 @@
+"""
+Host creation throughput with several API workers writing to SQLite.
+
+Creates hosts from concurrent clients, for an increasing number of API
+workers, once with the tuned SQLite profile (WAL, synchronous=NORMAL, a
+busy timeout and memory mapped I/O) and once with SQLite's defaults
+(rollback journal, synchronous=FULL and no busy timeout).
+
+Usage:
+    python -m benchmarks.contention [--workers 2 4 8] [--duration 5]
+"""
+# Batteries
+import argparse
+import threading
+import time
+
+# Local Imports
+from .server import PingServer
+
+# SQLite connection profiles
+PROFILES = {
+    'default': {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 0, 'mmap_size': 0},
+    'tuned': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 5000, 'mmap_size': 268435456},
+}
+
+
+def write(server, deadline, statuses):
+    """
+    Creates hosts until the deadline.
+
+    Args:
+        server (PingServer): The instance.
+        deadline (float): The monotonic time to stop at.
+        statuses (list): The response statuses, appended to.
+    """
+    while time.monotonic() < deadline:
+        statuses.append(server.request('POST', '/api/hosts', {'type': 'bm'})[0])
+
+
+def measure(profile, workers, clients, duration):
+    """
+    Measures the host creation throughput of an instance.
+
+    Args:
+        profile (dict): The SQLite connection profile.
+        workers (int): The number of API workers.
+        clients (int): The number of concurrent clients.
+        duration (float): Seconds to write for.
+
+    Returns:
+        tuple: The created hosts per second and the failed requests.
+    """
+    config = {'api': {'workers': workers}, 'datastore': {'sqlite': profile}, 'cache': {'enabled': False}}
+
+    with PingServer(**config) as server:
+        statuses, deadline = [], time.monotonic() + duration
+        threads = [threading.Thread(target=write, args=(server, deadline, statuses)) for _ in range(clients)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    created = sum(1 for status in statuses if 200 <= status < 300)
+
+    return created / duration, len(statuses) - created
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--duration', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f'{"profile":<8} {"workers":>7} {"clients":>7} {"hosts/s":>9} {"failed":>7}')
+    for workers in args.workers:
+        for name, profile in PROFILES.items():
+            rate, failed = measure(profile, workers, workers * 2, args.duration)
+            print(f'{name:<8} {workers:>7} {workers * 2:>7} {rate:9.1f} {failed:>7}')
+
+
+if __name__ == '__main__':
+    main()
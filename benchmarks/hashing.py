@@ -0,0 +1,120 @@
+"""
+Liveness latency during a burst of account creations.
+
+Starts an instance with the shipped API workers and hashing slots, sends
+a burst of concurrent signups while polling /api/health, and reports the
+health check latency percentiles and maximum next to an idle baseline.
+Signups beyond the hashing slots must be refused with 503 instead of
+occupying more workers.
+
+Usage:
+    python -m benchmarks.hashing [--workers 2] [--slots 1] [--burst 8]
+"""
+# Batteries
+import argparse
+import threading
+import time
+
+# Local Imports
+from .server import PingServer, percentile
+
+
+def poll(server, samples, stop):
+    """
+    Polls the liveness check, recording latencies in milliseconds.
+
+    Args:
+        server (PingServer): The instance.
+        samples (list): The latencies, appended to.
+        stop (threading.Event): Set to stop polling.
+    """
+    while not stop.is_set():
+        start = time.perf_counter()
+        status, _ = server.request('GET', '/api/health')
+        samples.append((time.perf_counter() - start) * 1000)
+        assert status == 200, status
+
+
+def signup(server, index, statuses):
+    """
+    Creates an account.
+
+    Args:
+        server (PingServer): The instance.
+        index (int): The account number.
+        statuses (list): The response statuses, appended to.
+    """
+    status, _ = server.request(
+        'POST', '/api/accounts', {'name': f'account{index}', 'username': f'user{index}', 'password': 'secret'}, timeout=60)
+    statuses.append(status)
+
+
+def measure(server, burst, duration):
+    """
+    Measures the liveness latency, optionally during a signup burst.
+
+    Args:
+        server (PingServer): The instance.
+        burst (range): The account numbers to create at once.
+        duration (float): Minimum seconds to poll.
+
+    Returns:
+        tuple: The latencies and the signup statuses.
+    """
+    samples, statuses, stop = [], [], threading.Event()
+    poller = threading.Thread(target=poll, args=(server, samples, stop))
+    poller.start()
+
+    signups = [threading.Thread(target=signup, args=(server, index, statuses)) for index in burst]
+    for thread in signups:
+        thread.start()
+
+    time.sleep(duration)
+    for thread in signups:
+        thread.join()
+
+    stop.set()
+    poller.join()
+
+    return samples, statuses
+
+
+def report(name, samples):
+    """
+    Prints latency percentiles.
+
+    Args:
+        name (str): The measurement name.
+        samples (list): The latencies in milliseconds.
+    """
+    print(
+        f'{name:<8} health checks: {len(samples):>5}  p50 {percentile(samples, 0.5):7.2f} ms  '
+        f'p99 {percentile(samples, 0.99):7.2f} ms  max {max(samples):7.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--slots', type=int, default=1)
+    parser.add_argument('--burst', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=200000)
+    args = parser.parse_args()
+
+    config = {'api': {'workers': args.workers}, 'hashing': {'pending': args.slots, 'rounds': args.rounds}}
+
+    with PingServer(**config) as server:
+        idle, _ = measure(server, range(0), 2)
+        busy, statuses = measure(server, range(args.burst), 2)
+
+    report('idle', idle)
+    report('burst', busy)
+
+    created, refused = statuses.count(201), statuses.count(503)
+    print(f'signups: {created} created, {refused} refused with 503, {len(statuses) - created - refused} other')
+
+    assert created + refused == args.burst, statuses
+    assert refused or args.burst <= args.slots, 'a burst beyond the hashing slots was not refused'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Lookup query latency without and with the hot lookup column indexes.
+
+Seeds a SQLite database with the latest schema, drops the indexes added
+by migration 1 and times the lookups the API makes, then applies the
+migration to the live database and times them again.
+
+Usage:
+    python -m benchmarks.indexes [--hosts 200000] [--lookups 200]
+"""
+# Batteries
+import argparse
+import os
+import random
+import tempfile
+import time
+
+# Third-party Imports
+import sqlalchemy
+
+# Local Imports
+from shared import ipam, migrations
+from shared.models import Base, ContentorizedHosts, Host, HostCabinet, IpAddress, User
+
+# Indexes created by the lookup indexes migration
+INDEXES = (
+    'ix_host_hostname', 'ix_host_type', 'ix_ipaddress_host_id', 'ix_ipaddress_range_id', 'ix_user_account_id',
+    'ix_host_cabinet_host_id', 'ix_contentorized_hosts_virt_id')
+
+# Hosts per cabinet, and guests per physical host
+RACK, GUESTS = 40, 2
+
+
+def seed(connection, hosts):
+    """
+    Inserts hosts, one address each, racks the physical hosts and runs
+    the guests on them.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+        hosts (int): The number of hosts.
+    """
+    first = ipam.toint('10.0.0.0')
+    physical = range(1, hosts + 1, GUESTS + 1)
+
+    rows = {
+        'host': [
+            (index, 'bm' if (index - 1) % (GUESTS + 1) == 0 else 'vm', f'host{index:07d}.example.com', 8, 64, 512)
+            for index in range(1, hosts + 1)],
+        'ipaddress': [
+            (str(ipam.fromint(first + index, 4)), ipam.pack(first + index), index % 100 + 1, index)
+            for index in range(1, hosts + 1)],
+        'host_cabinet': [(index // RACK + 1, index) for index in physical],
+        'contentorized_hosts': [
+            (index, guest) for index in physical for guest in range(index + 1, min(index + GUESTS + 1, hosts + 1))],
+        'user': [(index, index % 1000 + 1, f'user{index}', '') for index in range(1, hosts // 10 + 1)],
+    }
+
+    statements = {
+        'host': 'INSERT INTO host (id, type, hostname, cpucores, ram, disk_size) VALUES (?, ?, ?, ?, ?, ?)',
+        'ipaddress': 'INSERT INTO ipaddress (address, packed, range_id, host_id) VALUES (?, ?, ?, ?)',
+        'host_cabinet': 'INSERT INTO host_cabinet (cabinet_id, host_id) VALUES (?, ?)',
+        'contentorized_hosts': 'INSERT INTO contentorized_hosts (bm_id, virt_id) VALUES (?, ?)',
+        'user': 'INSERT INTO user (id, account_id, username, password) VALUES (?, ?, ?, ?)',
+    }
+
+    for table, statement in statements.items():
+        connection.connection.executemany(statement, rows[table])
+
+
+def lookups(hosts):
+    """
+    Builds the timed lookups, as made by the API.
+
+    Args:
+        hosts (int): The number of seeded hosts.
+
+    Returns:
+        dict: Functions building a query from a random key, by name.
+    """
+    return {
+        'host by hostname': lambda key: sqlalchemy.select([Host.id]).where(
+            Host.hostname == f'host{key:07d}.example.com'),
+        'hosts by type': lambda key: sqlalchemy.select([Host.id]).where(
+            Host.type == 'bm').where(Host.id > key).order_by(Host.id).limit(100),
+        'addresses by host': lambda key: sqlalchemy.select([IpAddress.address]).where(IpAddress.host_id == key),
+        'addresses by range': lambda key: sqlalchemy.select([IpAddress.address]).where(
+            IpAddress.range_id == key % 100 + 1).limit(100),
+        'cabinet by host': lambda key: sqlalchemy.select([HostCabinet.cabinet_id]).where(HostCabinet.host_id == key),
+        'parent by guest': lambda key: sqlalchemy.select([ContentorizedHosts.bm_id]).where(
+            ContentorizedHosts.virt_id == key),
+        'users by account': lambda key: sqlalchemy.select([User.id]).where(User.account_id == key % 1000 + 1),
+    }
+
+
+def measure(connection, queries, keys):
+    """
+    Times each lookup over the same keys.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+        queries (dict): The lookups, by name.
+        keys (list): The random keys.
+
+    Returns:
+        dict: The mean latency in milliseconds, by lookup name.
+    """
+    results = {}
+
+    for name, query in queries.items():
+        start = time.perf_counter()
+
+        for key in keys:
+            connection.execute(query(key)).fetchall()
+
+        results[name] = (time.perf_counter() - start) * 1000 / len(keys)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hosts', type=int, default=200000)
+    parser.add_argument('--lookups', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='ping-') as directory:
+        engine = sqlalchemy.create_engine(f'sqlite:///{os.path.join(directory, "ping.sqlite")}')
+
+        Base.metadata.create_all(engine)
+        migrations.stamp(engine)
+
+        with engine.begin() as connection:
+            seed(connection, args.hosts)
+
+            for index in INDEXES:
+                connection.execute(f'DROP INDEX {index}')
+
+        queries = lookups(args.hosts)
+        keys = [random.randint(1, args.hosts) for _ in range(args.lookups)]
+
+        with engine.connect() as connection:
+            connection.execute('ANALYZE')
+            before = measure(connection, queries, keys)
+
+        # Apply the migration to the live database
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            dict((version, function) for version, _, function in migrations.MIGRATIONS)[1](connection)
+            connection.execute('ANALYZE')
+        print(f'applied the lookup indexes migration to {args.hosts} hosts in {time.perf_counter() - start:.2f}s')
+
+        with engine.connect() as connection:
+            after = measure(connection, queries, keys)
+
+        engine.dispose()
+
+    print(f'{"lookup":<20} {"without":>12} {"with":>12} {"speedup":>9}')
+    for name in queries:
+        print(f'{name:<20} {before[name]:9.3f} ms {after[name]:9.3f} ms {before[name] / after[name]:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
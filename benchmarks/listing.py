@@ -0,0 +1,157 @@
+"""
+API worker memory while streaming a large host listing.
+
+Seeds the hosts, then streams GET /api/hosts as a JSON document and as
+NDJSON, sampling the resident set size of the API workers while the
+response is read. Streaming holds one batch at a time, so the workers
+anonymous RSS must stay flat however many hosts are listed. Pages of the
+SQLite memory map are reported apart, they belong to the page cache.
+
+Usage:
+    python -m benchmarks.listing [--hosts 500000] [--limit 20480]
+"""
+# Batteries
+import argparse
+import http.client
+import threading
+import time
+
+# Local Imports
+from .server import PingServer, rss
+
+
+def seed(hosts):
+    """
+    Builds a seeding function inserting hosts.
+
+    Args:
+        hosts (int): The number of hosts.
+
+    Returns:
+        function: The seeding function.
+    """
+    def insert(engine):
+        rows = (
+            (index, ('bm', 'vm', 'ct')[index % 3], f'host{index:07d}.example.com', index % 64, index % 512, index % 4096)
+            for index in range(1, hosts + 1))
+
+        with engine.begin() as connection:
+            connection.connection.executemany(
+                'INSERT INTO host (id, type, hostname, cpucores, ram, disk_size) VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    return insert
+
+
+def stream(server, path):
+    """
+    Reads a streamed response, counting its bytes and lines.
+
+    Args:
+        server (PingServer): The instance.
+        path (str): The request path.
+
+    Returns:
+        tuple: The response status, size in bytes, lines and seconds taken.
+    """
+    connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=600)
+    start = time.perf_counter()
+
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        size, lines = 0, 0
+
+        while True:
+            chunk = response.read(65536)
+            if not chunk:
+                break
+            size += len(chunk)
+            lines += chunk.count(b'\n')
+
+        return response.status, size, lines, time.perf_counter() - start
+
+    finally:
+        connection.close()
+
+
+def total(workers, field):
+    """
+    Sums a resident set size field over the API workers.
+
+    Args:
+        workers (list): The API worker pids.
+        field (str): The /proc status field.
+
+    Returns:
+        int: The size in KiB.
+    """
+    return sum(rss(worker, field) for worker in workers)
+
+
+def measure(server, workers, path):
+    """
+    Streams a listing while sampling the workers RSS.
+
+    Args:
+        server (PingServer): The instance.
+        workers (list): The API worker pids.
+        path (str): The request path.
+
+    Returns:
+        tuple: The stream results and the RSS samples in KiB.
+    """
+    samples, stop = [], threading.Event()
+
+    def sample():
+        while not stop.is_set():
+            samples.append((total(workers, 'RssAnon'), total(workers, 'RssFile')))
+            time.sleep(0.05)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+
+    try:
+        result = stream(server, path)
+    finally:
+        stop.set()
+        sampler.join()
+
+    return result, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hosts', type=int, default=500000)
+    parser.add_argument('--limit', type=int, default=20480, help='Largest allowed RSS growth, in KiB.')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with PingServer(seed=seed(args.hosts), cache={'enabled': False}) as server:
+        print(f'seeded {args.hosts} hosts in {time.perf_counter() - start:.1f}s')
+
+        workers = server.workers()
+
+        # Warm the workers up with small pages, the idle ones stay flat
+        for _ in range(4 * len(workers)):
+            stream(server, '/api/hosts?limit=100')
+            stream(server, '/api/hosts?limit=100&format=ndjson')
+
+        baseline = total(workers, 'RssAnon')
+        print(f'workers anonymous rss after warm up: {baseline} KiB')
+
+        for name, path in (('json', '/api/hosts'), ('ndjson', '/api/hosts?format=ndjson')):
+            (status, size, lines, seconds), samples = measure(server, workers, path)
+            peak = max(anonymous for anonymous, _ in samples + [(total(workers, 'RssAnon'), 0)])
+            mapped = max((mapped for _, mapped in samples), default=0)
+
+            print(
+                f'{name:<7} status {status}  {size / 2 ** 20:7.1f} MiB  {lines:>7} lines  {seconds:6.2f}s  '
+                f'{args.hosts / seconds:9.0f} hosts/s  anonymous rss peak {peak} KiB (+{peak - baseline} KiB)  '
+                f'file rss peak {mapped} KiB')
+
+            assert status == 200, status
+            assert peak - baseline <= args.limit, f'workers rss grew by {peak - baseline} KiB'
+
+
+if __name__ == '__main__':
+    main()
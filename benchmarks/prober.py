@@ -0,0 +1,103 @@
+"""
+Reachability sweep throughput on loopback addresses.
+
+Sweeps addresses of 127.0.0.0/8, which all answer locally, once with
+ICMP echo when the process may open ICMP sockets, and once with TCP
+connections to a local responder, for several concurrency limits.
+
+Usage:
+    python -m benchmarks.prober [--addresses 5000] [--concurrency 64 256 1024]
+"""
+# Batteries
+import argparse
+import asyncio
+import ipaddress
+import time
+
+# Local Imports
+from modules.prober.engine import ProbeEngine
+
+# Engine settings: rate, timeout, smallest and largest timeout, and retries
+SETTINGS = (10, 1.0, 0.05, 2.0, 1)
+
+
+async def accept(reader, writer):
+    """
+    Closes an accepted connection.
+
+    Args:
+        reader (asyncio.StreamReader): The connection reader.
+        writer (asyncio.StreamWriter): The connection writer.
+    """
+    writer.close()
+
+
+async def measure(addresses, concurrency, ports, icmp):
+    """
+    Sweeps addresses with a new engine.
+
+    Args:
+        addresses (list): The IP addresses.
+        concurrency (int): The maximum number of addresses probed at once.
+        ports (list): The TCP ports.
+        icmp (bool): Whether to probe with ICMP.
+
+    Returns:
+        tuple: The seconds taken, the addresses found up and the probe methods used.
+    """
+    engine = ProbeEngine(concurrency, *SETTINGS, ports, icmp)
+    engine.open()
+
+    try:
+        start = time.perf_counter()
+        results = await engine.sweep(addresses)
+        elapsed = time.perf_counter() - start
+    finally:
+        engine.close()
+
+    return elapsed, sum(1 for rtt, _ in results.values() if rtt is not None), {method for _, method in results.values()}
+
+
+async def run(args):
+    """
+    Runs the sweeps and prints their throughput.
+
+    Args:
+        args (argparse.Namespace): The command line arguments.
+    """
+    network = ipaddress.ip_network('127.1.0.0/16')
+    addresses = [str(address) for _, address in zip(range(args.addresses), network.hosts())]
+
+    # Loopback routes the whole network, the responder answers on every address
+    server = await asyncio.start_server(accept, '0.0.0.0', 0, backlog=4096)
+    port = server.sockets[0].getsockname()[1]
+
+    print(f'{"method":<6} {"concurrency":>11} {"addresses":>9} {"up":>6} {"time":>8} {"probes/s":>9}')
+
+    try:
+        for name, ports, icmp in (('icmp', [], True), ('tcp', [port], False)):
+            for concurrency in args.concurrency:
+                elapsed, up, methods = await measure(addresses, concurrency, ports, icmp)
+
+                if name not in methods:
+                    print(f'{name:<6} unavailable')
+                    break
+
+                print(f'{name:<6} {concurrency:>11} {len(addresses):>9} {up:>6} {elapsed:7.2f}s {len(addresses) / elapsed:9.0f}')
+
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--addresses', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[64, 256, 1024])
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
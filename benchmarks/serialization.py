@@ -0,0 +1,118 @@
+"""
+Host listing serialization cost for large payloads.
+
+Loads the hosts from SQLite and encodes them as a JSON array, either
+the way controllers used to, building ORM instances and encoding with
+the standard library as Falcon's default media handler does, or the
+way they do now, encoding query column tuples with the fastest
+available encoder. Each available encoder is timed on the same rows.
+
+Usage:
+    python -m benchmarks.serialization [--hosts 10000] [--repeat 20]
+"""
+# Batteries
+import argparse
+import json
+import time
+
+# Third-party Imports
+import sqlalchemy
+import sqlalchemy.orm
+
+# Local Imports
+from shared import serialization
+from shared.models import Base, Host
+
+# Columns of the host listing, as selected by HostController
+COLUMNS = (Host.id, Host.type, Host.hostname, Host.cpucores, Host.ram, Host.disk_size, Host.account_id)
+
+# Encoders to compare, by module name, with their arguments
+ENCODERS = {
+    'json': lambda module: lambda obj: module.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode(),
+    'ujson': lambda module: lambda obj: module.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode(),
+    'orjson': lambda module: module.dumps,
+}
+
+
+def seed(session, hosts):
+    """
+    Inserts hosts.
+
+    Args:
+        session (sqlalchemy.orm.Session): The database session.
+        hosts (int): The number of hosts.
+    """
+    session.execute(Host.__table__.insert(), [
+        {'id': index, 'type': ('bm', 'vm', 'ct')[index % 3], 'hostname': f'host{index:07d}.example.com',
+         'cpucores': index % 64, 'ram': index % 512, 'disk_size': index % 4096}
+        for index in range(1, hosts + 1)])
+    session.commit()
+
+
+def measure(function, repeat):
+    """
+    Times a function.
+
+    Args:
+        function (callable): The function.
+        repeat (int): The number of calls.
+
+    Returns:
+        tuple: The mean milliseconds per call and the last result.
+    """
+    start = time.perf_counter()
+
+    for _ in range(repeat):
+        result = function()
+
+    return (time.perf_counter() - start) * 1000 / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hosts', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    engine = sqlalchemy.create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sqlalchemy.orm.sessionmaker(bind=engine)()
+    seed(session, args.hosts)
+
+    names = [column.key for column in COLUMNS]
+
+    def orm():
+        session.expunge_all()
+        return json.dumps([
+            {name: getattr(host, name) for name in names} for host in session.query(Host).order_by(Host.id)
+        ]).encode()
+
+    def columns():
+        return serialization.rows(names, session.query(*COLUMNS).order_by(Host.id))
+
+    print(f'{args.hosts} hosts, encoder in use: {serialization.ENCODER}')
+    print(f'{"path":<34} {"time":>11} {"size":>10}')
+
+    for name, function in (('orm instances, stdlib json', orm), ('column tuples, ' + serialization.ENCODER, columns)):
+        elapsed, body = measure(function, args.repeat)
+        print(f'{name:<34} {elapsed:8.2f} ms {len(body) / 1024:7.0f} KiB')
+
+    # Encoding only, on the same rows
+    values = [dict(zip(names, row)) for row in session.query(*COLUMNS).order_by(Host.id)]
+
+    for name, encoder in ENCODERS.items():
+        try:
+            module = __import__(name)
+        except ImportError:
+            print(f'{"encode only, " + name:<34} {"not installed":>11}')
+            continue
+
+        elapsed, body = measure(lambda: encoder(module)(values), args.repeat)
+        print(f'{"encode only, " + name:<34} {elapsed:8.2f} ms {len(body) / 1024:7.0f} KiB')
+
+    session.close()
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
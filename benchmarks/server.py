@@ -0,0 +1,264 @@
+# Batteries
+import contextlib
+import copy
+import http.client
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+# Third-party Imports
+import sqlalchemy
+
+# Repository root, where ping-cli.py lives
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# Configuration of the test instances, overridden per benchmark
+DEFAULTS = {
+    'log': {'level': 'INFO', 'access': {'enabled': False}},
+    'api': {'bind': '127.0.0.1', 'workers': 2, 'ready_timeout': 30},
+    'master': {'backoff': 0.1, 'backoff_max': 1, 'shutdown_timeout': 10},
+    'health': {'interval': 0.5},
+}
+
+
+def merge(base, overrides):
+    """
+    Merges configuration overrides into a base configuration.
+
+    Args:
+        base (dict): The base configuration, left unchanged.
+        overrides (dict): The overriding values.
+
+    Returns:
+        dict: The merged configuration.
+    """
+    merged = copy.deepcopy(base)
+
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = value
+
+    return merged
+
+
+def freeport():
+    """
+    Finds a free local TCP port.
+
+    Returns:
+        int: The port number.
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def rss(pid, field='VmRSS'):
+    """
+    Reads the resident set size of a process.
+
+    Args:
+        pid (int): The process id.
+        field (str, optional): The /proc status field, 'RssAnon' excludes
+            mapped files such as the SQLite mmap. Defaults to 'VmRSS'.
+
+    Returns:
+        int: The resident set size in KiB.
+    """
+    with open(f'/proc/{pid}/status') as file:
+        for line in file:
+            if line.startswith(f'{field}:'):
+                return int(line.split()[1])
+
+    return 0
+
+
+def percentile(values, fraction):
+    """
+    Computes a percentile by the nearest rank method.
+
+    Args:
+        values (list): The samples.
+        fraction (float): The percentile, from 0 to 1.
+
+    Returns:
+        float: The percentile value, None without samples.
+    """
+    if not values:
+        return None
+
+    ordered = sorted(values)
+
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class PingServer(object):
+    """
+    A Ping instance started through ping-cli.py on a temporary
+    directory, with its own configuration and SQLite database.
+
+    Usable as a context manager, the instance is stopped and its
+    directory removed on exit.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+
+    def __init__(self, seed=None, **config):
+        """
+        Prepares the instance.
+
+        Args:
+            seed (function, optional): Called with an engine on the new database, before
+                the master starts, to fill it. Defaults to None.
+            config (dict): Configuration overrides.
+        """
+        self.directory = tempfile.mkdtemp(prefix='ping-')
+        self.port = freeport()
+        self.config = merge(DEFAULTS, {
+            'pidfile': os.path.join(self.directory, 'ping.pid'),
+            'datastore': {'url': f'sqlite:///{os.path.join(self.directory, "ping.sqlite")}'},
+            'log': {'file': os.path.join(self.directory, 'ping.log'), 'error': os.path.join(self.directory, 'error.log')},
+            'metrics': {'directory': os.path.join(self.directory, 'metrics')},
+            'api': {'port': self.port},
+        })
+        self.config = merge(self.config, config)
+        self.path = os.path.join(self.directory, 'config.json')
+        self.seed = seed
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def cli(self, operation):
+        """
+        Runs a ping-cli.py operation on the instance.
+
+        Args:
+            operation (str): The operation.
+        """
+        # ping-cli.py reads configuration paths relative to the repository
+        subprocess.run(
+            [sys.executable, os.path.join(ROOT, 'ping-cli.py'), '-c', os.path.relpath(self.path, ROOT), operation],
+            cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+
+    def start(self, timeout=30):
+        """
+        Creates the database, starts the master and waits for the API.
+
+        Args:
+            timeout (float, optional): Seconds to wait for the API. Defaults to 30.
+
+        Raises:
+            TimeoutError: If the API did not answer in time.
+        """
+        with open(self.path, 'w') as file:
+            json.dump(self.config, file)
+
+        self.cli('initdb')
+
+        if self.seed is not None:
+            engine = sqlalchemy.create_engine(self.config['datastore']['url'])
+            self.seed(engine)
+            engine.dispose()
+
+        self.cli('start')
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if self.request('GET', '/api/health')[0] == 200:
+                    return
+            except OSError:
+                pass
+
+            time.sleep(0.1)
+
+        raise TimeoutError('The API did not start in time.')
+
+    def stop(self):
+        """
+        Stops the master, which drains every child.
+        """
+        if os.path.isfile(self.config['pidfile']):
+            self.cli('stop')
+
+    @property
+    def pid(self):
+        """
+        Returns the master process id.
+
+        Returns:
+            int: The master pid.
+        """
+        with open(self.config['pidfile']) as file:
+            return int(file.read())
+
+    def workers(self):
+        """
+        Returns the process ids of the API workers.
+
+        Returns:
+            list: The API worker pids.
+        """
+        workers = []
+
+        for pid in self.children():
+            with contextlib.suppress(FileNotFoundError), open(f'/proc/{pid}/cmdline', 'rb') as file:
+                if file.read().startswith(b'ping: ping-api'):
+                    workers.append(pid)
+
+        return workers
+
+    def children(self):
+        """
+        Returns the process ids of the master children.
+
+        Returns:
+            list: The children pids.
+        """
+        with open(f'/proc/{self.pid}/task/{self.pid}/children') as file:
+            return [int(pid) for pid in file.read().split()]
+
+    def reload(self):
+        """
+        Asks the master for a rolling reload.
+        """
+        os.kill(self.pid, signal.SIGHUP)
+
+    def request(self, method, path, body=None, timeout=10):
+        """
+        Sends a request to the API on a new connection.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The request path.
+            body (object, optional): The JSON body. Defaults to None.
+            timeout (float, optional): Seconds to wait for the response. Defaults to 10.
+
+        Returns:
+            tuple: The response status and body.
+        """
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=timeout)
+
+        try:
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            connection.request(method, path, None if body is None else json.dumps(body), headers)
+            response = connection.getresponse()
+
+            return response.status, response.read()
+
+        finally:
+            connection.close()
@@ -0,0 +1,163 @@
+"""
+Shared lookup cache against per-process dictionaries.
+
+Fills the shared memory cache and a dictionary with the same host
+lookup results and reports the hit latency of each. Then forks worker
+processes which look up the same keys, counting the misses each cache
+sends to the database while warming up, and compares the memory of one
+segment with that of a dictionary per worker.
+
+Usage:
+    python -m benchmarks.sharedcache [--entries 10000] [--workers 4] [--lookups 200000] [--slots 16384]
+"""
+# Batteries
+import argparse
+import json
+import multiprocessing
+import random
+import time
+import tracemalloc
+
+# Local Imports
+from shared.sharedcache import SharedCache
+
+# Namespaces a hostname lookup depends on
+NAMESPACES = ('host',)
+
+
+def entries(count):
+    """
+    Builds host lookup results, as cached by the API.
+
+    Args:
+        count (int): The number of entries.
+
+    Returns:
+        dict: The response bodies by cache key.
+    """
+    return {
+        f'hostname:host{index:07d}.example.com': json.dumps({
+            'id': index, 'type': 'vm', 'hostname': f'host{index:07d}.example.com', 'cpucores': 4, 'ram': 16,
+            'disk_size': 256, 'addresses': [f'10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}'],
+        }).encode()
+        for index in range(1, count + 1)}
+
+
+def latency(lookup, keys):
+    """
+    Times lookups.
+
+    Args:
+        lookup (callable): Looks a key up.
+        keys (list): The keys to look up.
+
+    Returns:
+        float: The mean latency in microseconds.
+    """
+    start = time.perf_counter()
+
+    for key in keys:
+        lookup(key)
+
+    return (time.perf_counter() - start) * 1e6 / len(keys)
+
+
+def warm(shared, bodies, keys, misses):
+    """
+    Looks keys up in a worker, loading misses from the bodies.
+
+    Args:
+        shared (bool): Whether to use the shared cache or a dictionary.
+        bodies (dict): The response bodies by cache key, standing for the database.
+        keys (list): The keys to look up.
+        misses (multiprocessing.Value): The number of misses, incremented.
+    """
+    local, missed = {}, 0
+
+    for key in keys:
+        if shared:
+            stamp = SharedCache.stamp(NAMESPACES)
+            if SharedCache.get(key, stamp) is None:
+                missed += 1
+                SharedCache.put(key, stamp, bodies[key])
+
+        elif key not in local:
+            missed += 1
+            local[key] = bodies[key]
+
+    with misses.get_lock():
+        misses.value += missed
+
+
+def warmup(shared, bodies, keys, workers, slots):
+    """
+    Counts the misses of forked workers looking up the same keys.
+
+    Args:
+        shared (bool): Whether to use the shared cache or dictionaries.
+        bodies (dict): The response bodies by cache key.
+        keys (list): The keys each worker looks up.
+        workers (int): The number of workers.
+        slots (int): The shared cache slots.
+
+    Returns:
+        int: The total misses.
+    """
+    if shared:
+        SharedCache.create(slots, 512, 64, 300)
+
+    misses = multiprocessing.Value('q', 0)
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=warm, args=(shared, bodies, keys, misses)) for _ in range(workers)]
+
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    SharedCache.close()
+
+    return misses.value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--lookups', type=int, default=200000)
+    parser.add_argument('--slots', type=int, default=16384)
+    args = parser.parse_args()
+
+    bodies = entries(args.entries)
+    keys = random.choices(list(bodies), k=args.lookups)
+
+    # Hit latency, with every entry cached
+    SharedCache.create(args.slots, 512, 64, 300)
+    stamp = SharedCache.stamp(NAMESPACES)
+    for key, body in bodies.items():
+        SharedCache.put(key, stamp, body)
+
+    segment = len(SharedCache._memory)
+    shared = latency(lambda key: SharedCache.get(key, SharedCache.stamp(NAMESPACES)), keys)
+    hits = sum(1 for key in keys[:1000] if SharedCache.get(key, stamp) is not None)
+    SharedCache.close()
+
+    # Each worker holds its own copies of the keys and bodies
+    tracemalloc.start()
+    local = {key.encode().decode(): bytes(bytearray(body)) for key, body in bodies.items()}
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    private = latency(local.get, keys)
+
+    print(f'{"cache":<8} {"hit latency":>12} {"memory":>12} {"warm-up misses":>15}')
+    print(
+        f'{"shared":<8} {shared:9.2f} us {segment / 2 ** 20:8.1f} MiB '
+        f'{warmup(True, bodies, keys, args.workers, args.slots):>15}')
+    print(
+        f'{"dict":<8} {private:9.2f} us {size * args.workers / 2 ** 20:8.1f} MiB '
+        f'{warmup(False, bodies, keys, args.workers, args.slots):>15}')
+    print(f'{args.entries} entries, {args.workers} workers, shared cache hit ratio {hits / 10:.1f}%')
+
+
+if __name__ == '__main__':
+    main()
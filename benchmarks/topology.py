@@ -0,0 +1,163 @@
+"""
+SQL statements per cabinet topology request.
+
+Racks an increasing number of hosts in a cabinet, each running a
+virtual machine which runs a container, every host with two addresses,
+and counts the statements issued while streaming the cabinet topology.
+The count must only grow with the number of host batches, never with
+the hosts in a batch. The same tree walked through lazy loading is
+reported for comparison.
+
+Usage:
+    python -m benchmarks.topology [--hosts 10 100 1000]
+"""
+# Batteries
+import argparse
+import math
+import os
+import tempfile
+import time
+
+# Third-party Imports
+import sqlalchemy
+import sqlalchemy.orm
+
+# Local Imports
+from modules.api.controllers.cabinet import CabinetController, CabinetTopologyController
+from shared import ipam
+from shared.models import Base, Cabinet
+
+# Hosts in each racked host tree, and addresses per host
+TREE, ADDRESSES = 3, 2
+
+
+def seed(connection, cabinet, hosts):
+    """
+    Racks host trees in a new cabinet.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+        cabinet (int): The cabinet id.
+        hosts (int): The number of racked hosts.
+    """
+    first = (cabinet - 1) * 100000 + 1
+    ids = range(first, first + hosts * TREE)
+    base = ipam.toint('10.0.0.0') + first * ADDRESSES
+
+    connection.execute('INSERT INTO cabinet (id, name, height) VALUES (?, ?, ?)', cabinet, f'rack{cabinet}', 42)
+
+    statements = {
+        'INSERT INTO host (id, type, hostname) VALUES (?, ?, ?)': [
+            (index, ('bm', 'vm', 'ct')[(index - first) % TREE], f'host{index:07d}') for index in ids],
+        'INSERT INTO host_cabinet (cabinet_id, host_id) VALUES (?, ?)': [
+            (cabinet, index) for index in ids[::TREE]],
+        'INSERT INTO contentorized_hosts (bm_id, virt_id) VALUES (?, ?)': [
+            (index, index + 1) for index in ids if (index - first) % TREE < TREE - 1],
+        'INSERT INTO ipaddress (address, packed, range_id, host_id) VALUES (?, ?, ?, ?)': [
+            (str(ipam.fromint(base + offset, 4)), ipam.pack(base + offset), 1, first + offset // ADDRESSES)
+            for offset in range(hosts * TREE * ADDRESSES)],
+    }
+
+    for statement, rows in statements.items():
+        connection.connection.executemany(statement, rows)
+
+
+def topology(session, cabinet_id):
+    """
+    Builds a cabinet topology as the API does.
+
+    Args:
+        session (sqlalchemy.orm.Session): The database session.
+        cabinet_id (int): The cabinet id.
+
+    Returns:
+        bytes: The encoded topology.
+    """
+    cabinet = session.query(*CabinetController.COLUMNS).filter(Cabinet.id == cabinet_id).first()
+
+    return b''.join(CabinetTopologyController()._stream(session, cabinet))
+
+
+def lazy(session, cabinet_id):
+    """
+    Walks a cabinet topology through lazy loaded relationships.
+
+    Args:
+        session (sqlalchemy.orm.Session): The database session.
+        cabinet_id (int): The cabinet id.
+
+    Returns:
+        int: The number of hosts walked.
+    """
+    def walk(host, depth):
+        [address.address for address in host.addresses]
+        return 1 + (sum(walk(guest, depth - 1) for guest in host.guests) if depth else 0)
+
+    return sum(walk(host, CabinetTopologyController.DEPTH) for host in session.query(Cabinet).get(cabinet_id).hosts)
+
+
+def measure(engine, function, cabinet_id):
+    """
+    Counts the statements issued and times a function.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The database engine.
+        function (callable): Called with a session and the cabinet id.
+        cabinet_id (int): The cabinet id.
+
+    Returns:
+        tuple: The number of statements and the milliseconds taken.
+    """
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    session = sqlalchemy.orm.sessionmaker(bind=engine)()
+    sqlalchemy.event.listen(engine, 'before_cursor_execute', count)
+    start = time.perf_counter()
+
+    try:
+        function(session, cabinet_id)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        sqlalchemy.event.remove(engine, 'before_cursor_execute', count)
+        session.close()
+
+    return len(statements), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hosts', type=int, nargs='+', default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='ping-') as directory:
+        engine = sqlalchemy.create_engine(f'sqlite:///{os.path.join(directory, "ping.sqlite")}')
+        Base.metadata.create_all(engine)
+
+        with engine.begin() as connection:
+            for cabinet, hosts in enumerate(args.hosts, 1):
+                seed(connection, cabinet, hosts)
+
+        print(f'{"racked hosts":>12} {"batches":>8} {"statements":>11} {"time":>11} {"lazy statements":>16}')
+        per_batch = None
+
+        for cabinet, hosts in enumerate(args.hosts, 1):
+            batches = max(math.ceil(hosts / CabinetTopologyController.BATCH_SIZE), 1)
+            statements, elapsed = measure(engine, topology, cabinet)
+            naive, _ = measure(engine, lazy, cabinet)
+
+            print(f'{hosts:>12} {batches:>8} {statements:>11} {elapsed:8.1f} ms {naive:>16}')
+
+            # The cabinet query, a fixed number of statements per batch, and
+            # one more host query when the last batch was full
+            final = 1 if hosts % CabinetTopologyController.BATCH_SIZE == 0 else 0
+            per_batch = per_batch or (statements - 1 - final) / batches
+            assert statements <= 1 + per_batch * batches + final, 'statements grew with the number of hosts'
+
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Request body validation cost per request.
+
+Validates request bodies of several routes with the validators compiled
+once by the validation middleware, and with jsonschema.validate called
+on every request as a per-call check would, which checks the schema
+and builds a validator each time.
+
+Usage:
+    python -m benchmarks.validation [--requests 2000]
+"""
+# Batteries
+import argparse
+import copy
+import time
+
+# Third-party Imports
+import jsonschema
+
+# Local Imports
+from modules.api.controllers.account import AccountController
+from modules.api.controllers.host import HostController
+from modules.api.controllers.ipam import RangeAllocateController, RangeController
+from modules.api.middleware import ValidationMiddleware
+
+# Request bodies as (route, schema, valid body, invalid body)
+BODIES = (
+    ('POST /accounts', AccountController.schemas['POST'],
+     {'name': 'example', 'username': 'admin', 'password': 'secret'}, {'name': 'example', 'username': ''}),
+    ('POST /hosts', HostController.schemas['POST'], {'type': 'vm', 'account_id': 1}, {'type': 'vps'}),
+    ('POST /ranges', RangeController.schemas['POST'], {'network': '10.0.0.0/24'}, {'start_ip': '10.0.0.0'}),
+    ('POST /ranges/{id}/allocate', RangeAllocateController.schemas['POST'], {'host_id': 1, 'count': 4},
+     {'host_id': 1, 'count': 1 << 20}),
+)
+
+
+def measure(validate, body, requests):
+    """
+    Times the validation of fresh copies of a body.
+
+    Args:
+        validate (callable): Validates a body.
+        body (dict): The request body.
+        requests (int): The number of validations.
+
+    Returns:
+        float: The mean microseconds per validation.
+    """
+    bodies = [copy.deepcopy(body) for _ in range(requests)]
+    start = time.perf_counter()
+
+    for instance in bodies:
+        validate(instance)
+
+    return (time.perf_counter() - start) * 1e6 / requests
+
+
+def percall(schema):
+    """
+    Builds a validation calling jsonschema.validate every time.
+
+    Args:
+        schema (dict): The JSON schema.
+
+    Returns:
+        callable: Returns the error message for an instance, None if it is valid.
+    """
+    def validate(instance):
+        try:
+            jsonschema.validate(instance, schema)
+        except jsonschema.ValidationError as e:
+            return e.message
+
+    return validate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f'{"route":<28} {"body":<8} {"compiled":>11} {"per call":>11} {"speedup":>8}')
+    for route, schema, valid, invalid in BODIES:
+        compiled = ValidationMiddleware.compile(schema)
+
+        for name, body in (('valid', valid), ('invalid', invalid)):
+            assert (compiled(copy.deepcopy(body)) is None) == (name == 'valid'), (route, body)
+
+            fast = measure(compiled, body, args.requests)
+            slow = measure(percall(schema), body, args.requests)
+            print(f'{route:<28} {name:<8} {fast:8.1f} us {slow:8.1f} us {slow / fast:7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
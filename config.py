@@ -51,12 +51,170 @@ class Config(object):
                         'default': 'DEBUG'
                     },
                     'file': {'type': 'string', 'default': 'logs/ping.log'},
-                    'error': {'type': 'string', 'default': 'logs/ping-error.log'}
+                    'error': {'type': 'string', 'default': 'logs/ping-error.log'},
+                    'access': {
+                        'type': 'object',
+                        'properties': {
+                            'enabled': {'type': 'boolean', 'default': True},
+                            'buffer': {'type': 'integer', 'minimum': 1, 'default': 8192},
+                            'batch': {'type': 'integer', 'minimum': 1, 'default': 256},
+                            'interval': {'type': 'number', 'exclusiveMinimum': 0, 'default': 0.5},
+                            'policy': {'type': 'string', 'enum': ['drop', 'overwrite', 'sample'], 'default': 'drop'},
+                            'sample': {'type': 'integer', 'minimum': 1, 'default': 10}
+                        },
+                        'default': {}
+                    }
                 },
                 'required': ['file', 'error', 'level']
             },
             'pidfile': {'type': 'string', 'default': 'ping.pid'},
-            'datastore': {'type': 'string'}
+            'datastore': {
+                'type': 'object',
+                'properties': {
+                    'url': {'type': 'string', 'default': 'sqlite:///ping.sqlite'},
+                    'pool_size': {'type': 'integer', 'minimum': 1, 'default': 5},
+                    'max_overflow': {'type': 'integer', 'minimum': 0, 'default': 10},
+                    'pool_timeout': {'type': 'number', 'minimum': 0, 'default': 30},
+                    'pool_recycle': {'type': 'integer', 'minimum': -1, 'default': 3600},
+                    'pool_pre_ping': {'type': 'boolean', 'default': False},
+                    'statement_timeout': {'type': 'integer', 'minimum': 0, 'default': 0},
+                    'sqlite': {
+                        'type': 'object',
+                        'properties': {
+                            'journal_mode': {
+                                'type': 'string',
+                                'enum': ['WAL', 'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY'],
+                                'default': 'WAL'
+                            },
+                            'synchronous': {
+                                'type': 'string',
+                                'enum': ['OFF', 'NORMAL', 'FULL', 'EXTRA'],
+                                'default': 'NORMAL'
+                            },
+                            'busy_timeout': {'type': 'integer', 'minimum': 0, 'default': 5000},
+                            'mmap_size': {'type': 'integer', 'minimum': 0, 'default': 268435456}
+                        },
+                        'default': {}
+                    }
+                },
+                'default': {}
+            },
+            'master': {
+                'type': 'object',
+                'properties': {
+                    'backoff': {'type': 'number', 'minimum': 0, 'default': 0.5},
+                    'backoff_max': {'type': 'number', 'minimum': 0, 'default': 30},
+                    'stable': {'type': 'number', 'minimum': 0, 'default': 10},
+                    'shutdown_timeout': {'type': 'number', 'minimum': 0, 'default': 10}
+                },
+                'default': {}
+            },
+            'api': {
+                'type': 'object',
+                'properties': {
+                    'bind': {'type': 'string', 'default': '127.0.0.1'},
+                    'port': {'type': 'integer', 'minimum': 1, 'maximum': 65535, 'default': 8000},
+                    'backlog': {'type': 'integer', 'minimum': 1, 'default': 1024},
+                    'workers': {'type': 'integer', 'minimum': 0, 'default': 2},
+                    'ready_timeout': {'type': 'number', 'exclusiveMinimum': 0, 'default': 30}
+                },
+                'default': {}
+            },
+            'hashing': {
+                'type': 'object',
+                'properties': {
+                    'pending': {'type': 'integer', 'minimum': 1, 'default': 1},
+                    'rounds': {'type': 'integer', 'minimum': 1000, 'default': 200000},
+                    'timeout': {'type': 'number', 'exclusiveMinimum': 0, 'default': 30}
+                },
+                'default': {}
+            },
+            'ipam': {
+                'type': 'object',
+                'properties': {
+                    'cache_interval': {'type': 'number', 'minimum': 0, 'default': 1.0}
+                },
+                'default': {}
+            },
+            'auth': {
+                'type': 'object',
+                'properties': {
+                    'enabled': {'type': 'boolean', 'default': False},
+                    'secret': {'type': 'string', 'default': ''},
+                    'ttl': {'type': 'integer', 'minimum': 1, 'default': 3600},
+                    'cache': {'type': 'integer', 'minimum': 1, 'default': 4096},
+                    'interval': {'type': 'number', 'exclusiveMinimum': 0, 'default': 1.0}
+                },
+                'default': {}
+            },
+            'cache': {
+                'type': 'object',
+                'properties': {
+                    'enabled': {'type': 'boolean', 'default': True},
+                    'entries': {'type': 'integer', 'minimum': 1, 'default': 1024},
+                    'memory': {'type': 'integer', 'minimum': 0, 'default': 16777216},
+                    'entry_memory': {'type': 'integer', 'minimum': 0, 'default': 1048576},
+                    'ttl': {'type': 'number', 'exclusiveMinimum': 0, 'default': 30},
+                    'interval': {'type': 'number', 'exclusiveMinimum': 0, 'default': 1.0}
+                },
+                'default': {}
+            },
+            'shared_cache': {
+                'type': 'object',
+                'properties': {
+                    'enabled': {'type': 'boolean', 'default': True},
+                    'slots': {'type': 'integer', 'minimum': 1, 'default': 16384},
+                    'slot_size': {'type': 'integer', 'minimum': 64, 'maximum': 65535, 'default': 512},
+                    'stripes': {'type': 'integer', 'minimum': 1, 'default': 64},
+                    'ttl': {'type': 'number', 'exclusiveMinimum': 0, 'default': 300}
+                },
+                'default': {}
+            },
+            'prober': {
+                'type': 'object',
+                'properties': {
+                    'enabled': {'type': 'boolean', 'default': False},
+                    'interval': {'type': 'number', 'exclusiveMinimum': 0, 'default': 300},
+                    'concurrency': {'type': 'integer', 'minimum': 1, 'default': 2048},
+                    'rate': {'type': 'number', 'exclusiveMinimum': 0, 'default': 1.0},
+                    'timeout': {'type': 'number', 'exclusiveMinimum': 0, 'default': 1.0},
+                    'timeout_min': {'type': 'number', 'exclusiveMinimum': 0, 'default': 0.05},
+                    'timeout_max': {'type': 'number', 'exclusiveMinimum': 0, 'default': 4.0},
+                    'retries': {'type': 'integer', 'minimum': 0, 'default': 1},
+                    'icmp': {'type': 'boolean', 'default': True},
+                    'ports': {
+                        'type': 'array',
+                        'items': {'type': 'integer', 'minimum': 1, 'maximum': 65535},
+                        'default': [22, 80, 443]
+                    },
+                    'history': {'type': 'integer', 'minimum': 1, 'default': 288}
+                },
+                'default': {}
+            },
+            'metrics': {
+                'type': 'object',
+                'properties': {
+                    'directory': {'type': 'string', 'default': ''},
+                    'interval': {'type': 'number', 'exclusiveMinimum': 0, 'default': 5.0}
+                },
+                'default': {}
+            },
+            'dev': {
+                'type': 'object',
+                'properties': {
+                    'reload': {'type': 'boolean', 'default': False},
+                    'paths': {'type': 'array', 'items': {'type': 'string'}, 'default': ['modules', 'shared']},
+                    'debounce': {'type': 'number', 'exclusiveMinimum': 0, 'default': 0.1}
+                },
+                'default': {}
+            },
+            'health': {
+                'type': 'object',
+                'properties': {
+                    'interval': {'type': 'number', 'exclusiveMinimum': 0, 'default': 1.0}
+                },
+                'default': {}
+            }
         }
     }
 
@@ -90,9 +248,21 @@ class Config(object):
             # Replace key dashes with underscores
             configdict = keyreplace(configdict, '-', '_')
 
+            # Datastore used to be a plain URL
+            if isinstance(configdict.get('datastore'), str):
+                configdict['datastore'] = {'url': configdict['datastore']}
+
             # Validate configuration JSON
             DefaultValidatingDraft7Validator(cls.CONFIG_FILE_SYNTAX).validate(configdict)
 
+            # Workers waiting for a hash are blocked, at least one must be left serving
+            workers = configdict['api']['workers'] or os.cpu_count() or 1
+
+            if configdict['hashing']['pending'] >= workers:
+                raise InvalidConfiguration(
+                    f'Configurations file contains errors: hashing.pending ({configdict["hashing"]["pending"]}) '
+                    f'must be lower than api.workers ({workers}).')
+
             # Return configuration
             return configdict
 
@@ -1,7 +1,10 @@
 # Batteries
 import contextlib
+import multiprocessing.connection
 import os
+import secrets
 import signal
+import socket
 import time
 from datetime import timedelta
 
@@ -11,13 +14,166 @@ from loguru import logger
 # Local imports
 from config import Config
 from modules.api import PingAPI
+from modules.hasher import PingHasher
+from modules.prober import PingProber
+from shared.hashing import PasswordHasher
+from shared.metrics import Metrics
 from shared.process import UnixProcess
+from shared.reloader import Reloader
+from shared.sharedcache import SharedCache
+
+
+class Child(object):
+    """
+    A supervised child process, its control channel and its restart state.
+
+    Children report 'ready' on their control channel once they are
+    about to serve, and are asked to finish with a 'drain' message.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+
+    def __init__(self, cls, kwargs):
+        """
+        Creates the child entry. The process is spawned by the master.
+
+        Args:
+            cls (class): The child process class.
+            kwargs (dict): The child process arguments.
+        """
+        self.cls = cls
+        self.kwargs = kwargs
+        self.proc = None
+        self.control = None
+        self.ready = False
+        self.failures = 0
+        self.started = 0.0
+        self.restart = 0.0
+        self.deadline = None
+
+    def spawn(self):
+        """
+        Starts a new instance of the child process.
+        """
+        self.control, remote = multiprocessing.Pipe()
+
+        try:
+            proc = self.cls(control=remote, **self.kwargs)
+            proc.start()
+
+        except Exception:
+            self.control.close()
+            self.control = None
+            raise
+
+        finally:
+            remote.close()
+
+        self.proc = proc
+
+        self.ready = False
+        self.started = time.monotonic()
+
+    def poll(self):
+        """
+        Reads the messages sent by the child.
+
+        Returns:
+            bool: True if the child reported being ready.
+        """
+        with contextlib.suppress(EOFError, OSError):
+            while not self.ready and self.control.poll():
+                self.ready = self.control.recv() == 'ready'
+
+        return self.ready
+
+    def drain(self, timeout):
+        """
+        Asks the child to finish its requests and exit.
+
+        Args:
+            timeout (float): Seconds after which the child is killed.
+        """
+        self.deadline = time.monotonic() + timeout
+        logger.debug(f'Draining child: {self.proc.name} with pid {self.proc.pid}...')
+
+        try:
+            self.control.send('drain')
+
+        # Without a control channel, stop it right away
+        except OSError:
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(self.proc.pid, signal.SIGINT if isinstance(self.proc, PingAPI) else signal.SIGTERM)
+
+    def kill(self):
+        """
+        Kills the child process.
+        """
+        logger.warning(f'Killing child: {self.proc.name} with pid {self.proc.pid}, it did not stop in time.')
+
+        with contextlib.suppress(ProcessLookupError):
+            os.kill(self.proc.pid, signal.SIGKILL)
+
+    def join(self):
+        """
+        Collects the exited child process and its metrics snapshot.
+
+        Returns:
+            int: The child exit code.
+        """
+        self.proc.join()
+        self.control.close()
+
+        # Retain the counters of the exited child and drop its snapshot
+        Metrics.retire(self.proc.pid)
+
+        exitcode, self.proc, self.control = self.proc.exitcode, None, None
+
+        return exitcode
+
+    def reap(self, backoff, backoff_max, stable):
+        """
+        Collects an exited child process and schedules its restart.
+        The first restart is immediate, following ones within a
+        crash loop are delayed exponentially.
+
+        Args:
+            backoff (float): The delay before the second restart, in seconds.
+            backoff_max (float): The maximum restart delay, in seconds.
+            stable (float): Seconds a child must run for its failures to be forgotten.
+
+        Returns:
+            float: The restart delay, in seconds.
+        """
+        exitcode = self.join()
+        now = time.monotonic()
+
+        # Forget failures of a child which ran long enough
+        if now - self.started >= stable:
+            self.failures = 0
+
+        delay = min(backoff * 2 ** (self.failures - 1), backoff_max) if self.failures else 0.0
+        self.failures += 1
+        self.restart = now + delay
+
+        logger.warning(f'Child \'{self.cls.__name__}\' exited with code {exitcode}, restarting in {delay:.1f}s.')
+
+        return delay
 
 
 class PingMaster(UnixProcess):
     """
     The ping master process will monitor and manage its children.
 
+    On SIGHUP the configuration is reloaded and a new generation of
+    API workers is started on the same listening socket. Once every
+    new worker is ready the previous generation is drained, so the
+    socket keeps accepting connections throughout the reload.
+
+    In development mode source changes start a new generation as well,
+    whose workers import the changed code after forking.
+
     Args:
         shared.process.UnixProcess (class): UnixProcess class.
     """
@@ -32,9 +188,43 @@ class PingMaster(UnixProcess):
         super().__init__('master process')
         self._configpath = configpath
         self._children = []
+        self._starting = []
+        self._retiring = []
+        self._generation = 0
+        self._reloading = False
+        self._recycling = False
+        self._deadline = None
+        self._sock = None
+        self._wakeup = None
+        self._secret = None
 
     @staticmethod
-    def _loadchildren():
+    def _bind():
+        """
+        Creates the API listening socket. It is created once by the
+        master so that every API worker accepts on the same socket.
+
+        Returns:
+            socket.socket: The non-blocking listening socket.
+        """
+        bind, port = Config.get('api.bind'), Config.get('api.port')
+
+        # Create socket for the bind address family
+        family = socket.AF_INET6 if ':' in bind else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+        # Bind and listen
+        sock.bind((bind, port))
+        sock.setblocking(False)
+        sock.listen(Config.get('api.backlog'))
+
+        # Workers must inherit the socket file descriptor
+        sock.set_inheritable(True)
+
+        return sock
+
+    def _loadchildren(self):
         """
         Loads children from configuration into process map.
 
@@ -44,33 +234,227 @@ class PingMaster(UnixProcess):
         Returns:
             list: Configured children list.
         """
-        return [
-            [PingAPI, {}, None],
+        # Zero workers means one per CPU core
+        workers = Config.get('api.workers') or os.cpu_count() or 1
+
+        children = [
+            Child(PingAPI, {
+                'sock': self._sock, 'worker': worker, 'generation': self._generation, 'secret': self._tokensecret()})
+            for worker in range(workers)
         ]
 
+        # Password hasher, replaced along with each generation
+        children.append(Child(PingHasher, {'generation': self._generation}))
+
+        # Reachability prober, replaced along with each generation
+        if Config.get('prober.enabled'):
+            children.append(Child(PingProber, {'generation': self._generation}))
+
+        return children
+
+    def _tokensecret(self):
+        """
+        Returns the token signing secret shared by all API workers.
+        Without a configured secret a random one is generated once,
+        so tokens survive reloads but not restarts.
+
+        Returns:
+            str: The token signing secret.
+        """
+        if Config.get('auth.secret'):
+            return Config.get('auth.secret')
+
+        if self._secret is None:
+            logger.warning('No auth secret configured, tokens will not survive restarts.')
+            self._secret = secrets.token_hex(32)
+
+        return self._secret
+
+    def _reload(self, signum, frame):
+        """
+        Schedules a reload of the configuration and the API workers.
+
+        Args:
+            signum (int): The signal received.
+            frame (frame): The current stack frame.
+        """
+        logger.info(f'Received {signum}. Reloading.')
+        self._reloading = True
+
+    def _recycle(self):
+        """
+        Schedules a new generation of API workers after source changes.
+        Called from the reloader thread.
+        """
+        self._recycling = True
+
+        # Wake the supervision loop
+        with contextlib.suppress(BlockingIOError):
+            self._wakeup[1].send(b'\0')
+
+    def _rollout(self):
+        """
+        Reloads the configuration if requested and starts a new generation
+        of API workers, which replaces the current one once ready.
+        """
+        reloading, self._reloading, self._recycling = self._reloading, False, False
+
+        # Keep running on the current configuration if the new one is invalid
+        if reloading and not Config.reload():
+            return
+
+        # The listening socket outlives reloads
+        if self._sock.getsockname()[:2] != (Config.get('api.bind'), Config.get('api.port')):
+            logger.warning('API bind address changes require a restart, keeping the current socket.')
+
+        self._generation += 1
+        self._starting = self._loadchildren()
+        self._deadline = time.monotonic() + Config.get('api.ready_timeout')
+
+        for child in self._starting:
+            try:
+                child.spawn()
+
+            # Abandon the generation, the current one keeps serving
+            except OSError as e:
+                logger.error(f'Could not spawn generation {self._generation}, keeping the current API workers: {str(e)}')
+                self._retire([child for child in self._starting if child.proc is not None])
+                self._starting = []
+                return
+
+        logger.info(f'Started generation {self._generation} with {len(self._starting)} children.')
+
+    def _promote(self, now):
+        """
+        Replaces the current API workers with the starting generation
+        once all of its workers are ready, or abandons the starting
+        generation if any of its workers exits or the timeout expires.
+
+        Args:
+            now (float): The current monotonic time.
+        """
+        if not self._starting:
+            return
+
+        failed = any(child.proc.exitcode is not None for child in self._starting) or now >= self._deadline
+
+        if failed:
+            logger.error(f'Generation {self._generation} did not become ready, keeping the current API workers.')
+            retired, self._starting = self._starting, []
+
+        elif all(child.poll() for child in self._starting):
+            logger.info(f'Generation {self._generation} is ready, draining the previous API workers.')
+            retired, self._children, self._starting = self._children, self._starting, []
+
+        else:
+            return
+
+        self._retire([child for child in retired if child.proc is not None])
+
+    def _retire(self, children):
+        """
+        Drains children and hands them over to be collected.
+
+        Args:
+            children (list): The children to retire.
+        """
+        for child in children:
+            child.drain(Config.get('master.shutdown_timeout'))
+
+        self._retiring += children
+
     def _monit(self):
         """
-        Monitors the instances of running processes.
+        Reaps exited children and spawns those due to start, promotes
+        a ready generation and kills children which did not drain in time.
+
+        Returns:
+            float: Seconds until the next timed event, None if there is none.
         """
-        # For each children
-        for index, (cls, kwargs, proc) in enumerate(self._children):
+        now = time.monotonic()
+        failed = []
+
+        for child in self._children:
 
-            # Spawn children if required
-            if proc is None:
+            # Reap exited children
+            if child.proc is not None and child.proc.exitcode is not None:
+                child.reap(
+                    Config.get('master.backoff'), Config.get('master.backoff_max'), Config.get('master.stable'))
 
+            # Spawn children due to start
+            if child.proc is None and child.restart <= now:
                 try:
-                    self._children[index][2] = cls(**kwargs)
-                    self._children[index][2].start()
+                    child.spawn()
                 except Exception as e:
-                    self._children.pop(index)
-                    logger.error(f'Could not instantiate/spawn child \'{cls.__name__}\' due to: {str(e)}')
-                    logger.info(f'Removed child \'{cls.__name__}\' from processes list.')
+                    failed.append(child)
+                    logger.error(f'Could not instantiate/spawn child \'{child.cls.__name__}\' due to: {str(e)}')
+                    logger.info(f'Removed child \'{child.cls.__name__}\' from processes list.')
+
+        self._children = [child for child in self._children if child not in failed]
+
+        self._promote(now)
+
+        # Collect drained children, killing those past their deadline
+        for child in self._retiring:
+            if child.proc.exitcode is None and now >= child.deadline:
+                child.kill()
+
+            if child.proc.exitcode is not None or now >= child.deadline:
+                child.join()
+
+        self._retiring = [child for child in self._retiring if child.proc is not None]
+
+        # Time until the next delayed restart or deadline
+        pending = [child.restart for child in self._children if child.proc is None]
+        pending += [child.deadline for child in self._retiring]
+        pending += [self._deadline] if self._starting else []
+
+        return max(min(pending) - now, 0) if pending else None
+
+    def _wait(self, timeout):
+        """
+        Sleeps until a child exits or reports ready, a signal arrives
+        or the timeout expires.
+
+        Args:
+            timeout (float): Maximum seconds to wait, None to wait indefinitely.
+        """
+        children = self._children + self._starting + self._retiring
+        waitables = [child.proc.sentinel for child in children if child.proc is not None]
+        waitables += [child.control for child in self._starting if not child.ready]
+
+        if self._wakeup[0] in multiprocessing.connection.wait(waitables + [self._wakeup[0]], timeout):
 
-            elif not (proc.is_alive() or proc.exitcode is None):
+            # Drain the signal numbers written to the wakeup socket
+            with contextlib.suppress(BlockingIOError):
+                while self._wakeup[0].recv(4096):
+                    pass
 
-                # Join process and delete instance
-                proc.join(timeout=0.1)
-                self._children[index][2] = None
+    def _afterfork(self):
+        """
+        Detaches forked children from the master's wakeup socket.
+        """
+        with contextlib.suppress(ValueError):
+            signal.set_wakeup_fd(-1)
+
+        for sock in self._wakeup:
+            sock.close()
+
+    def _shutdown(self):
+        """
+        Drains every child at once and waits for them to exit,
+        killing those still running after the shutdown timeout.
+        """
+        self._retire([child for child in self._children + self._starting if child.proc is not None])
+        self._children, self._starting = [], []
+
+        while True:
+            timeout = self._monit()
+
+            if not self._retiring:
+                break
+
+            self._wait(timeout)
 
     @logger.catch
     def run(self):
@@ -93,48 +477,77 @@ class PingMaster(UnixProcess):
         self.setprocname()
 
         # Set signal handlers
-        # self.sigreg(signal.SIGHUP, self._reload)
+        self.sigreg(signal.SIGHUP, self._reload)
         self.sigreg(signal.SIGINT, self.sighandler)
         self.sigreg(signal.SIGTERM, self.sighandler)
 
+        # Wake the supervision loop on signals
+        self._wakeup = socket.socketpair()
+        for sock in self._wakeup:
+            sock.setblocking(False)
+        signal.set_wakeup_fd(self._wakeup[1].fileno(), warn_on_full_buffer=False)
+        os.register_at_fork(after_in_child=self._afterfork)
+
         # Write PID file
         with open(Config.getpath('pidfile'), 'w+') as pidfile:
             pidfile.write(str(os.getpid()))
 
+        # Create the listening socket shared by all API workers
+        self._sock = self._bind()
+
+        # Create the directory where workers publish their metrics
+        Metrics.configure(Config.getpath('metrics.directory'))
+
+        # Create the cache shared by all API workers
+        if Config.get('shared_cache.enabled'):
+            SharedCache.create(
+                Config.get('shared_cache.slots'), Config.get('shared_cache.slot_size'),
+                Config.get('shared_cache.stripes'), Config.get('shared_cache.ttl'))
+
+        # Create the socket API workers request password hashes on
+        PasswordHasher.create()
+
         # Load children processes
         self._children = self._loadchildren()
 
-        # While not stopping
-        while self._stop is False:
-            # Monit instances
-            self._monit()
+        # Watch the sources in development mode
+        if Config.get('dev.reload'):
+            paths = [os.path.join(Config.BASE_DIR, path) for path in Config.get('dev.paths')]
+            Reloader.start(paths, Config.get('dev.debounce'), self._recycle)
 
-            time.sleep(1)
+        # Supervise children until stopping
+        while self._stop is False:
+            timeout = self._monit()
 
-        logger.debug('Terminating...')
+            # Start a new generation on reload, once the previous one settled
+            if (self._reloading or self._recycling) and not self._starting:
+                self._rollout()
+                continue
 
-        # Stop all children whose instance is not None
-        children = [proc for _, _, proc in self._children if proc]
+            self._wait(timeout)
 
-        # While children have not stopped
-        while children:
+        # Stop watching the sources
+        Reloader.stop()
 
-            for index, proc in enumerate(children):
+        logger.debug('Terminating...')
 
-                logger.debug(f'Terminating child: {proc.name} with pid {proc.pid}...')
+        # Stop all children
+        self._shutdown()
 
-                # Send SIGTERM to child process
-                os.kill(proc.pid, signal.SIGINT if isinstance(proc, PingAPI) else signal.SIGTERM)
+        # Close the listening socket
+        self._sock.close()
 
-                # On join fail, SIGKILL child process
-                proc.join(timeout=1)
+        # Remove published metrics
+        Metrics.cleanup()
 
-                # If child has not stopped, give it time
-                if proc.is_alive() or proc.exitcode is None:
-                    continue
+        # Release the shared cache and hashing socket
+        SharedCache.close()
+        PasswordHasher.close()
 
-                # Remove children
-                children.pop(index)
+        # Close the wakeup socket
+        signal.set_wakeup_fd(-1)
+        for sock in self._wakeup:
+            sock.close()
 
         # Remove pidfile and socket
         with contextlib.suppress(FileNotFoundError):
@@ -1,14 +1,33 @@
+# Batteries
+import contextlib
+import importlib
+import os
+import signal
+import threading
+
 # Third-party imports
 import bjoern
 import falcon
 import sqlalchemy
-import contextlib
 from loguru import logger
 
 # Local Imports
 from config import Config
+from shared import datastore, generations, serialization
+from shared.accesslog import AccessLog
+from shared.cache import ResponseCache
+from shared.datastore import PoolStatistics
+from shared.hashing import PasswordHasher
+from shared.health import HealthMonitor
+from shared.ipam import IPAMCache
+from shared.metrics import Metrics
 from shared.process import UnixProcess
-from .middleware import LoggingMiddleware, DatabaseConnectionMiddleware
+from shared.reloader import purge
+from shared.sharedcache import SharedCache
+from shared.tokens import Tokens
+from .middleware import (
+    LoggingMiddleware, AuthMiddleware, ValidationMiddleware, ResponseCacheMiddleware, DatabaseConnectionMiddleware)
+from .media import HANDLERS
 from .controllers import BASE_ENDPOINT, ROUTES
 
 
@@ -16,55 +35,195 @@ class PingAPI(UnixProcess):
     """
     The API is the main entrypoint for the application.
 
+    Several instances may run side by side, all of them serving
+    the same listening socket which is created by the master
+    process and inherited on fork.
+
     Args:
         shared.process.UnixProcess (class): The UnixProcess class.
     """
 
-    def __init__(self, bind='127.0.0.1', port=8000):
+    def __init__(self, sock, worker=0, generation=0, control=None, secret=''):
         """
         Create an instance of the Ping API entrypoint process.
 
         Args:
-            bind (str, optional): The bind address for the API process. Defaults to '127.0.0.1'.
-            port (int, optional): The port to which to bind. Defaults to 8000.
+            sock (socket.socket): The listening socket shared by all API workers.
+            worker (int, optional): The worker number. Defaults to 0.
+            generation (int, optional): The master reload generation. Defaults to 0.
+            control (multiprocessing.connection.Connection, optional): The channel to
+                the master process. Defaults to None.
+            secret (str, optional): The token signing secret shared by all API workers. Defaults to ''.
+        """
+        UnixProcess.__init__(self, name=f'ping-api #{worker} :: {sock.getsockname()[1]}')
+        self._sock = sock
+        self._worker = worker
+        self._generation = generation
+        self._control = control
+        self._secret = secret
+
+    @staticmethod
+    def _poolexhausted(req, resp, ex, params):
+        """
+        Handles database connection pool exhaustion.
+
+        Args:
+            req: The request object.
+            resp: The response object.
+            ex (sqlalchemy.exc.TimeoutError): The pool timeout error.
+            params (dict): The route parameters.
+
+        Raises:
+            falcon.HTTPServiceUnavailable: Always.
+        """
+        raise falcon.HTTPServiceUnavailable(
+            'Service Unavailable', 'No database connection available.', retry_after=1)
+
+    @staticmethod
+    def _registermetrics(engine):
+        """
+        Registers the metrics owned by the worker components.
+
+        Args:
+            engine (sqlalchemy.engine.Engine): The database engine.
+        """
+        Metrics.instrument(engine)
+
+        # Connection pool
+        Metrics.register('ping_db_pool_checkouts_total', lambda: PoolStatistics.snapshot()['checkouts'])
+        Metrics.register('ping_db_pool_timeouts_total', lambda: PoolStatistics.snapshot()['timeouts'])
+        Metrics.register('ping_db_pool_wait_seconds_total', lambda: PoolStatistics.snapshot()['wait_total'])
+        Metrics.register('ping_db_pool_waiting', lambda: PoolStatistics.snapshot()['waiting'])
+        Metrics.register('ping_db_pool_checkedout', engine.pool.checkedout)
+
+        # Response cache
+        Metrics.register('ping_cache_entries', ResponseCache.entries)
+        Metrics.register('ping_cache_bytes', ResponseCache.memory)
+
+        # Password hashing and access log
+        Metrics.register('ping_hashing_pending', PasswordHasher.pending)
+        Metrics.register('ping_access_log_pending', AccessLog.pending)
+        Metrics.register('ping_access_log_dropped_total', AccessLog.dropped)
+
+    def _drainer(self):
+        """
+        Waits for the master to retire this worker, then interrupts
+        bjoern, which stops accepting connections and returns once
+        the open ones are done.
         """
-        UnixProcess.__init__(self, name=f'ping-api :: {port}')
-        self._bind = bind
-        self._port = port
+        try:
+            message = self._control.recv()
+        except (EOFError, OSError):
+            return
+
+        if message == 'drain':
+            logger.info(f'Draining bjoern worker #{self._worker}')
+            os.kill(os.getpid(), signal.SIGINT)
 
     @logger.catch
     def run(self):
         """
         This will run in a separate thread.
         """
+        # Serve the code currently on disk in development mode
+        if Config.get('dev.reload'):
+            purge(Config.BASE_DIR)
+            importlib.import_module(__name__).PingAPI.serve(self)
+        else:
+            self.serve()
+
+    def serve(self):
+        """
+        Sets up the worker and serves requests until interrupted.
+        """
         # Set proc name
         self.setprocname()
 
+        # Start access log writer
+        if Config.get('log.access.enabled'):
+            AccessLog.start(
+                Config.get('log.access.buffer'), Config.get('log.access.batch'), Config.get('log.access.interval'),
+                Config.get('log.access.policy'), Config.get('log.access.sample'))
+
+        # Configure password hashing, requested from the hasher process
+        PasswordHasher.start(Config.get('hashing.rounds'), Config.get('hashing.timeout'))
+
+        # Configure IPAM cache staleness checks
+        IPAMCache.configure(Config.get('ipam.cache_interval'))
+
         # Setup database connection
-        engine = sqlalchemy.create_engine(
-            Config.get('datastore'), poolclass=sqlalchemy.pool.QueuePool, pool_size=5, max_overflow=0)
+        engine = datastore.create_engine(Config.get('datastore'))
         session_factory = sqlalchemy.orm.sessionmaker(bind=engine)
-        scoped_session = sqlalchemy.orm.scoped_session(session_factory)
+
+        # Register metrics and start publishing them to the master
+        self._registermetrics(engine)
+        Metrics.start(f'api-{self._generation}-{self._worker}', Config.get('metrics.interval'))
+
+        # Start background readiness checks
+        HealthMonitor.start(engine, Config.get('health.interval'))
+
+        # Start token verification, revocations are refreshed in the background
+        Tokens.start(
+            self._secret, Config.get('auth.ttl'), Config.get('auth.cache'), session_factory,
+            Config.get('auth.interval'))
+
+        # Authenticate, then validate bodies with schemas compiled once, before sessions are created
+        middleware = [LoggingMiddleware()]
+        if Config.get('auth.enabled'):
+            middleware.append(AuthMiddleware())
+        middleware.append(ValidationMiddleware(ROUTES.values()))
+
+        # Start response cache, serving hits before sessions are created
+        if Config.get('cache.enabled'):
+            ResponseCache.start(
+                session_factory, Config.get('cache.entries'), Config.get('cache.memory'),
+                Config.get('cache.entry_memory'), Config.get('cache.ttl'), Config.get('cache.interval'))
+            middleware.append(ResponseCacheMiddleware())
+            generations.listen(lambda names: ResponseCache.refresh())
+
+        middleware.append(DatabaseConnectionMiddleware(session_factory))
+
+        # Invalidate entries shared with the other workers after writes
+        generations.listen(lambda names: SharedCache.invalidate(*names))
 
         # Create WSGI Application
-        api = falcon.API(
-            middleware=[
-                LoggingMiddleware(),
-                DatabaseConnectionMiddleware(scoped_session)
-            ]
-        )
+        api = falcon.API(middleware=middleware)
+
+        # Encode and decode JSON bodies with the fastest available library
+        api.req_options.media_handlers.update(HANDLERS)
+        api.resp_options.media_handlers.update(HANDLERS)
+        logger.debug(f'Using {serialization.ENCODER} for JSON bodies')
+
+        # Report pool exhaustion as a temporary failure
+        api.add_error_handler(sqlalchemy.exc.TimeoutError, self._poolexhausted)
 
         # Route Loading
         for route in ROUTES:
             api.add_route(f'{BASE_ENDPOINT}{route}', ROUTES[route]())
 
-        # Start WSGI server
+        # Start WSGI server on the inherited socket
         try:
-            logger.info(f'Starting bjoern server on {self._bind}:{self._port}')
-            bjoern.run(api, self._bind, self._port)
+            bind, port = self._sock.getsockname()[:2]
+            logger.info(f'Starting bjoern worker #{self._worker} on {bind}:{port}')
+
+            # Report ready and wait to be retired
+            if self._control is not None:
+                self._control.send('ready')
+                threading.Thread(target=self._drainer, name='drainer', daemon=True).start()
+
+            bjoern.server_run(self._sock, api)
         except Exception as e:
             logger.info(f'Shutting down bjoern due to: {str(e)}')
 
+        # Stop readiness checks, caches and metrics publishing
+        HealthMonitor.stop()
+        ResponseCache.stop()
+        Tokens.stop()
+        Metrics.stop()
+
         # Dispose all database connection
         with contextlib.suppress(Exception):
             engine.dispose()
+
+        # Write remaining access log records
+        AccessLog.stop()
@@ -1,7 +1,15 @@
 # Local Imports
-from .health import HealthCheck
+from .health import HealthCheck, ReadinessCheck
+from .auth import LoginController, LogoutController
+from .metrics import MetricsController
 from .account import AccountController
 from .user import UserController
+from .host import HostController, HostLookupController, HostImportController
+from .containment import HostContainmentController, HostParentController
+from .cabinet import CabinetController, CabinetTopologyController
+from .capacity import CapacityController, CapacityWhatIfController
+from .ipam import RangeController, RangeFreeController, RangeAllocateController, AddressController
+from .reachability import ReachabilityController, AddressReachabilityController
 
 # The base point for each route
 BASE_ENDPOINT ='/api'
@@ -11,4 +19,40 @@ ROUTES = {
 
     # Health Module
     '/health': HealthCheck,
+    '/health/ready': ReadinessCheck,
+
+    # Auth Module
+    '/auth/login': LoginController,
+    '/auth/logout': LogoutController,
+
+    # Metrics Module
+    '/metrics': MetricsController,
+
+    # Account Module
+    '/accounts': AccountController,
+
+    # Host Module
+    '/hosts': HostController,
+    '/hosts/lookup': HostLookupController,
+    '/hosts/import': HostImportController,
+    '/hosts/{host_id:int}/containment': HostContainmentController,
+    '/hosts/{host_id:int}/parent': HostParentController,
+
+    # Cabinet Module
+    '/cabinets': CabinetController,
+    '/cabinets/{cabinet_id:int}/topology': CabinetTopologyController,
+
+    # Capacity Module
+    '/capacity': CapacityController,
+    '/capacity/whatif': CapacityWhatIfController,
+
+    # IPAM Module
+    '/ranges': RangeController,
+    '/ranges/{range_id:int}/free': RangeFreeController,
+    '/ranges/{range_id:int}/allocate': RangeAllocateController,
+    '/addresses/{address}': AddressController,
+
+    # Reachability Module
+    '/reachability': ReachabilityController,
+    '/addresses/{address}/reachability': AddressReachabilityController,
 }
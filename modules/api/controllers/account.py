@@ -1,10 +1,10 @@
 # Third-party Imports
 import falcon
 from loguru import logger
-from passlib.hash import pbkdf2_sha256
 from sqlalchemy.exc import SQLAlchemyError
 
 # Local Imports
+from shared.hashing import PasswordHasher, HashingUnavailable
 from shared.models import Account, User
 
 
@@ -15,44 +15,56 @@ class AccountController(object):
     Args:
         object (class): The base native object class.
     """
+    # Request body schemas
+    schemas = {
+        'POST': {
+            'type': 'object',
+            'properties': {
+                'name': {'type': 'string', 'minLength': 1, 'maxLength': 255},
+                'username': {'type': 'string', 'minLength': 1, 'maxLength': 16},
+                'password': {'type': 'string', 'minLength': 1}
+            },
+            'required': ['name', 'username', 'password']
+        }
+    }
+
     def on_post(self, req, resp):
         """
         Handle POST requests.
         """
-        account_name = req.media.get('name')
-        username = req.media.get('username')
-        password = req.media.get('password')
-
-        # Check if parameters not empty
-        if None in (account_name, username, password):
-            raise falcon.HTTPBadRequest('Bad Request', 'Missing body parameters.')
+        account_name = req.media['name']
+        username = req.media['username']
+        password = req.media['password']
 
-        # Hash user password
-        hashed = pbkdf2_sha256.encrypt(password, rounds=200000, salt_size=16)
+        # Hash user password off the request loop
+        try:
+            hashed = PasswordHasher.hash(password)
+        except HashingUnavailable as e:
+            raise falcon.HTTPServiceUnavailable('Service Unavailable', str(e), retry_after=1)
 
         # Create account
         account = Account(name=account_name)
-        self.db_conn.add(account)
+        req.context.session.add(account)
 
         # Attempt database changes commit
         try:
             # Create Account
-            self.db_conn.commit()
+            req.context.session.commit()
 
             # Now create main user for account
-            user = User(account_id=account.account_id, username=username, password=hashed)
-            self.db_conn.add(user)
+            user = User(account_id=account.id, username=username, password=hashed)
+            req.context.session.add(user)
 
-            self.db_conn.commit()
+            req.context.session.commit()
 
         except SQLAlchemyError as e:
 
             # Remove Changes
-            self.db_conn.rollback()
+            req.context.session.rollback()
 
             # Send error
             logger.error(f'Database Error: (Code: {e.orig.args[0]} Message: {e.orig.args[1]})')
             raise falcon.HTTPInternalServerError('Internal Server Error', 'An error ocurred while communicating with the database.')
 
         resp.media = {'success': 'account_created'}
-        resp.status_code = falcon.HTTP_201
+        resp.status = falcon.HTTP_201
@@ -0,0 +1,101 @@
+# Third-Party
+import falcon
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+
+# Local Imports
+from shared.hashing import PasswordHasher, HashingUnavailable
+from shared.models import User
+from shared.tokens import Tokens
+
+
+class LoginController(object):
+    """
+    Represents the Login REST resource, exchanging a username and
+    password for an access token.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Reachable without a token
+    auth = False
+
+    # Request body schemas
+    schemas = {
+        'POST': {
+            'type': 'object',
+            'properties': {
+                'username': {'type': 'string', 'minLength': 1, 'maxLength': 16},
+                'password': {'type': 'string', 'minLength': 1}
+            },
+            'required': ['username', 'password']
+        }
+    }
+
+    def on_post(self, req, resp):
+        """
+        Handles POST requests by verifying the credentials and issuing a token.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+        """
+        user = req.context.session.query(User.id, User.account_id, User.password).filter(
+            User.username == req.media['username']).first()
+
+        # Return the connection to the pool while hashing
+        req.context.session.close()
+
+        # Verify on the hasher process, unknown users too, so they take as long to reject
+        try:
+            valid = PasswordHasher.verify(req.media['password'], user.password if user is not None else None)
+        except HashingUnavailable as e:
+            raise falcon.HTTPServiceUnavailable('Service Unavailable', str(e), retry_after=1)
+
+        if not valid:
+            raise falcon.HTTPUnauthorized('Unauthorized', 'Invalid username or password.', challenges=['Bearer'])
+
+        token, expires = Tokens.issue(user.id, user.account_id)
+
+        resp.media = {'token': token, 'expires': expires}
+        resp.status = falcon.HTTP_200
+
+
+class LogoutController(object):
+    """
+    Represents the Logout REST resource, revoking the token used
+    to authenticate the request.
+
+    Args:
+        object (class): Base native object class.
+    """
+
+    def on_post(self, req, resp):
+        """
+        Handles POST requests by revoking the request token.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+        """
+        claims = req.context.get('token')
+
+        # Only available with authentication enabled
+        if claims is None:
+            raise falcon.HTTPUnauthorized('Unauthorized', 'Missing access token.', challenges=['Bearer'])
+
+        try:
+            Tokens.revoke(req.context.session, claims)
+            req.context.session.commit()
+
+        except SQLAlchemyError as e:
+
+            # Rollback Changes
+            req.context.session.rollback()
+
+            logger.error(f'Database Error: {str(e)}')
+
+            # Raise error
+            raise falcon.HTTPInternalServerError('Internal Server Error', 'An error ocurred while communicating with the database.')
+
+        resp.status = falcon.HTTP_204
@@ -0,0 +1,147 @@
+# Third-Party
+import falcon
+from sqlalchemy.orm import selectinload
+
+# Local Imports
+from shared import ipam, serialization
+from shared.models import Cabinet, Host, HostCabinet
+from .host import GENERATION, HostController
+from ..middleware import DatabaseConnectionMiddleware
+
+
+class CabinetController(object):
+    """
+    Represents the Cabinet REST resource.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Columns returned by the cabinet listing
+    COLUMNS = (Cabinet.id, Cabinet.name, Cabinet.height)
+
+    def on_get(self, req, resp):
+        """
+        Handles GET requests by listing the cabinets.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+        """
+        rows = req.context.session.query(*self.COLUMNS).order_by(Cabinet.id).all()
+
+        resp.data = b'{"cabinets":' + serialization.rows([column.key for column in self.COLUMNS], rows) + b'}'
+        resp.content_type = falcon.MEDIA_JSON
+        resp.status = falcon.HTTP_200
+
+
+class CabinetTopologyController(object):
+    """
+    Represents the Cabinet topology REST resource, the tree of hosts
+    racked in a cabinet, their guests and every IP address assigned.
+
+    Hosts are loaded in batches, each with its guests and addresses
+    eagerly loaded by one query per tree level, so the number of
+    queries does not depend on the number of hosts in a batch.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Generation counters the topology depends on, for the response cache
+    cache = (GENERATION, ipam.GENERATION)
+
+    # Host attributes included in the tree
+    FIELDS = tuple(column.key for column in HostController.COLUMNS)
+
+    # Guest levels below the racked hosts, containers in virtual machines included
+    DEPTH = 2
+
+    # Number of racked hosts loaded per batch
+    BATCH_SIZE = 500
+
+    @classmethod
+    def _options(cls):
+        """
+        Builds the eager loading options for the whole tree.
+
+        Returns:
+            list: The query options, one per loaded relationship.
+        """
+        options, path = [selectinload(Host.addresses)], None
+
+        for _ in range(cls.DEPTH):
+            path = selectinload(Host.guests) if path is None else path.selectinload(Host.guests)
+            options.append(path.selectinload(Host.addresses))
+
+        return options
+
+    @classmethod
+    def _node(cls, host, depth):
+        """
+        Converts a host and its guests to a tree node.
+
+        Args:
+            host (Host): The host, with its relationships loaded.
+            depth (int): The number of guest levels left to include.
+
+        Returns:
+            dict: The tree node.
+        """
+        node = {field: getattr(host, field) for field in cls.FIELDS}
+        node['addresses'] = [address.address for address in host.addresses]
+
+        if depth:
+            node['guests'] = [cls._node(guest, depth - 1) for guest in host.guests]
+
+        return node
+
+    def _stream(self, session, cabinet):
+        """
+        Encodes the cabinet tree as a JSON document, one chunk per batch of racked hosts.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            cabinet (tuple): The cabinet columns.
+
+        Yields:
+            bytes: The encoded response chunks.
+        """
+        query = session.query(Host).join(HostCabinet, HostCabinet.host_id == Host.id).filter(
+            HostCabinet.cabinet_id == cabinet.id).options(*self._options()).order_by(Host.id)
+
+        yield b'{"cabinet":' + serialization.row(cabinet.keys(), cabinet) + b',"hosts":['
+
+        after, first = 0, True
+        while True:
+            hosts = query.filter(Host.id > after).limit(self.BATCH_SIZE).all()
+
+            if hosts:
+                nodes = [self._node(host, self.DEPTH) for host in hosts]
+                yield (b'' if first else b',') + serialization.dumps(nodes)[1:-1]
+                after, first = hosts[-1].id, False
+
+            # Keep a single batch of instances in the session
+            session.expunge_all()
+
+            if len(hosts) < self.BATCH_SIZE:
+                break
+
+        yield b']}'
+
+    def on_get(self, req, resp, cabinet_id):
+        """
+        Handles GET requests by streaming the cabinet topology.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+            cabinet_id (int): The cabinet id.
+        """
+        cabinet = req.context.session.query(*CabinetController.COLUMNS).filter(Cabinet.id == cabinet_id).first()
+
+        if cabinet is None:
+            raise falcon.HTTPNotFound()
+
+        # Stream response
+        resp.content_type = falcon.MEDIA_JSON
+        resp.stream = DatabaseConnectionMiddleware.stream(req, self._stream(req.context.session, cabinet))
+        resp.status = falcon.HTTP_200
@@ -0,0 +1,119 @@
+# Third-Party
+import falcon
+
+# Local Imports
+from shared import capacity
+from .host import GENERATION, HOST_TYPES
+
+
+class CapacityController(object):
+    """
+    Represents the Capacity REST resource, the resources of the hosts
+    per type, account or cabinet, and the resources allocated and
+    free in each cabinet.
+
+    Reports are read from the summaries maintained along with host
+    writes, so they never scan the host table.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Generation counters the summaries depend on, for the response cache
+    cache = (GENERATION,)
+
+    @staticmethod
+    def _dimension(req):
+        """
+        Reads the requested summary dimension.
+
+        Args:
+            req ([type]): The request object.
+
+        Raises:
+            falcon.HTTPBadRequest: On unknown dimensions.
+
+        Returns:
+            str: The summary dimension, 'type' by default.
+        """
+        dimension = req.get_param('by', default='type')
+
+        if dimension not in capacity.DIMENSIONS:
+            raise falcon.HTTPBadRequest('Bad Request', f'Capacity may be grouped by {", ".join(capacity.DIMENSIONS)}.')
+
+        return dimension
+
+    def on_get(self, req, resp):
+        """
+        Handles GET requests by reporting the capacity summary.
+
+        Query parameters:
+            by (str): 'type', 'account' or 'cabinet'.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+        """
+        dimension = self._dimension(req)
+
+        resp.media = {'by': dimension, 'capacity': capacity.report(dimension, capacity.totals(req.context.session, dimension))}
+        resp.status = falcon.HTTP_200
+
+
+class CapacityWhatIfController(object):
+    """
+    Represents the Capacity what-if REST resource, reporting the
+    capacity summary as it would be with some more hosts.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Request body schemas
+    schemas = {
+        'POST': {
+            'type': 'object',
+            'properties': {
+                'by': {'type': 'string', 'enum': list(capacity.DIMENSIONS), 'default': 'type'},
+                'hosts': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'type': {'type': 'string', 'enum': list(HOST_TYPES)},
+                            'cpucores': {'type': ['integer', 'null'], 'minimum': 0},
+                            'ram': {'type': ['integer', 'null'], 'minimum': 0},
+                            'disk_size': {'type': ['integer', 'null'], 'minimum': 0},
+                            'account_id': {'type': ['integer', 'null'], 'minimum': 0},
+                            'cabinet_id': {'type': ['integer', 'null'], 'minimum': 0}
+                        },
+                        'required': ['type']
+                    }
+                }
+            },
+            'required': ['hosts']
+        }
+    }
+
+    def on_post(self, req, resp):
+        """
+        Handles POST requests by projecting the proposed hosts onto
+        the capacity summary. Cabinet projections count physical hosts
+        as capacity and guests as allocated in their cabinet.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+        """
+        dimension = req.media['by']
+        current = capacity.totals(req.context.session, dimension)
+
+        # Computed without the database
+        req.context.session.close()
+
+        rows = capacity.report(dimension, current, capacity.project(req.media['hosts'], dimension))
+
+        if dimension == 'cabinet':
+            for row in rows:
+                row['fits'] = all(value >= 0 for value in row['free'].values())
+
+        resp.media = {'by': dimension, 'capacity': rows}
+        resp.status = falcon.HTTP_200
@@ -0,0 +1,191 @@
+# Third-Party
+import falcon
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+
+# Local Imports
+from shared import capacity, containment, generations, serialization
+from shared.models import Host, ContentorizedHosts
+from .host import GENERATION, HostController
+
+
+class HostContainmentController(object):
+    """
+    Represents the Host containment REST resource: the hosts a host
+    runs on, down to the physical one, and every guest running on it.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Generation counters the containment depends on, for the response cache
+    cache = (GENERATION,)
+
+    def on_get(self, req, resp, host_id):
+        """
+        Handles GET requests by retrieving the host ancestors and descendants.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+            host_id (int): The host id.
+        """
+        session = req.context.session
+        host = session.query(*HostController.COLUMNS).filter(Host.id == host_id).first()
+
+        if host is None:
+            raise falcon.HTTPNotFound()
+
+        names = [column.key for column in HostController.COLUMNS] + ['depth']
+        ancestors = containment.ancestors(session, host_id, *HostController.COLUMNS)
+        descendants = containment.descendants(session, host_id, *HostController.COLUMNS)
+
+        # The farthest ancestor is the physical host
+        physical = ancestors[-1].id if ancestors else host.id
+
+        resp.data = (
+            b'{"host":' + serialization.row(host.keys(), host) +
+            b',"physical_id":' + serialization.dumps(physical) +
+            b',"ancestors":' + serialization.rows(names, ancestors) +
+            b',"descendants":' + serialization.rows(names, descendants) + b'}')
+        resp.content_type = falcon.MEDIA_JSON
+        resp.status = falcon.HTTP_200
+
+
+class HostParentController(object):
+    """
+    Represents the Host parent REST resource, the host a virtual
+    machine or container runs on.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Request body schemas
+    schemas = {
+        'PUT': {
+            'type': 'object',
+            'properties': {
+                'parent_id': {'type': 'integer', 'minimum': 0}
+            },
+            'required': ['parent_id']
+        }
+    }
+
+    @staticmethod
+    def _guest(session, host_id):
+        """
+        Retrieves the host attributes counted in the capacity summaries.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            host_id (int): The host id.
+
+        Returns:
+            dict: The host attributes, by host id.
+        """
+        host = session.query(Host.type, Host.account_id, *(getattr(Host, resource) for resource in capacity.RESOURCES)).filter(
+            Host.id == host_id).first()
+
+        return {host_id: host._asdict()}
+
+    @classmethod
+    def _unlink(cls, session, host_id, delta):
+        """
+        Removes the link to the current parent of a host.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            host_id (int): The host id.
+            delta (CapacityDelta): The capacity changes, releasing the host resources.
+
+        Returns:
+            bool: Whether the host had a parent.
+        """
+        parents = [row[0] for row in session.query(ContentorizedHosts.bm_id).filter(
+            ContentorizedHosts.virt_id == host_id)]
+
+        for parent in parents:
+            containment.unlink(session, parent, host_id)
+
+        if parents:
+            delta.guests(session, [(parent, host_id) for parent in parents], cls._guest(session, host_id), sign=-1)
+
+        return bool(parents)
+
+    @staticmethod
+    def _commit(session):
+        """
+        Commits the containment changes.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+
+        Raises:
+            falcon.HTTPInternalServerError: If the transaction fails.
+        """
+        generations.bump(session, GENERATION)
+
+        try:
+            session.commit()
+
+        except SQLAlchemyError as e:
+
+            # Rollback Changes
+            session.rollback()
+
+            logger.error(f'Database Error: {str(e)}')
+
+            # Raise error
+            raise falcon.HTTPInternalServerError('Internal Server Error', 'An error ocurred while communicating with the database.')
+
+    def on_put(self, req, resp, host_id):
+        """
+        Handles PUT requests by moving the host onto another host.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+            host_id (int): The host id.
+        """
+        session = req.context.session
+        parent_id = req.media['parent_id']
+
+        if session.query(Host.id).filter(Host.id.in_((host_id, parent_id))).count() != len({host_id, parent_id}):
+            raise falcon.HTTPNotFound()
+
+        delta = capacity.CapacityDelta()
+        self._unlink(session, host_id, delta)
+
+        try:
+            containment.link(session, [(parent_id, host_id)])
+
+        except containment.ContainmentCycle as e:
+            session.rollback()
+            raise falcon.HTTPConflict('Conflict', str(e))
+
+        delta.guests(session, [(parent_id, host_id)], self._guest(session, host_id))
+        delta.apply(session)
+
+        self._commit(session)
+
+        resp.media = {'host_id': host_id, 'parent_id': parent_id}
+        resp.status = falcon.HTTP_200
+
+    def on_delete(self, req, resp, host_id):
+        """
+        Handles DELETE requests by detaching the host from its parent.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+            host_id (int): The host id.
+        """
+        delta = capacity.CapacityDelta()
+
+        if not self._unlink(req.context.session, host_id, delta):
+            raise falcon.HTTPNotFound()
+
+        delta.apply(req.context.session)
+
+        self._commit(req.context.session)
+
+        resp.status = falcon.HTTP_204
@@ -1,16 +1,62 @@
-import sys
-
-import ujson
+# Third-Party
 import falcon
-from loguru import logger
 
-@logger.catch
+# Local Imports
+from shared.health import HealthMonitor
+
+
 class HealthCheck(object):
+    """
+    Represents the liveness Health REST resource. Answers with a
+    constant response and no database session, so it stays cheap
+    to poll.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Does not use the database, reachable without a token
+    database = False
+    auth = False
+
+    # Serialized once for every request
+    BODY = b'{"success":true,"message":"OK"}'
+
+    def on_get(self, req, resp):
+        """
+        Handles GET requests by reporting the worker as alive.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+        """
+        resp.data = self.BODY
+        resp.content_type = falcon.MEDIA_JSON
+        resp.status = falcon.HTTP_200
+
+
+class ReadinessCheck(object):
+    """
+    Represents the readiness Health REST resource, reporting the
+    last snapshot taken by the background health monitor.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Does not use the database, reachable without a token
+    database = False
+    auth = False
+
     def on_get(self, req, resp):
-        try:
-            resp.body = ujson.dumps({"success": True, "message": "A tua tia de 4"})
-            resp.status = falcon.HTTP_200
-        except Exception as e:
-            logger.warning(f"HEALTHCHECK | {e}")
-            resp.body = ujson.dumps({"success": False})
-            resp.status = falcon.HTTP_500
+        """
+        Handles GET requests by reporting database connectivity,
+        pool saturation, worker count and queue depths.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+        """
+        ready, body = HealthMonitor.snapshot()
+
+        resp.data = body
+        resp.content_type = falcon.MEDIA_JSON
+        resp.status = falcon.HTTP_200 if ready else falcon.HTTP_503
@@ -4,9 +4,29 @@ from loguru import logger
 from sqlalchemy.exc import SQLAlchemyError
 
 # Batteries
+import ipaddress
 
 # Local Imports
-from shared.models import Host
+from shared import capacity, containment, generations, ipam, serialization
+from shared.models import Cabinet, Host, HostCabinet, IpAddress
+from shared.sharedcache import SharedCache
+from shared.utils import iterlines
+from ..middleware import DatabaseConnectionMiddleware
+
+# Valid host types
+HOST_TYPES = ('bm', 'vm', 'ct')
+
+# Content types accepted as newline delimited JSON
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonlines')
+
+# Placeholder for NDJSON lines which could not be decoded
+MALFORMED = object()
+
+# Generation counter bumped by host writes
+GENERATION = 'host'
+
+# Errors failing an import transaction
+IMPORT_ERRORS = (SQLAlchemyError, ipam.AddressUnavailable, containment.ContainmentCycle)
 
 
 class HostController(object):
@@ -16,14 +36,159 @@ class HostController(object):
     Args:
         object (class): Base native object class.
     """
+    # Generation counters the listing depends on, for the response cache
+    cache = (GENERATION,)
+
+    # Request body schemas
+    schemas = {
+        'POST': {
+            'type': 'object',
+            'properties': {
+                'type': {'type': 'string', 'enum': list(HOST_TYPES)},
+                'account_id': {'type': 'integer', 'minimum': 0}
+            },
+            'required': ['type']
+        }
+    }
+
+    # Columns returned by the host listing
+    COLUMNS = (Host.id, Host.type, Host.hostname, Host.cpucores, Host.ram, Host.disk_size, Host.account_id)
+
+    # Integer columns which may be filtered by range
+    RANGE_FILTERS = {'cpucores': Host.cpucores, 'ram': Host.ram, 'disk_size': Host.disk_size}
+
+    # Number of rows fetched per query while streaming
+    BATCH_SIZE = 1000
+
+    def _query(self, req):
+        """
+        Builds the filtered host listing query.
+
+        Args:
+            req ([type]): The request object.
+
+        Raises:
+            falcon.HTTPBadRequest: On invalid filters.
+
+        Returns:
+            sqlalchemy.orm.Query: The host listing query, without ordering or keyset.
+        """
+        query = req.context.session.query(*self.COLUMNS)
+
+        # Filter by host type
+        host_type = req.get_param('type')
+        if host_type is not None:
+            if host_type.lower() not in HOST_TYPES:
+                raise falcon.HTTPBadRequest('Bad Request', 'Invalid host type.')
+            query = query.filter(Host.type == host_type.lower())
+
+        # Filter by hostname prefix
+        hostname = req.get_param('hostname')
+        if hostname:
+            query = query.filter(Host.hostname.startswith(hostname, autoescape=True))
+
+        # Filter by integer ranges
+        for name, column in self.RANGE_FILTERS.items():
+            minimum = req.get_param_as_int(f'{name}_min', min_value=0)
+            maximum = req.get_param_as_int(f'{name}_max', min_value=0)
+
+            if minimum is not None:
+                query = query.filter(column >= minimum)
+
+            if maximum is not None:
+                query = query.filter(column <= maximum)
+
+        return query
+
+    def _batches(self, query, after, limit):
+        """
+        Yields the query rows in batches, using keyset pagination on
+        the host id, so only one batch of rows is held in memory at a time.
+
+        Args:
+            query (sqlalchemy.orm.Query): The host listing query.
+            after (int): Only hosts with an id greater than this are returned.
+            limit (int): The maximum number of rows, None for all.
+
+        Yields:
+            list: Each non empty batch of host rows.
+        """
+        sent = 0
+
+        while limit is None or sent < limit:
+
+            # Fetch next batch after the last seen id
+            size = self.BATCH_SIZE if limit is None else min(self.BATCH_SIZE, limit - sent)
+            rows = query.filter(Host.id > after).order_by(Host.id).limit(size).all()
+
+            if rows:
+                yield rows
+
+            # Stop on the last batch
+            if len(rows) < size:
+                return
+
+            sent += len(rows)
+            after = rows[-1].id
+
+    def _stream(self, batches, limit, ndjson):
+        """
+        Encodes the host rows as a JSON document or as NDJSON,
+        one chunk per batch.
+
+        Args:
+            batches (generator): The host row batches.
+            limit (int): The requested page size, None for all.
+            ndjson (bool): Whether to encode as NDJSON.
+
+        Yields:
+            bytes: The encoded response chunks.
+        """
+        names = [column.key for column in self.COLUMNS]
+
+        # One host per line
+        if ndjson:
+            for rows in batches:
+                yield b''.join(serialization.row(names, row) + b'\n' for row in rows)
+            return
+
+        # JSON document with the cursor for the next page, each batch
+        # encoded as a single array without its brackets
+        yield b'{"hosts":['
+
+        last, count = None, 0
+        for rows in batches:
+            yield (b',' if count else b'') + serialization.rows(names, rows)[1:-1]
+            last, count = rows[-1].id, count + len(rows)
+
+        following = last if limit is not None and count == limit else None
+        yield b'],"next":' + serialization.dumps(following) + b'}'
+
     def on_get(self, req, resp):
         """
-        Handles GET requests by retrieving hosts.
-        
+        Handles GET requests by streaming the filtered host listing.
+
+        Query parameters:
+            after (int): Keyset cursor, only hosts with a greater id are listed.
+            limit (int): Page size, all matching hosts are listed if absent.
+            type (str): Host type.
+            hostname (str): Hostname prefix.
+            cpucores_min, cpucores_max, ram_min, ram_max, disk_size_min, disk_size_max (int): Ranges.
+            format (str): 'ndjson' for newline delimited JSON, also chosen by the Accept header.
+
         Args:
             req ([type]): The request object.
             resp ([type]): The response object.
         """
+        after = req.get_param_as_int('after', min_value=0, default=0)
+        limit = req.get_param_as_int('limit', min_value=1)
+        ndjson = req.get_param('format') == 'ndjson' or any(
+            content_type in (req.accept or '') for content_type in NDJSON_TYPES)
+
+        # Stream response
+        resp.content_type = NDJSON_TYPES[0] if ndjson else falcon.MEDIA_JSON
+        resp.stream = DatabaseConnectionMiddleware.stream(
+            req, self._stream(self._batches(self._query(req), after, limit), limit, ndjson))
         resp.status = falcon.HTTP_200
 
     def on_post(self, req, resp):
@@ -34,33 +199,506 @@ class HostController(object):
             req ([type]): The request object.
             resp ([type]): The response object.
         """
-        # Check for request body
-        if not req.media:
-            raise falcon.HTTPBadRequest('Bad Request', 'Could not find request body')
-
         # Retrieve data from request body
-        host_type = req.media.get('type')
-
-        # Validate mandatory data
-        if not host_type or host_type.lower() not in ('bm', 'vm', 'ct'):
-            raise falcon.HTTPConflict('Conflict', 'Invalid host type')
+        host = {'type': req.media['type'], 'account_id': req.media.get('account_id')}
 
         # Create new host
-        self.db_conn.add(Host(type=host_type))
+        req.context.session.add(Host(**host))
+        generations.bump(req.context.session, GENERATION)
+
+        # Count it in the capacity summaries
+        delta = capacity.CapacityDelta()
+        delta.host(host)
+        delta.apply(req.context.session)
 
         # Attempt database changes commit
         try:
-            self.db_conn.commit()
+            req.context.session.commit()
 
         except SQLAlchemyError as e:
 
             # Rollback Changes
-            self.db_conn.rollback()
+            req.context.session.rollback()
 
             logger.error(f'Database Error: (Code: {e.orig.args[0]} Message: {e.orig.args[1]})')
 
             # Raise error
             raise falcon.HTTPInternalServerError('Internal Server Error', 'An error ocurred while communicating with the database.')
         
-        resp.media = {'Message': 'Account created successfuly'}
-        resp.status_code = falcon.HTTP_201
+        resp.media = {'success': 'host_created'}
+        resp.status = falcon.HTTP_201
+
+
+class HostLookupController(object):
+    """
+    Represents the Host lookup REST resource, finding a host by its
+    exact hostname or by an assigned IP address.
+
+    Results are kept in the cache shared by all workers, including
+    misses, and invalidated by host and IPAM writes.
+
+    Args:
+        object (class): Base native object class.
+    """
+
+    def _find(self, session, hostname, address):
+        """
+        Retrieves a host from the database.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            hostname (str): The exact hostname, None to look up by address.
+            address (str): The IP address.
+
+        Returns:
+            bytes: The encoded response body, empty if no host was found.
+        """
+        query = session.query(*HostController.COLUMNS)
+
+        if hostname is not None:
+            row = query.filter(Host.hostname == hostname).first()
+        else:
+            row = query.join(IpAddress, IpAddress.host_id == Host.id).filter(
+                IpAddress.packed == ipam.pack(address)).first()
+
+        if row is None:
+            return b''
+
+        return b'{"host":' + serialization.row([column.key for column in HostController.COLUMNS], row) + b'}'
+
+    def on_get(self, req, resp):
+        """
+        Handles GET requests by looking up a host.
+
+        Query parameters:
+            hostname (str): The exact hostname.
+            address (str): An IP address assigned to the host.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+        """
+        hostname = req.get_param('hostname')
+        address = req.get_param('address')
+
+        if (hostname is None) == (address is None):
+            raise falcon.HTTPBadRequest('Bad Request', 'Either hostname or address is required.')
+
+        # Address lookups also depend on IPAM assignments
+        if hostname is not None:
+            key, namespaces = f'hostname:{hostname}', (GENERATION,)
+        else:
+            try:
+                address = str(ipaddress.ip_address(address))
+            except ValueError as e:
+                raise falcon.HTTPBadRequest('Bad Request', str(e))
+
+            key, namespaces = f'address:{address}', (GENERATION, ipam.GENERATION)
+
+        # Read stamp before data, so concurrent writes leave the entry stale
+        stamp = SharedCache.stamp(namespaces)
+        body = SharedCache.get(key, stamp)
+
+        if body is None:
+            body = self._find(req.context.session, hostname, address)
+            SharedCache.put(key, stamp, body)
+
+        if not body:
+            raise falcon.HTTPNotFound()
+
+        resp.data = body
+        resp.content_type = falcon.MEDIA_JSON
+        resp.status = falcon.HTTP_200
+
+
+class HostImportController(object):
+    """
+    Represents the bulk Host import REST resource.
+
+    Hosts are validated one by one and inserted in chunks, each
+    chunk in a single transaction. Links to cabinets, IP addresses
+    and parent hosts are inserted along with the hosts.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Number of records inserted per transaction
+    CHUNK_SIZE = 500
+
+    # Integer host attributes
+    INTEGER_FIELDS = ('cpucores', 'ram', 'disk_size')
+
+    @staticmethod
+    def _records(req):
+        """
+        Yields the records from a JSON array or NDJSON request body.
+
+        Args:
+            req ([type]): The request object.
+
+        Raises:
+            falcon.HTTPBadRequest: If the body is not a JSON array.
+
+        Yields:
+            object: Each decoded record, MALFORMED for undecodable lines.
+        """
+        # Stream NDJSON bodies line by line
+        if (req.content_type or '').split(';')[0].strip() in NDJSON_TYPES:
+            for line in iterlines(req.bounded_stream):
+
+                # Skip empty lines
+                if not line.strip():
+                    continue
+
+                try:
+                    yield serialization.loads(line)
+                except ValueError:
+                    yield MALFORMED
+
+            return
+
+        # Otherwise expect a JSON array
+        if not isinstance(req.media, list):
+            raise falcon.HTTPBadRequest('Bad Request', 'Request body must be a JSON array of hosts.')
+
+        yield from req.media
+
+    @classmethod
+    def _validate(cls, record, refs, claimed):
+        """
+        Validates an import record.
+
+        Args:
+            record (object): The import record.
+            refs (dict): The references declared by previous records.
+            claimed (set): The addresses of previous valid records, as integers.
+
+        Returns:
+            list: The validation error messages.
+        """
+        # Records must be objects
+        if record is MALFORMED:
+            return ['Malformed JSON.']
+
+        if not isinstance(record, dict):
+            return ['Record must be an object.']
+
+        errors = []
+
+        # Validate host type
+        host_type = record.get('type')
+        if not isinstance(host_type, str) or host_type.lower() not in HOST_TYPES:
+            errors.append('Invalid host type.')
+
+        # Validate hostname
+        hostname = record.get('hostname')
+        if hostname is not None and (not isinstance(hostname, str) or len(hostname) > 255):
+            errors.append('Invalid hostname.')
+
+        # Validate integer attributes
+        for field in cls.INTEGER_FIELDS + ('account_id', 'cabinet_id', 'parent_id'):
+            value = record.get(field)
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 0):
+                errors.append(f'Invalid {field}.')
+
+        # Validate references
+        ref = record.get('ref')
+        if ref is not None and (not isinstance(ref, str) or ref in refs):
+            errors.append('Invalid or duplicate ref.')
+
+        parent_ref = record.get('parent_ref')
+        if parent_ref is not None and refs.get(parent_ref) is None:
+            errors.append('Unknown parent_ref, parents must be declared and valid before their children.')
+
+        if parent_ref is not None and record.get('parent_id') is not None:
+            errors.append('Only one of parent_id or parent_ref may be given.')
+
+        # Validate IP addresses
+        addresses = record.get('addresses', [])
+        if not isinstance(addresses, list):
+            errors.append('Addresses must be an array.')
+            addresses = []
+
+        values = set()
+        for address in addresses:
+            try:
+                if not isinstance(address['address'], str):
+                    raise ValueError
+                if not isinstance(address['range_id'], int) or isinstance(address['range_id'], bool):
+                    raise ValueError
+                value = ipam.toint(address['address'])
+            except (TypeError, KeyError, ValueError):
+                errors.append(f'Invalid address {address}.')
+                continue
+
+            if value in claimed or value in values:
+                errors.append(f'Address {address["address"]} is given to more than one host.')
+            values.add(value)
+
+        # Claim the addresses of valid records
+        if not errors:
+            claimed.update(values)
+
+        return errors
+
+    @staticmethod
+    def _forget(result, record, refs, status, errors):
+        """
+        Marks a record as not imported, so it may not be referenced.
+
+        Args:
+            result (dict): The record result.
+            record (dict): The import record.
+            refs (dict): The references declared by previous records.
+            status (str): 'invalid' or 'failed'.
+            errors (list): The error messages.
+        """
+        result.pop('id', None)
+        result.update(status=status, errors=errors)
+
+        if record.get('ref') is not None:
+            refs[record['ref']] = None
+
+    def _check(self, session, chunk, refs):
+        """
+        Validates a chunk of records against the database: parent
+        hosts and cabinets must exist and addresses must be free.
+
+        Args:
+            session (sqlalchemy.orm.Session): The request database session.
+            chunk (list): The (result, record) pairs to insert.
+            refs (dict): The references declared by previous records.
+
+        Returns:
+            list: The (result, record) pairs which passed.
+        """
+        parents = {record['parent_id'] for _, record in chunk if record.get('parent_id') is not None}
+        cabinets = {record['cabinet_id'] for _, record in chunk if record.get('cabinet_id') is not None}
+
+        # Read existing parents and cabinets in a query each
+        parents = {row[0] for row in session.query(Host.id).filter(Host.id.in_(parents))} if parents else set()
+        cabinets = {row[0] for row in session.query(Cabinet.id).filter(Cabinet.id.in_(cabinets))} if cabinets else set()
+
+        passed = []
+        for result, record in chunk:
+            errors = []
+
+            if record.get('parent_id') is not None and record['parent_id'] not in parents:
+                errors.append('Unknown parent_id.')
+
+            if record.get('cabinet_id') is not None and record['cabinet_id'] not in cabinets:
+                errors.append('Unknown cabinet_id.')
+
+            # Parents declared in this chunk may have just failed
+            if record.get('parent_ref') is not None and refs.get(record['parent_ref']) is None:
+                errors.append('The parent_ref record was not imported.')
+
+            for address in record.get('addresses', []):
+                if not ipam.IPAM.free(session, address['range_id'], address['address']):
+                    errors.append(f'Address {address["address"]} is not free in range {address["range_id"]}.')
+
+            if errors:
+                self._forget(result, record, refs, 'invalid', errors)
+                continue
+
+            passed.append((result, record))
+
+        return passed
+
+    def _insert(self, session, chunk, refs):
+        """
+        Inserts a chunk of valid records in a single transaction.
+
+        Args:
+            session (sqlalchemy.orm.Session): The request database session.
+            chunk (list): The (result, record) pairs to insert.
+            refs (dict): The references declared by previous records.
+
+        Raises:
+            SQLAlchemyError: If the transaction fails.
+        """
+        # Insert hosts, retrieving their identifiers
+        hosts = [
+            {
+                'type': record['type'].lower(),
+                'hostname': record.get('hostname'),
+                'account_id': record.get('account_id'),
+                **{field: record.get(field) for field in self.INTEGER_FIELDS}
+            }
+            for _, record in chunk
+        ]
+        session.bulk_insert_mappings(Host, hosts, return_defaults=True)
+
+        # Resolve host identifiers and references
+        for (result, record), host in zip(chunk, hosts):
+            result['id'] = host['id']
+            if record.get('ref') is not None:
+                refs[record['ref']] = host['id']
+
+        # Build link rows
+        cabinets, addresses, parents = [], [], []
+        for (result, record) in chunk:
+
+            if record.get('cabinet_id') is not None:
+                cabinets.append({'cabinet_id': record['cabinet_id'], 'host_id': result['id']})
+
+            for address in record.get('addresses', []):
+                ipam.IPAM.reserve(session, address['range_id'], address['address'])
+                addresses.append({
+                    'address': str(ipaddress.ip_address(address['address'])),
+                    'packed': ipam.pack(address['address']),
+                    'range_id': address['range_id'],
+                    'host_id': result['id']
+                })
+
+            parent = record.get('parent_id')
+            if record.get('parent_ref') is not None:
+                parent = refs[record['parent_ref']]
+            if parent is not None:
+                parents.append((parent, result['id']))
+
+        # Insert links with executemany
+        session.bulk_insert_mappings(HostCabinet, cabinets)
+        session.bulk_insert_mappings(IpAddress, addresses)
+
+        # Insert containment links along with their closure rows
+        containment.link(session, parents)
+
+        # Count hosts and guest allocations in the capacity summaries
+        delta, racked = capacity.CapacityDelta(), {}
+        for (result, record), host in zip(chunk, hosts):
+            delta.host(host, record.get('cabinet_id'))
+            racked[result['id']] = (record.get('cabinet_id'), host['type'])
+
+        delta.guests(session, parents, {host['id']: host for host in hosts}, racked)
+        delta.apply(session)
+
+        # Signal cached copies
+        generations.bump(session, GENERATION)
+        if addresses:
+            generations.bump(session, ipam.GENERATION)
+
+        # Commit chunk
+        session.commit()
+
+    def _flush(self, session, chunk, refs):
+        """
+        Inserts a chunk of records, marking each result as created or failed.
+        If the chunk transaction fails, its records are inserted one by one,
+        so only the records at fault fail.
+
+        Args:
+            session (sqlalchemy.orm.Session): The request database session.
+            chunk (list): The (result, record) pairs to insert.
+            refs (dict): The references declared by previous records.
+        """
+        chunk = self._check(session, chunk, refs)
+
+        if not chunk:
+            return
+
+        try:
+            self._insert(session, chunk, refs)
+
+        except IMPORT_ERRORS as e:
+
+            # Rollback Changes
+            session.rollback()
+
+            logger.warning(f'Error while importing hosts, retrying them one by one: {str(e)}')
+
+            # Forget the identifiers of the rolled back hosts
+            for result, record in chunk:
+                result.pop('id', None)
+                if record.get('ref') is not None:
+                    refs[record['ref']] = 0
+
+            for pair in chunk:
+                self._single(session, pair, refs)
+
+            return
+
+        for result, _ in chunk:
+            result['status'] = 'created'
+
+    def _single(self, session, pair, refs):
+        """
+        Inserts a single record in its own transaction.
+
+        Args:
+            session (sqlalchemy.orm.Session): The request database session.
+            pair (tuple): The result and record to insert.
+            refs (dict): The references declared by previous records.
+        """
+        result, record = pair
+
+        if record.get('parent_ref') is not None and not refs.get(record['parent_ref']):
+            self._forget(result, record, refs, 'failed', ['The parent_ref record was not imported.'])
+            return
+
+        try:
+            self._insert(session, [pair], refs)
+
+        except IMPORT_ERRORS as e:
+
+            # Rollback Changes
+            session.rollback()
+
+            logger.error(f'Error while importing host: {str(e)}')
+
+            message = 'Database error while inserting host.' if isinstance(e, SQLAlchemyError) else str(e)
+            self._forget(result, record, refs, 'failed', [message])
+            return
+
+        result['status'] = 'created'
+
+    def on_post(self, req, resp):
+        """
+        Handles POST requests by importing hosts in bulk.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+        """
+        results, chunk, refs, claimed = [], [], {}, set()
+
+        for index, record in enumerate(self._records(req)):
+
+            # Validate record
+            errors = self._validate(record, refs, claimed)
+            result = {'index': index}
+            results.append(result)
+
+            if errors:
+                result.update(status='invalid', errors=errors)
+
+                # Invalid records may not be referenced
+                if isinstance(record, dict) and isinstance(record.get('ref'), str):
+                    refs.setdefault(record['ref'], None)
+
+                continue
+
+            # Reserve reference, it is resolved once the chunk is inserted
+            if record.get('ref') is not None:
+                refs[record['ref']] = 0
+
+            chunk.append((result, record))
+
+            # Insert full chunks
+            if len(chunk) >= self.CHUNK_SIZE:
+                self._flush(req.context.session, chunk, refs)
+                chunk = []
+
+        # Insert remaining records
+        if chunk:
+            self._flush(req.context.session, chunk, refs)
+
+        # Drop this worker's stale IPAM cache right away
+        ipam.IPAMCache.invalidate()
+
+        resp.media = {
+            'created': sum(1 for result in results if result['status'] == 'created'),
+            'failed': sum(1 for result in results if result['status'] != 'created'),
+            'results': results
+        }
+        resp.status = falcon.HTTP_200
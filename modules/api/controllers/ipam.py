@@ -0,0 +1,273 @@
+# Third-Party
+import falcon
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+
+# Local Imports
+from shared.ipam import GENERATION, IPAM, IPAMCache, RangeOverlap, RangeExhausted, AddressUnavailable, network
+from shared.models import Range
+
+
+class RangeController(object):
+    """
+    Represents the Range REST resource.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Generation counters the responses depend on, for the response cache
+    cache = (GENERATION,)
+
+    # Request body schemas, ranges are given as a CIDR network or as a start address and netmask
+    schemas = {
+        'POST': {
+            'type': 'object',
+            'properties': {
+                'network': {'type': 'string'},
+                'start_ip': {'type': 'string'},
+                'netmask': {'type': 'string'}
+            },
+            'anyOf': [{'required': ['network']}, {'required': ['start_ip', 'netmask']}]
+        }
+    }
+
+    def on_get(self, req, resp):
+        """
+        Handles GET requests by listing ranges. The listing may be
+        restricted to the range containing an address (?contains=)
+        or to the ranges overlapping a network (?overlaps=).
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+        """
+        contains = req.get_param('contains')
+        overlaps = req.get_param('overlaps')
+
+        try:
+            if contains is not None:
+                IPAMCache.refresh(req.context.session)
+                ranges = [rng for rng in (IPAMCache.containing(contains),) if rng is not None]
+
+            elif overlaps is not None:
+                ranges = [IPAM.serialize(rng) for rng in IPAM.overlapping(req.context.session, network(overlaps))]
+
+            else:
+                ranges = [IPAM.serialize(rng) for rng in req.context.session.query(*IPAM.COLUMNS).order_by(Range.first)]
+
+        except ValueError as e:
+            raise falcon.HTTPBadRequest('Bad Request', str(e))
+
+        resp.media = {'ranges': ranges}
+        resp.status = falcon.HTTP_200
+
+    def on_post(self, req, resp):
+        """
+        Handles POST requests by creating a range from a CIDR
+        'network' or from a 'start_ip' and 'netmask'.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+        """
+        # Parse network
+        try:
+            if 'network' in req.media:
+                net = network(req.media['network'])
+            else:
+                net = network(req.media['start_ip'], req.media['netmask'])
+
+        except ValueError:
+            raise falcon.HTTPBadRequest('Bad Request', 'Invalid network.')
+
+        # Create range
+        try:
+            rng = IPAM.create(req.context.session, net)
+            req.context.session.commit()
+
+        except RangeOverlap as e:
+            raise falcon.HTTPConflict('Conflict', str(e))
+
+        except SQLAlchemyError as e:
+
+            # Rollback Changes
+            req.context.session.rollback()
+
+            logger.error(f'Database Error: {str(e)}')
+
+            # Raise error
+            raise falcon.HTTPInternalServerError('Internal Server Error', 'An error ocurred while communicating with the database.')
+
+        # Drop this worker's stale cache right away
+        IPAMCache.invalidate()
+
+        resp.media = IPAM.serialize(rng)
+        resp.status = falcon.HTTP_201
+
+
+class RangeFreeController(object):
+    """
+    Represents the free addresses of a Range REST resource.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Cached until IPAM data changes
+    cache = (GENERATION,)
+
+    def on_get(self, req, resp, range_id):
+        """
+        Handles GET requests by retrieving the lowest free address of a range.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+            range_id (int): The range identifier.
+        """
+        rng = req.context.session.query(Range).get(range_id)
+
+        if rng is None:
+            raise falcon.HTTPNotFound()
+
+        address = IPAM.nextfree(req.context.session, rng)
+
+        resp.media = {'range': IPAM.serialize(rng), 'address': None if address is None else str(address)}
+        resp.status = falcon.HTTP_200
+
+
+class RangeAllocateController(object):
+    """
+    Represents the address allocation of a Range REST resource.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Largest block of addresses assigned at once, a /20 of IPv4 addresses
+    MAX_COUNT = 4096
+
+    # Request body schemas
+    schemas = {
+        'POST': {
+            'type': 'object',
+            'properties': {
+                'host_id': {'type': 'integer'},
+                'count': {'type': 'integer', 'minimum': 1, 'maximum': MAX_COUNT, 'default': 1}
+            },
+            'required': ['host_id']
+        }
+    }
+
+    def on_post(self, req, resp, range_id):
+        """
+        Handles POST requests by assigning the next free address, or
+        a block of 'count' contiguous addresses, to a host.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+            range_id (int): The range identifier.
+        """
+        host_id = req.media['host_id']
+        count = req.media['count']
+
+        rng = req.context.session.query(Range).get(range_id)
+
+        if rng is None:
+            raise falcon.HTTPNotFound()
+
+        # Allocate addresses
+        try:
+            addresses = IPAM.allocate(req.context.session, rng, host_id, count)
+            req.context.session.commit()
+
+        except RangeExhausted as e:
+            req.context.session.rollback()
+            raise falcon.HTTPConflict('Conflict', str(e))
+
+        except AddressUnavailable as e:
+            req.context.session.rollback()
+            raise falcon.HTTPServiceUnavailable('Service Unavailable', str(e), retry_after=1)
+
+        except SQLAlchemyError as e:
+
+            # Rollback Changes
+            req.context.session.rollback()
+
+            logger.error(f'Database Error: {str(e)}')
+
+            # Raise error
+            raise falcon.HTTPInternalServerError('Internal Server Error', 'An error ocurred while communicating with the database.')
+
+        # Drop this worker's stale cache right away
+        IPAMCache.invalidate()
+
+        resp.media = {'range_id': range_id, 'host_id': host_id, 'addresses': [str(address) for address in addresses]}
+        resp.status = falcon.HTTP_201
+
+
+class AddressController(object):
+    """
+    Represents the IP Address REST resource.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Cached until IPAM data changes
+    cache = (GENERATION,)
+
+    def on_get(self, req, resp, address):
+        """
+        Handles GET requests by retrieving the range and host of an address.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+            address (str): The IP address.
+        """
+        IPAMCache.refresh(req.context.session)
+
+        try:
+            resp.media = {
+                'address': address,
+                'range': IPAMCache.containing(address),
+                'host_id': IPAMCache.host(address)
+            }
+
+        except ValueError as e:
+            raise falcon.HTTPBadRequest('Bad Request', str(e))
+
+        resp.status = falcon.HTTP_200
+
+    def on_delete(self, req, resp, address):
+        """
+        Handles DELETE requests by returning an address to its range.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+            address (str): The IP address.
+        """
+        try:
+            released = IPAM.release(req.context.session, address)
+            req.context.session.commit()
+
+        except ValueError as e:
+            raise falcon.HTTPBadRequest('Bad Request', str(e))
+
+        except SQLAlchemyError as e:
+
+            # Rollback Changes
+            req.context.session.rollback()
+
+            logger.error(f'Database Error: {str(e)}')
+
+            # Raise error
+            raise falcon.HTTPInternalServerError('Internal Server Error', 'An error ocurred while communicating with the database.')
+
+        if not released:
+            raise falcon.HTTPNotFound()
+
+        # Drop this worker's stale cache right away
+        IPAMCache.invalidate()
+
+        resp.status = falcon.HTTP_204
@@ -0,0 +1,30 @@
+# Third-Party
+import falcon
+
+# Local Imports
+from shared.metrics import Metrics
+
+
+class MetricsController(object):
+    """
+    Represents the Metrics REST resource.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Does not use the database, reachable without a token
+    database = False
+    auth = False
+
+    def on_get(self, req, resp):
+        """
+        Handles GET requests by exposing the metrics of every API
+        worker in the Prometheus text format.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+        """
+        resp.body = Metrics.render()
+        resp.content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        resp.status = falcon.HTTP_200
@@ -0,0 +1,87 @@
+# Third-Party
+import falcon
+
+# Batteries
+import ipaddress
+
+# Local Imports
+from shared import reachability, serialization
+from shared.models import Reachability
+
+
+class ReachabilityController(object):
+    """
+    Represents the Reachability REST resource, the latest probe
+    result of every assigned address.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Cached until the next sweep is recorded
+    cache = (reachability.GENERATION,)
+
+    # Columns returned by the reachability listing
+    COLUMNS = (
+        Reachability.address, Reachability.up, Reachability.rtt, Reachability.method,
+        Reachability.checked, Reachability.changed)
+
+    def on_get(self, req, resp):
+        """
+        Handles GET requests by listing the latest probe results.
+
+        Query parameters:
+            up (bool): Only list reachable, or unreachable, addresses.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+        """
+        query = req.context.session.query(*self.COLUMNS)
+
+        up = req.get_param_as_bool('up')
+        if up is not None:
+            query = query.filter(Reachability.up == up)
+
+        rows = query.order_by(Reachability.address).all()
+
+        resp.data = b'{"addresses":' + serialization.rows([column.key for column in self.COLUMNS], rows) + b'}'
+        resp.content_type = falcon.MEDIA_JSON
+        resp.status = falcon.HTTP_200
+
+
+class AddressReachabilityController(object):
+    """
+    Represents the IP Address reachability REST resource, the latest
+    probe result of an address and its history.
+
+    Args:
+        object (class): Base native object class.
+    """
+    # Cached until the next sweep is recorded
+    cache = (reachability.GENERATION,)
+
+    def on_get(self, req, resp, address):
+        """
+        Handles GET requests by retrieving the reachability of an address.
+
+        Args:
+            req ([type]): The request object.
+            resp ([type]): The response object.
+            address (str): The IP address.
+        """
+        try:
+            address = str(ipaddress.ip_address(address))
+        except ValueError as e:
+            raise falcon.HTTPBadRequest('Bad Request', str(e))
+
+        row = req.context.session.query(*ReachabilityController.COLUMNS, Reachability.history).filter(
+            Reachability.address == address).first()
+
+        if row is None:
+            raise falcon.HTTPNotFound()
+
+        resp.media = {
+            **{column.key: getattr(row, column.key) for column in ReachabilityController.COLUMNS},
+            'history': reachability.decode(row.history)
+        }
+        resp.status = falcon.HTTP_200
@@ -1,10 +1,10 @@
 # Third-party Imports
 import falcon
 from loguru import logger
-from passlib.hash import pbkdf2_sha256
 from sqlalchemy.exc import SQLAlchemyError
 
 # Local Imports
+from shared.hashing import PasswordHasher, HashingUnavailable
 from shared.models import User
 
 
@@ -15,34 +15,45 @@ class UserController(object):
     Args:
         object (class): Base native object class.
     """
+    # Request body schemas
+    schemas = {
+        'POST': {
+            'type': 'object',
+            'properties': {
+                'username': {'type': 'string', 'minLength': 1, 'maxLength': 16},
+                'password': {'type': 'string', 'minLength': 1}
+            },
+            'required': ['username', 'password']
+        }
+    }
+
     def on_post(self,req,resp):
         """
         Handle POST requests.
         """
-        username = req.media.get('username')
-        password = req.media.get('password')
-
-        # Check if parameters not empty
-        if None in (username, password):
-            raise falcon.HTTPBadRequest('Bad Request', 'Invalid Parameters')
+        username = req.media['username']
+        password = req.media['password']
 
-        # Hash user password
-        hashed = pbkdf2_sha256.encrypt(password, rounds=200000, salt_size=16)
+        # Hash user password off the request loop
+        try:
+            hashed = PasswordHasher.hash(password)
+        except HashingUnavailable as e:
+            raise falcon.HTTPServiceUnavailable('Service Unavailable', str(e), retry_after=1)
 
         # Now create main user for account
         user = User(username=username, password=hashed)
 
-        self.db_conn.add(user)
+        req.context.session.add(user)
 
         # Attempt database changes commit
         try:
             # Create User
-            self.db_conn.commit()
+            req.context.session.commit()
 
         except SQLAlchemyError as e:
 
             # Rollback Changes
-            self.db_conn.rollback()
+            req.context.session.rollback()
 
             # Send error
             logger.error(f'Database Error: (Code: {e.orig.args[0]} Message: {e.orig.args[1]})')
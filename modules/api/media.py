@@ -0,0 +1,55 @@
+# Third-Party
+import falcon
+from falcon.media import BaseHandler
+
+# Local Imports
+from shared import serialization
+
+
+class JSONHandler(BaseHandler):
+    """
+    JSON media handler for request and response bodies, using
+    the fastest JSON library available.
+
+    Args:
+        falcon.media.BaseHandler (class): Falcon media handler class.
+    """
+
+    def deserialize(self, stream, content_type, content_length):
+        """
+        Decodes a JSON request body.
+
+        Args:
+            stream (io.BufferedReader): The request body stream.
+            content_type (str): The request content type.
+            content_length (int): The request body length.
+
+        Raises:
+            falcon.HTTPBadRequest: If the body is not valid JSON.
+
+        Returns:
+            object: The decoded body.
+        """
+        try:
+            return serialization.loads(stream.read())
+        except ValueError as e:
+            raise falcon.HTTPBadRequest('Invalid JSON', f'Could not parse JSON body - {str(e)}')
+
+    def serialize(self, media, content_type):
+        """
+        Encodes a JSON response body.
+
+        Args:
+            media (object): The response media.
+            content_type (str): The response content type.
+
+        Returns:
+            bytes: The encoded body.
+        """
+        return serialization.dumps(media)
+
+
+# Media handlers by content type
+HANDLERS = {
+    falcon.MEDIA_JSON: JSONHandler(),
+}
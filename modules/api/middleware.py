@@ -2,12 +2,23 @@
 import time
 
 # Third-party Imports
-from loguru import logger
+import falcon
+from jsonschema import Draft7Validator, FormatChecker
+from jsonschema.exceptions import best_match
+
+# Local Imports
+from shared import generations
+from shared.accesslog import AccessLog
+from shared.cache import ResponseCache
+from shared.metrics import Metrics
+from shared.tokens import InvalidToken, Tokens
+from shared.utils import DefaultValidatingDraft7Validator
 
 
 class LoggingMiddleware(object):
     """
-    Log every request made to the server
+    Log every request made to the server, through the
+    background access log writer, and record its metrics.
     """
 
     @classmethod
@@ -25,7 +36,8 @@ class LoggingMiddleware(object):
             resp: Response object that will be routed to
                 the on_* responder.
         """
-        req.req_start_time = time.time()
+        req.req_start_time = time.perf_counter()
+        Metrics.begin()
 
     @classmethod
     def process_response(cls, req, resp, resource, req_succeeded):
@@ -41,26 +53,416 @@ class LoggingMiddleware(object):
                 the framework processed and routed the request;
                 otherwise False.
         """
-        reqtime = round(float(time.time() - req.req_start_time), 3)
-        logger.info(f'{req.access_route} {req.method} {req.uri} {resp.status} {req_succeeded} {reqtime}')
+        elapsed = time.perf_counter() - req.req_start_time
+
+        AccessLog.record(req.access_route, req.method, req.relative_uri, resp.status, req_succeeded, elapsed)
+
+        # Unmatched paths share a single route label
+        Metrics.request(req.uri_template or 'unmatched', req.method, resp.status, elapsed)
+
+
+class SessionStream(object):
+    """
+    A response body iterable which owns a database session,
+    closing it once the WSGI server is done with the body.
+
+    Args:
+        builtins.object (class): Native object class.
+    """
+
+    def __init__(self, iterable, session):
+        """
+        Create the stream.
+
+        Args:
+            iterable (iterable): The response body chunks.
+            session (sqlalchemy.orm.Session): The session used to produce the chunks.
+        """
+        self._iterable = iterable
+        self._session = session
+
+    def __iter__(self):
+        """
+        Iterates the response body chunks.
+        """
+        return iter(self._iterable)
+
+    def close(self):
+        """
+        Closes the underlying iterable and releases the session.
+        Called by the WSGI server even if the body was not consumed.
+        """
+        try:
+            if hasattr(self._iterable, 'close'):
+                self._iterable.close()
+        finally:
+            self._session.close()
+
+
+class CachingStream(object):
+    """
+    A response body iterable which keeps a copy of the chunks it
+    yields, storing the full body in the response cache once the
+    WSGI server is done with it.
+
+    Args:
+        builtins.object (class): Native object class.
+    """
+
+    def __init__(self, iterable, limit, store):
+        """
+        Create the stream.
+
+        Args:
+            iterable (iterable): The response body chunks.
+            limit (int): The maximum body size to keep, in bytes.
+            store (callable): Called with the body once fully sent.
+        """
+        self._iterable = iterable
+        self._limit = limit
+        self._store = store
+        self._chunks = []
+        self._size = 0
+        self._complete = False
+
+    def __iter__(self):
+        """
+        Iterates the response body chunks.
+        """
+        for chunk in self._iterable:
+
+            # Give up copying bodies too large to cache
+            if self._chunks is not None:
+                self._size += len(chunk)
+                if self._size > self._limit:
+                    self._chunks = None
+                else:
+                    self._chunks.append(chunk)
+
+            yield chunk
+
+        self._complete = True
+
+    def close(self):
+        """
+        Closes the underlying iterable and caches the body if it
+        was sent in full.
+        """
+        try:
+            if hasattr(self._iterable, 'close'):
+                self._iterable.close()
+        finally:
+            if self._complete and self._chunks is not None:
+                self._store(b''.join(self._chunks))
+
+
+class ResponseCacheMiddleware(object):
+    """
+    Serves GET requests from the response cache, with strong entity
+    tags, answering matching 'If-None-Match' requests with 304 Not
+    Modified. Both are decided before any database session is taken.
+
+    Resources opt in with a 'cache' attribute naming the generation
+    counters their responses depend on. Writes bump those counters,
+    invalidating every entry rendered from older data.
+
+    Args:
+        builtins.object (class): Native object class.
+    """
+
+    @staticmethod
+    def _key(req):
+        """
+        Builds the cache key of a request.
+
+        Args:
+            req: Request object.
+
+        Returns:
+            tuple: The path, normalized query string and accepted content type.
+        """
+        query = '&'.join(sorted(req.query_string.split('&'))) if req.query_string else ''
+
+        return req.path, query, req.accept
+
+    @staticmethod
+    def _matches(req, etag):
+        """
+        Checks an entity tag against the request 'If-None-Match' header.
+
+        Args:
+            req: Request object.
+            etag (str): The current entity tag.
+
+        Returns:
+            bool: Whether the client copy is current.
+        """
+        header = req.get_header('If-None-Match')
+
+        if not header:
+            return False
+
+        # Weak comparison, as required for If-None-Match
+        for tag in header.split(','):
+            tag = tag.strip()
+            if tag == '*' or tag == etag or tag == f'W/{etag}':
+                return True
+
+        return False
+
+    def process_resource(self, req, resp, resource, params):
+        """
+        Process the request after routing.
+
+        Args:
+            req: Request object that will be passed to the
+                routed responder.
+            resp: Response object that will be passed to the
+                responder.
+            resource: Resource object to which the request was
+                routed.
+            params: A dict-like object representing any additional
+                params derived from the route's URI template fields,
+                that will be passed to the resource's responder
+                method as keyword arguments.
+        """
+        tables = getattr(resource, 'cache', None)
+
+        if req.method != 'GET' or not tables:
+            return
+
+        # Counters are unknown until the first read
+        versions = ResponseCache.versions(tables)
+
+        if versions is None:
+            return
+
+        key = self._key(req)
+        etag = ResponseCache.etag(key, versions)
+
+        # Client copy is current
+        if self._matches(req, etag):
+            Metrics.increment('ping_cache_requests_total', (('result', 'not_modified'),))
+            resp.set_header('ETag', etag)
+            resp.status = falcon.HTTP_304
+            resp.complete = True
+            return
+
+        entry = ResponseCache.get(key, versions)
+
+        # Render and cache on misses
+        if entry is None:
+            Metrics.increment('ping_cache_requests_total', (('result', 'miss'),))
+            req.context.cache = (key, versions, etag)
+            return
+
+        Metrics.increment('ping_cache_requests_total', (('result', 'hit'),))
+        resp.set_header('ETag', etag)
+        resp.content_type, resp.data = entry[1:]
+        resp.status = falcon.HTTP_200
+        resp.complete = True
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        """
+        Post-processing of the response (after routing).
+
+        Args:
+            req: Request object.
+            resp: Response object.
+            resource: Resource object to which the request was
+                routed. May be None if no route was found
+                for the request.
+            req_succeeded: True if no exceptions were raised while
+                the framework processed and routed the request;
+                otherwise False.
+        """
+        cache = req.context.pop('cache', None)
+
+        if cache is None or not req_succeeded or resp.status != falcon.HTTP_200:
+            return
+
+        key, versions, etag = cache
+        resp.set_header('ETag', etag)
+
+        # Cache streamed bodies once sent
+        if resp.stream is not None:
+            content_type = resp.content_type
+            resp.stream = CachingStream(
+                resp.stream, ResponseCache.maxbody(),
+                lambda body: ResponseCache.put(key, versions, etag, content_type, body))
+            return
+
+        # Serializes media, setting the default content type if needed
+        body = resp.data if resp.body is None else resp.body.encode()
+
+        if body is not None:
+            ResponseCache.put(key, versions, etag, resp.content_type, body)
+
+
+class AuthMiddleware(object):
+    """
+    Requires a valid bearer token on every request, except for
+    resources with a false 'auth' attribute. Verified token claims
+    are made available as req.context.token.
+
+    Args:
+        builtins.object (class): Native object class.
+    """
+
+    def process_resource(self, req, resp, resource, params):
+        """
+        Process the request after routing.
+
+        Args:
+            req: Request object that will be passed to the
+                routed responder.
+            resp: Response object that will be passed to the
+                responder.
+            resource: Resource object to which the request was
+                routed.
+            params: A dict-like object representing any additional
+                params derived from the route's URI template fields,
+                that will be passed to the resource's responder
+                method as keyword arguments.
+
+        Raises:
+            falcon.HTTPUnauthorized: If the token is missing or invalid.
+        """
+        # Resources may be public
+        if not getattr(resource, 'auth', True):
+            return
+
+        scheme, _, token = (req.auth or '').partition(' ')
+
+        if scheme.lower() != 'bearer' or not token:
+            raise falcon.HTTPUnauthorized('Unauthorized', 'Missing access token.', challenges=['Bearer'])
+
+        try:
+            req.context.token = Tokens.verify(token.strip())
+        except InvalidToken as e:
+            raise falcon.HTTPUnauthorized('Unauthorized', str(e), challenges=['Bearer'])
+
+
+class ValidationMiddleware(object):
+    """
+    Validates request bodies against the JSON schemas declared by
+    resources, rejecting bad input before any database session is
+    created. Missing optional properties get their schema defaults.
+
+    Resources declare a 'schemas' attribute mapping request methods
+    to schemas, compiled once per resource class when the middleware
+    is created.
+
+    Args:
+        builtins.object (class): Native object class.
+    """
+
+    def __init__(self, resources):
+        """
+        Create the middleware instance, compiling every schema.
+
+        Args:
+            resources (iterable): The resource classes.
+        """
+        self._validators = {
+            (resource, method): self.compile(schema)
+            for resource in resources
+            for method, schema in getattr(resource, 'schemas', {}).items()
+        }
+
+    @staticmethod
+    def compile(schema):
+        """
+        Compiles a schema into a validator.
+
+        Args:
+            schema (dict): The JSON schema.
+
+        Raises:
+            jsonschema.exceptions.SchemaError: If the schema is invalid.
+
+        Returns:
+            callable: Returns the most relevant error message for an instance, None if it is valid.
+        """
+        Draft7Validator.check_schema(schema)
+        iter_errors = DefaultValidatingDraft7Validator(schema, format_checker=FormatChecker()).iter_errors
+
+        def validate(instance):
+            error = best_match(iter_errors(instance))
+
+            if error is None:
+                return None
+
+            # Name the offending property, if any
+            path = '.'.join(str(part) for part in error.absolute_path)
+            return f'{path}: {error.message}' if path else error.message
+
+        return validate
+
+    def process_resource(self, req, resp, resource, params):
+        """
+        Process the request after routing.
+
+        Args:
+            req: Request object that will be passed to the
+                routed responder.
+            resp: Response object that will be passed to the
+                responder.
+            resource: Resource object to which the request was
+                routed.
+            params: A dict-like object representing any additional
+                params derived from the route's URI template fields,
+                that will be passed to the resource's responder
+                method as keyword arguments.
+
+        Raises:
+            falcon.HTTPBadRequest: If the body does not match the schema.
+        """
+        validate = self._validators.get((type(resource), req.method))
+
+        if validate is None:
+            return
+
+        error = validate(req.media)
+
+        if error is not None:
+            raise falcon.HTTPBadRequest('Bad Request', error)
 
 
 class DatabaseConnectionMiddleware(object):
     """
-    Shares the database connection amongst all requests.
+    Gives each request its own database session, checked out
+    from the connection pool only when first used and released
+    when the response is processed. Resources with a false
+    'database' attribute get no session.
 
     Args:
         builtins.object (class): Native object class.
     """
 
-    def __init__(self, session):
+    def __init__(self, session_factory):
         """
         Create the middleware instance.
 
         Args:
-            session (): The scoped session object.
+            session_factory (sqlalchemy.orm.sessionmaker): The session factory.
+        """
+        self._Session = session_factory
+
+    @staticmethod
+    def stream(req, iterable):
         """
-        self._Session = session
+        Hands the request session over to a streamed response body,
+        which then releases it once the body is sent.
+
+        Args:
+            req: Request object.
+            iterable (iterable): The response body chunks.
+
+        Returns:
+            SessionStream: The response stream.
+        """
+        return SessionStream(iterable, req.context.pop('session'))
 
     def process_resource(self, req, resp, resource, params):
         """
@@ -82,4 +484,38 @@ class DatabaseConnectionMiddleware(object):
                 that will be passed to the resource's responder
                 method as keyword arguments.
         """
-        resource.dbsession = self._Session
+        # Resources may opt out of database sessions
+        if getattr(resource, 'database', True):
+            req.context.session = self._Session()
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        """
+        Post-processing of the response (after routing).
+
+        Args:
+            req: Request object.
+            resp: Response object.
+            resource: Resource object to which the request was
+                routed. May be None if no route was found
+                for the request.
+            req_succeeded: True if no exceptions were raised while
+                the framework processed and routed the request;
+                otherwise False.
+        """
+        # Let caches drop data changed by this request
+        generations.notify()
+
+        session = req.context.pop('session', None)
+
+        # Streamed responses own their session
+        if session is None:
+            return
+
+        try:
+            # Rollback faulty transactions
+            if not req_succeeded:
+                session.rollback()
+
+        finally:
+            # Return connection to the pool
+            session.close()
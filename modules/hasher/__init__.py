@@ -0,0 +1,2 @@
+# Import PingHasher process
+from .hasher import PingHasher
@@ -0,0 +1,165 @@
+# Batteries
+import contextlib
+import json
+import select
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Third-party imports
+from loguru import logger
+
+# Local Imports
+from config import Config
+from shared.hashing import PasswordHasher
+from shared.metrics import Metrics
+from shared.process import UnixProcess
+
+
+class PingHasher(UnixProcess):
+    """
+    The hasher computes the password hashes requested by the API
+    workers on the hashing socket, on a pool of as many threads as
+    operations allowed in flight. Requests beyond that are answered
+    busy right away.
+
+    Args:
+        shared.process.UnixProcess (class): The UnixProcess class.
+    """
+
+    def __init__(self, generation=0, control=None):
+        """
+        Create an instance of the hasher process.
+
+        Args:
+            generation (int, optional): The master reload generation. Defaults to 0.
+            control (multiprocessing.connection.Connection, optional): The channel to
+                the master process. Defaults to None.
+        """
+        UnixProcess.__init__(self, name='ping-hasher')
+        self._generation = generation
+        self._control = control
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._refused = 0
+
+    def _drainer(self):
+        """
+        Waits for the master to retire the hasher, then stops accepting
+        requests once those in flight are answered.
+        """
+        try:
+            message = self._control.recv()
+        except (EOFError, OSError):
+            return
+
+        if message == 'drain':
+            logger.info('Draining hasher')
+            self._stop = True
+
+    def _reply(self, conn, reply):
+        """
+        Sends a reply and closes the connection.
+
+        Args:
+            conn (socket.socket): The worker connection.
+            reply (dict): The reply.
+        """
+        with contextlib.suppress(OSError), conn:
+            conn.sendall(json.dumps(reply).encode() + b'\n')
+
+    def _handle(self, conn):
+        """
+        Reads a hashing request and answers it.
+
+        Args:
+            conn (socket.socket): The worker connection.
+        """
+        try:
+            with conn.makefile('rb') as stream:
+                request = json.loads(stream.readline())
+
+            self._reply(conn, {'result': PasswordHasher.compute(request)})
+
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self._reply(conn, {'error': str(e)})
+
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    def _accept(self, sock, pool, slots):
+        """
+        Accepts a request, hashing it on the pool when a slot is free.
+
+        Args:
+            sock (socket.socket): The hashing socket.
+            pool (concurrent.futures.ThreadPoolExecutor): The hashing pool.
+            slots (int): The maximum number of hashing operations in flight.
+        """
+        # Another generation's hasher may have taken the connection
+        try:
+            conn, _ = sock.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+
+        conn.setblocking(True)
+        conn.settimeout(Config.get('hashing.timeout'))
+
+        with self._lock:
+            busy = self._inflight >= slots
+
+            if not busy:
+                self._inflight += 1
+
+        if busy:
+            self._refused += 1
+            self._reply(conn, {'busy': True})
+        else:
+            pool.submit(self._handle, conn)
+
+    @logger.catch
+    def run(self):
+        """
+        This will run in a separate process.
+        """
+        self.serve()
+
+    def serve(self):
+        """
+        Sets up the hashing pool and answers requests until stopped.
+        """
+        # Set proc name
+        self.setprocname()
+
+        # Stop accepting on termination
+        self.sigreg(signal.SIGINT, self.sighandler)
+        self.sigreg(signal.SIGTERM, self.sighandler)
+
+        sock = PasswordHasher.listener()
+        slots = Config.get('hashing.pending')
+
+        # Register metrics and start publishing them to the master
+        Metrics.register('ping_hashing_inflight', lambda: self._inflight)
+        Metrics.register('ping_hashing_refused_total', lambda: self._refused)
+        Metrics.start(f'hasher-{self._generation}', Config.get('metrics.interval'))
+
+        # Report ready and wait to be retired
+        if self._control is not None:
+            self._control.send('ready')
+            threading.Thread(target=self._drainer, name='drainer', daemon=True).start()
+
+        logger.info(f'Hashing with {slots} slots')
+
+        # The pbkdf2 rounds release the GIL, so the pool hashes in parallel
+        with ThreadPoolExecutor(max_workers=slots, thread_name_prefix='hashing') as pool:
+            while not self._stop:
+                readable, _, _ = select.select([sock], [], [], 0.5)
+
+                if readable:
+                    self._accept(sock, pool, slots)
+
+        logger.info('Hasher stopped')
+
+        # Stop metrics publishing
+        Metrics.stop()
@@ -0,0 +1,2 @@
+# Import PingProber process
+from .prober import PingProber
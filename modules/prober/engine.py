@@ -0,0 +1,471 @@
+# Batteries
+import asyncio
+import contextlib
+import itertools
+import os
+import socket
+import struct
+import time
+
+# Third-party Imports
+from loguru import logger
+
+# Local Imports
+from shared.metrics import Metrics
+
+# ICMP echo header: type, code, checksum, identifier and sequence
+ECHO = struct.Struct('!BBHHH')
+
+# Echo request and reply types, and the socket protocol, per address family
+ICMP = {
+    socket.AF_INET: (8, 0, socket.IPPROTO_ICMP),
+    socket.AF_INET6: (128, 129, socket.IPPROTO_ICMPV6),
+}
+
+# Receive buffer of the ICMP sockets, replies to thousands of probes may arrive at once
+RECEIVE_BUFFER = 4 * 1024 * 1024
+
+
+def checksum(data):
+    """
+    Computes the Internet checksum of an ICMP message.
+
+    Args:
+        data (bytes): The message, with a zero checksum.
+
+    Returns:
+        int: The checksum.
+    """
+    if len(data) % 2:
+        data += b'\0'
+
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+
+    return ~total & 0xFFFF
+
+
+class Echo(object):
+    """
+    ICMP echo over a single socket per address family.
+
+    Raw sockets are used when the process may open them, otherwise
+    unprivileged datagram ICMP sockets, where the kernel replaces
+    the identifier. Replies are matched to probes by source address
+    and sequence number, so any number of probes share the socket.
+
+    Requests are sent on the non-blocking socket directly, and probes
+    finding its send buffer full wait together for it to drain.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+
+    def __init__(self, loop, family):
+        """
+        Opens the socket and starts reading replies.
+
+        Args:
+            loop (asyncio.AbstractEventLoop): The event loop.
+            family (int): The address family.
+
+        Raises:
+            OSError: If neither socket type may be opened.
+        """
+        self._loop = loop
+        self._family = family
+        self._request, self._reply, protocol = ICMP[family]
+
+        try:
+            self._sock, self._raw = socket.socket(family, socket.SOCK_RAW, protocol), True
+        except PermissionError:
+            self._sock, self._raw = socket.socket(family, socket.SOCK_DGRAM, protocol), False
+
+        with contextlib.suppress(OSError):
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+
+        self._sock.setblocking(False)
+        self._ident = os.getpid() & 0xFFFF
+        self._sequence = itertools.count()
+        self._pending = {}
+        self._writable = None
+
+        loop.add_reader(self._sock.fileno(), self._read)
+
+    def close(self):
+        """
+        Stops reading replies and closes the socket.
+        """
+        self._loop.remove_reader(self._sock.fileno())
+
+        if self._writable is not None:
+            self._loop.remove_writer(self._sock.fileno())
+            self._writable.cancel()
+
+        self._sock.close()
+
+    async def _send(self, data, address):
+        """
+        Sends a datagram, waiting while the socket send buffer is full.
+
+        Args:
+            data (bytes): The ICMP message.
+            address (str): The IP address.
+
+        Raises:
+            OSError: If the datagram could not be sent.
+
+        Returns:
+            float: The monotonic time it was sent at.
+        """
+        while True:
+            try:
+                self._sock.sendto(data, (address, 0))
+                return time.monotonic()
+            except (BlockingIOError, InterruptedError):
+                pass
+
+            # Every blocked sender waits for the same wakeup
+            if self._writable is None:
+                self._writable = self._loop.create_future()
+                self._loop.add_writer(self._sock.fileno(), self._drained)
+
+            await asyncio.shield(self._writable)
+
+    def _drained(self):
+        """
+        Wakes the senders up once the socket is writable again.
+        """
+        self._loop.remove_writer(self._sock.fileno())
+        self._writable, writable = None, self._writable
+        writable.set_result(None)
+
+    async def ping(self, address, timeout):
+        """
+        Sends an echo request and waits for its reply.
+
+        Args:
+            address (str): The IP address.
+            timeout (float): Seconds to wait for the reply.
+
+        Returns:
+            float: The round trip time in seconds, None if no reply arrived in time.
+        """
+        sequence = next(self._sequence) & 0xFFFF
+        header = ECHO.pack(self._request, 0, 0, self._ident, sequence)
+        payload = time.monotonic_ns().to_bytes(8, 'big')
+
+        # The kernel computes ICMPv6 checksums
+        if self._family == socket.AF_INET:
+            header = ECHO.pack(self._request, 0, checksum(header + payload), self._ident, sequence)
+
+        key = (address, sequence)
+        reply = self._pending[key] = self._loop.create_future()
+
+        try:
+            sent = await asyncio.wait_for(self._send(header + payload, address), timeout)
+            received = await asyncio.wait_for(reply, timeout)
+
+        # Unroutable addresses fail right away
+        except (asyncio.TimeoutError, OSError):
+            return None
+
+        finally:
+            self._pending.pop(key, None)
+
+        return received - sent
+
+    def _read(self):
+        """
+        Reads every available reply, resolving the matching probes.
+        """
+        while True:
+            try:
+                data, source = self._sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.warning(f'Could not read ICMP replies: {str(e)}')
+                return
+
+            received = time.monotonic()
+
+            # Raw IPv4 sockets include the IP header
+            if self._raw and self._family == socket.AF_INET:
+                data = data[(data[0] & 0x0F) * 4:]
+
+            if len(data) < ECHO.size:
+                continue
+
+            kind, _, _, ident, sequence = ECHO.unpack_from(data)
+
+            # Skip requests and the replies to other processes
+            if kind != self._reply or (self._raw and ident != self._ident):
+                continue
+
+            reply = self._pending.get((source[0].split('%')[0], sequence))
+            if reply is not None and not reply.done():
+                reply.set_result(received)
+
+
+class Target(object):
+    """
+    Probing state of a single address: its round trip time estimate,
+    from which timeouts are derived, and its rate limit.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+    __slots__ = ('srtt', 'rttvar', 'ready')
+
+    def __init__(self):
+        """
+        Creates the state of a never probed address.
+        """
+        self.srtt = None
+        self.rttvar = None
+        self.ready = 0.0
+
+    def sample(self, rtt):
+        """
+        Updates the round trip time estimate, as TCP does (RFC 6298).
+
+        Args:
+            rtt (float): The measured round trip time in seconds.
+        """
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+            return
+
+        self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+        self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    def timeout(self, default, minimum, maximum):
+        """
+        Returns the timeout of the next probe.
+
+        Args:
+            default (float): The timeout of never answered addresses.
+            minimum (float): The smallest timeout.
+            maximum (float): The largest timeout.
+
+        Returns:
+            float: The timeout in seconds.
+        """
+        if self.srtt is None:
+            return default
+
+        return min(max(self.srtt + 4 * self.rttvar, minimum), maximum)
+
+
+class ProbeEngine(object):
+    """
+    Asynchronous reachability prober.
+
+    Addresses are probed with ICMP echo, retried with exponentially
+    longer timeouts, and finally with TCP connections to well known
+    ports, where a refused connection also proves the host is up.
+    Timeouts adapt to the round trip times measured per address, and
+    each address is probed at most 'rate' times per second.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+
+    def __init__(self, concurrency, rate, timeout, timeout_min, timeout_max, retries, ports, icmp=True):
+        """
+        Configures the prober.
+
+        Args:
+            concurrency (int): The maximum number of addresses probed at once.
+            rate (float): The maximum number of probes per second per address.
+            timeout (float): The timeout of never answered addresses, in seconds.
+            timeout_min (float): The smallest timeout, in seconds.
+            timeout_max (float): The largest timeout, in seconds.
+            retries (int): The number of ICMP retries before falling back to TCP.
+            ports (list): The TCP ports tried when ICMP gets no reply.
+            icmp (bool, optional): Whether to probe with ICMP. Defaults to True.
+        """
+        self._concurrency = concurrency
+        self._interval = 1 / rate
+        self._timeout, self._timeout_min, self._timeout_max = timeout, timeout_min, timeout_max
+        self._retries = retries
+        self._ports = ports
+        self._icmp = icmp
+        self._echo = {}
+        self._targets = {}
+        self._semaphore = None
+
+    def open(self):
+        """
+        Opens the ICMP sockets. Called from the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+
+        if not self._icmp:
+            return
+
+        for family in ICMP:
+            try:
+                self._echo[family] = Echo(loop, family)
+            except OSError as e:
+                logger.warning(f'ICMP unavailable for address family {family.name}, probing with TCP: {str(e)}')
+
+    def close(self):
+        """
+        Closes the ICMP sockets.
+        """
+        for echo in self._echo.values():
+            echo.close()
+
+        self._echo = {}
+
+    def forget(self, addresses):
+        """
+        Drops the state of the addresses no longer probed.
+
+        Args:
+            addresses (set): The addresses still probed.
+        """
+        self._targets = {address: target for address, target in self._targets.items() if address in addresses}
+
+    async def _wait(self, target):
+        """
+        Waits until an address may be probed again.
+
+        Args:
+            target (Target): The address state.
+        """
+        now = time.monotonic()
+        start = max(now, target.ready)
+        target.ready = start + self._interval
+
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _connect(self, address, port, timeout):
+        """
+        Opens and closes a TCP connection.
+
+        Args:
+            address (str): The IP address.
+            port (int): The TCP port.
+            timeout (float): Seconds to wait for the connection.
+
+        Returns:
+            float: The connection time in seconds, None if the host did not answer.
+        """
+        sent = time.monotonic()
+
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+
+        # A reset comes from the host itself
+        except ConnectionRefusedError:
+            return time.monotonic() - sent
+
+        except (asyncio.TimeoutError, OSError):
+            return None
+
+        elapsed = time.monotonic() - sent
+        writer.close()
+
+        return elapsed
+
+    async def probe(self, address):
+        """
+        Probes an address.
+
+        Args:
+            address (str): The IP address.
+
+        Returns:
+            tuple: The round trip time in seconds, None if the address is down,
+                and the probe method, 'icmp' or 'tcp'.
+        """
+        target = self._targets.get(address)
+        if target is None:
+            target = self._targets[address] = Target()
+
+        echo = self._echo.get(self._family(address))
+
+        async with self._semaphore:
+            timeout = target.timeout(self._timeout, self._timeout_min, self._timeout_max)
+
+            # ICMP echo, doubling the timeout on each retry
+            attempts = self._retries + 1 if echo is not None else 0
+            for _ in range(attempts):
+                await self._wait(target)
+                rtt = await echo.ping(address, timeout)
+
+                if rtt is not None:
+                    target.sample(rtt)
+                    return self._record(rtt, 'icmp')
+
+                timeout = min(timeout * 2, self._timeout_max)
+
+            # TCP connections to the fallback ports
+            for port in self._ports:
+                await self._wait(target)
+                rtt = await self._connect(address, port, timeout)
+
+                if rtt is not None:
+                    target.sample(rtt)
+                    return self._record(rtt, 'tcp')
+
+        return self._record(None, 'tcp' if echo is None else 'icmp')
+
+    @staticmethod
+    def _family(address):
+        """
+        Returns the address family of an address.
+
+        Args:
+            address (str): The IP address.
+
+        Returns:
+            int: The address family.
+        """
+        return socket.AF_INET6 if ':' in address else socket.AF_INET
+
+    @staticmethod
+    def _record(rtt, method):
+        """
+        Counts a probe result.
+
+        Args:
+            rtt (float): The round trip time in seconds, None if the address is down.
+            method (str): The probe method.
+
+        Returns:
+            tuple: The round trip time and the probe method.
+        """
+        Metrics.increment('ping_probes_total', (('method', method), ('result', 'down' if rtt is None else 'up')))
+
+        if rtt is not None:
+            Metrics.observe('ping_probe_rtt_seconds', rtt, (('method', method),))
+
+        return rtt, method
+
+    async def sweep(self, addresses):
+        """
+        Probes every address, as many at once as the concurrency allows.
+
+        Args:
+            addresses (list): The IP addresses.
+
+        Returns:
+            dict: The (round trip time, method) probe result by address.
+        """
+        results = await asyncio.gather(*(self.probe(address) for address in addresses), return_exceptions=True)
+
+        # A failing probe reports its address down instead of failing the sweep
+        for index, result in enumerate(results):
+            if isinstance(result, Exception):
+                logger.warning(f'Could not probe {addresses[index]}: {str(result)}')
+                results[index] = self._record(None, 'icmp' if self._family(addresses[index]) in self._echo else 'tcp')
+
+        return dict(zip(addresses, results))
+
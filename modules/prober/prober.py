@@ -0,0 +1,271 @@
+# Batteries
+import asyncio
+import contextlib
+import importlib
+import signal
+import threading
+import time
+
+# Third-party imports
+import sqlalchemy
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+
+# Local Imports
+from config import Config
+from shared import datastore, generations, reachability
+from shared.metrics import Metrics
+from shared.models import IpAddress, Reachability
+from shared.process import UnixProcess
+from shared.reloader import purge
+from shared.sharedcache import SharedCache
+from .engine import ProbeEngine
+
+
+class PingProber(UnixProcess):
+    """
+    The prober sweeps every assigned IP address periodically and
+    records whether it is reachable, and its round trip time, in a
+    compact history per address.
+
+    Args:
+        shared.process.UnixProcess (class): The UnixProcess class.
+    """
+
+    def __init__(self, generation=0, control=None):
+        """
+        Create an instance of the prober process.
+
+        Args:
+            generation (int, optional): The master reload generation. Defaults to 0.
+            control (multiprocessing.connection.Connection, optional): The channel to
+                the master process. Defaults to None.
+        """
+        UnixProcess.__init__(self, name='ping-prober')
+        self._generation = generation
+        self._control = control
+        self._Session = None
+        self._states = {}
+        self._stopping = None
+        self._loop = None
+        self._swept = (0, 0, 0.0)
+
+    def _drainer(self):
+        """
+        Waits for the master to retire the prober, then stops it
+        once the current sweep is recorded.
+        """
+        try:
+            message = self._control.recv()
+        except (EOFError, OSError):
+            return
+
+        if message == 'drain':
+            logger.info('Draining prober')
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    def _load(self):
+        """
+        Loads the latest state and history of every probed address.
+        """
+        session = self._Session()
+
+        try:
+            self._states = {
+                address: [up, changed, history]
+                for address, up, changed, history in session.query(
+                    Reachability.address, Reachability.up, Reachability.changed, Reachability.history)
+            }
+
+        finally:
+            session.close()
+
+    def _addresses(self):
+        """
+        Retrieves the addresses to probe.
+
+        Returns:
+            list: The IP addresses.
+        """
+        session = self._Session()
+
+        try:
+            return [address for address, in session.query(IpAddress.address)]
+
+        finally:
+            session.close()
+
+    def _store(self, results, when):
+        """
+        Records the results of a sweep in a single transaction, and
+        forgets the addresses no longer assigned.
+
+        Args:
+            results (dict): The (round trip time, method) probe result by address.
+            when (int): The sweep unix time.
+        """
+        size = Config.get('prober.history')
+        updates, inserts = [], []
+
+        for address, (rtt, method) in results.items():
+            up = rtt is not None
+            state = self._states.get(address)
+
+            row = {'up': up, 'rtt': rtt, 'method': method, 'checked': when}
+
+            if state is None:
+                state = self._states[address] = [up, when, b'']
+                inserts.append(row)
+            else:
+                updates.append(row)
+
+            # Track up and down transitions
+            if state[0] != up:
+                state[0], state[1] = up, when
+
+            state[2] = reachability.append(state[2], when, rtt, size)
+            row.update(key=address, changed=state[1], history=state[2])
+
+        table = Reachability.__table__
+        session = self._Session()
+
+        try:
+            if updates:
+                session.execute(
+                    table.update().where(table.c.address == sqlalchemy.bindparam('key')),
+                    updates)
+
+            if inserts:
+                session.execute(
+                    table.insert().values(address=sqlalchemy.bindparam('key')),
+                    inserts)
+
+            session.execute(table.delete().where(table.c.address.notin_(sqlalchemy.select([IpAddress.address]))))
+
+            generations.bump(session, reachability.GENERATION)
+            session.commit()
+
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f'Could not record probe results: {str(e)}')
+
+            # Reload the recorded state on the next sweep
+            self._states = {}
+
+        finally:
+            session.close()
+            generations.notify()
+
+        # Forget the state of unassigned addresses
+        self._states = {address: state for address, state in self._states.items() if address in results}
+
+    async def _sweep(self, engine):
+        """
+        Probes every address once and records the results.
+
+        Args:
+            engine (ProbeEngine): The probing engine.
+        """
+        loop = asyncio.get_running_loop()
+        started, when = time.monotonic(), int(time.time())
+
+        # Database access off the event loop
+        if not self._states:
+            await loop.run_in_executor(None, self._load)
+
+        addresses = await loop.run_in_executor(None, self._addresses)
+        engine.forget(set(addresses))
+
+        results = await engine.sweep(addresses)
+        await loop.run_in_executor(None, self._store, results, when)
+
+        elapsed = time.monotonic() - started
+        down = sum(1 for rtt, _ in results.values() if rtt is None)
+        self._swept = (len(results), down, elapsed)
+
+        logger.info(f'Probed {len(results)} addresses in {elapsed:.1f}s, {down} down.')
+
+    async def _run(self):
+        """
+        Sweeps the addresses every interval until stopped.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            self._loop.add_signal_handler(signum, self._stopping.set)
+
+        engine = ProbeEngine(
+            Config.get('prober.concurrency'), Config.get('prober.rate'), Config.get('prober.timeout'),
+            Config.get('prober.timeout_min'), Config.get('prober.timeout_max'), Config.get('prober.retries'),
+            Config.get('prober.ports'), Config.get('prober.icmp'))
+        engine.open()
+
+        # Report ready and wait to be retired
+        if self._control is not None:
+            self._control.send('ready')
+            threading.Thread(target=self._drainer, name='drainer', daemon=True).start()
+
+        try:
+            while not self._stopping.is_set():
+                started = time.monotonic()
+
+                try:
+                    await self._sweep(engine)
+                except SQLAlchemyError as e:
+                    logger.error(f'Could not read the addresses to probe: {str(e)}')
+
+                # Keep sweeping, the prober would otherwise be restarted in a loop
+                except Exception as e:
+                    logger.exception(f'Could not sweep the addresses: {str(e)}')
+
+                # Wait for the next sweep
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        self._stopping.wait(), max(Config.get('prober.interval') - (time.monotonic() - started), 0))
+
+        finally:
+            engine.close()
+
+    @logger.catch
+    def run(self):
+        """
+        This will run in a separate process.
+        """
+        # Probe with the code currently on disk in development mode
+        if Config.get('dev.reload'):
+            purge(Config.BASE_DIR)
+            importlib.import_module(__name__).PingProber.serve(self)
+        else:
+            self.serve()
+
+    def serve(self):
+        """
+        Sets up the prober and sweeps until stopped.
+        """
+        # Set proc name
+        self.setprocname()
+
+        # Setup database connection
+        engine = datastore.create_engine(Config.get('datastore'))
+        self._Session = sqlalchemy.orm.sessionmaker(bind=engine)
+
+        # Register metrics and start publishing them to the master
+        Metrics.register('ping_probe_targets', lambda: self._swept[0])
+        Metrics.register('ping_probe_down', lambda: self._swept[1])
+        Metrics.register('ping_probe_sweep_seconds', lambda: self._swept[2])
+        Metrics.start(f'prober-{self._generation}', Config.get('metrics.interval'))
+
+        # Invalidate the API workers cached responses after recording sweeps
+        generations.listen(lambda names: SharedCache.invalidate(*names))
+
+        asyncio.run(self._run())
+
+        logger.info('Prober stopped')
+
+        # Stop metrics publishing
+        Metrics.stop()
+
+        # Dispose all database connection
+        with contextlib.suppress(Exception):
+            engine.dispose()
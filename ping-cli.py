@@ -11,7 +11,9 @@ import sqlalchemy
 
 # Local Imports
 from config import Config, InvalidConfiguration
+from shared import datastore, migrations
 from shared.models import Base
+from shared.reloader import Reloader
 
 
 def stop():
@@ -83,6 +85,11 @@ def start():
         if os.path.isfile(Config.getpath('socket')):
             os.unlink(Config.getpath('socket'))
 
+    # Refuse to start without the source watcher development mode relies on
+    if Config.get('dev.reload') and not Reloader.available():
+        print('Unable to start. dev.reload requires the inotify package, install requirements-dev.txt.')
+        return 1
+
     # Only import master when required
     from master import PingMaster
 
@@ -185,16 +192,44 @@ def initdb():
         int: The exit code to exit with.
     """
     # Create engine
-    engine = sqlalchemy.create_engine(Config.get('datastore'), poolclass=sqlalchemy.pool.NullPool)
+    engine = datastore.create_engine(Config.get('datastore'), poolclass=sqlalchemy.pool.NullPool)
 
-    # Create database schema
+    # Create database schema, which is already at the latest version
     try:
         Base.metadata.create_all(engine)
+        migrations.stamp(engine)
+
+    except sqlalchemy.exc.OperationalError as e:
+        print(f'Operational Error\nCode: {e.orig.args[0]}\nMessage: {e.orig.args[1]}')
+        return 1
+
+    return 0
+
+
+def migrate():
+    """
+    Applies pending schema migrations to an existing database.
+
+    Returns:
+        int: The exit code to exit with.
+    """
+    # Create engine
+    engine = datastore.create_engine(Config.get('datastore'), poolclass=sqlalchemy.pool.NullPool)
+
+    # Apply migrations
+    try:
+        applied = migrations.migrate(engine)
 
     except sqlalchemy.exc.OperationalError as e:
         print(f'Operational Error\nCode: {e.orig.args[0]}\nMessage: {e.orig.args[1]}')
         return 1
 
+    for version, description in applied:
+        print(f'Applied migration {version}: {description}')
+
+    if not applied:
+        print('Database schema is up to date.')
+
     return 0
 
 
@@ -205,7 +240,8 @@ OPERATIONS = {
     'restart': restart,
     'status': status,
     'reload': _reload,
-    'initdb': initdb
+    'initdb': initdb,
+    'migrate': migrate
 }
 
 # Main
@@ -0,0 +1,178 @@
+# Batteries
+import collections
+import multiprocessing
+import threading
+import time
+
+# Third-party Imports
+from loguru import logger
+
+
+class AccessLog(object):
+    """
+    Access log pipeline which keeps log formatting and writing
+    off the request path.
+
+    Requests append a tuple of fields to a bounded buffer, and a
+    background thread formats them and writes each batch to the log
+    sinks in a single raw message, laid out like the other log lines,
+    so sinks pay for one write per batch. When the
+    writer falls behind, records are handled by the configured policy:
+
+        drop: new records are discarded while the buffer is full.
+        overwrite: the oldest buffered records are discarded.
+        sample: above half capacity only one in every 'sample' records is kept.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+    # Class parameters
+    _buffer = None
+    _size = 0
+    _batch = 0
+    _interval = 0.5
+    _policy = 'drop'
+    _sample = 1
+    _seen = 0
+    _dropped = 0
+    _wakeup = None
+    _stopping = None
+    _writer = None
+    _name = ''
+
+    @classmethod
+    def start(cls, size, batch, interval, policy, sample):
+        """
+        Starts the background writer.
+
+        Args:
+            size (int): The buffer capacity, in records.
+            batch (int): The number of buffered records which wakes the writer.
+            interval (float): Maximum seconds between writes.
+            policy (str): The overflow policy, one of 'drop', 'overwrite' or 'sample'.
+            sample (int): Keep one in every 'sample' records under the sample policy.
+        """
+        cls._buffer = collections.deque(maxlen=size if policy == 'overwrite' else None)
+        cls._size, cls._batch, cls._interval = size, batch, interval
+        cls._policy, cls._sample = policy, max(sample, 1)
+        cls._seen, cls._dropped = 0, 0
+        cls._wakeup, cls._stopping = threading.Event(), threading.Event()
+        cls._name = multiprocessing.current_process().name
+
+        cls._writer = threading.Thread(target=cls._run, name='access-log', daemon=True)
+        cls._writer.start()
+
+    @classmethod
+    def stop(cls):
+        """
+        Stops the background writer, writing every buffered record.
+        """
+        if cls._writer is None:
+            return
+
+        cls._stopping.set()
+        cls._wakeup.set()
+        cls._writer.join()
+        cls._writer = None
+
+    @classmethod
+    def pending(cls):
+        """
+        Returns the number of buffered records.
+
+        Returns:
+            int: The number of buffered records.
+        """
+        return len(cls._buffer) if cls._buffer is not None else 0
+
+    @classmethod
+    def dropped(cls):
+        """
+        Returns the number of records discarded by the overflow policy.
+
+        Returns:
+            int: The number of discarded records.
+        """
+        return cls._dropped
+
+    @classmethod
+    def record(cls, *fields):
+        """
+        Buffers an access log record. Does nothing if the writer is not running.
+
+        Args:
+            fields: The record fields: access route, method, URI, status, success and request time.
+        """
+        buffer = cls._buffer
+
+        if buffer is None:
+            return
+
+        length = len(buffer)
+
+        # Apply overflow policy
+        if cls._policy == 'sample' and length >= cls._size // 2:
+            cls._seen += 1
+            if cls._seen % cls._sample:
+                cls._dropped += 1
+                return
+
+        if cls._policy != 'overwrite' and length >= cls._size:
+            cls._dropped += 1
+            return
+
+        if cls._policy == 'overwrite' and length >= cls._size:
+            cls._dropped += 1
+
+        buffer.append((time.time(), fields))
+
+        # Wake writer on full batches
+        if length + 1 == cls._batch:
+            cls._wakeup.set()
+
+    @classmethod
+    def _write(cls):
+        """
+        Writes buffered records in batches until the buffer is empty.
+        """
+        buffer = cls._buffer
+        prefix = f' | INFO     |{cls._name: <23} | '
+
+        while buffer:
+            batch = [buffer.popleft() for _ in range(min(cls._batch, len(buffer)))]
+
+            logger.opt(raw=True).info(''.join(
+                f'{cls._timestamp(when)}{prefix}{route} {method} {uri} {status} {succeeded} {reqtime:.3f}\n'
+                for when, (route, method, uri, status, succeeded, reqtime) in batch))
+
+    @staticmethod
+    def _timestamp(when):
+        """
+        Formats a record time like the log sinks do.
+
+        Args:
+            when (float): The unix time.
+
+        Returns:
+            str: The local time, with milliseconds.
+        """
+        return f'{time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(when))}.{int(when % 1 * 1000):03d}'
+
+    @classmethod
+    def _run(cls):
+        """
+        Background writer loop.
+        """
+        reported = 0
+
+        while not cls._stopping.is_set():
+            cls._wakeup.wait(cls._interval)
+            cls._wakeup.clear()
+            cls._write()
+
+            # Report discarded records
+            if cls._dropped != reported:
+                logger.warning(f'Access log writer fell behind, {cls._dropped - reported} record(s) discarded.')
+                reported = cls._dropped
+
+        cls._write()
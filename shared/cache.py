@@ -0,0 +1,244 @@
+# Batteries
+import collections
+import hashlib
+import threading
+import time
+
+# Third-party Imports
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+
+# Local Imports
+from . import generations
+from .sharedcache import SharedCache
+
+
+class ResponseCache(object):
+    """
+    Per-process cache of rendered GET responses.
+
+    Entries are evicted least recently used first, once they outlive
+    their TTL, or when the cache exceeds its entry count or memory cap.
+    Each entry records the generation counters of the tables it was
+    rendered from, and is only served while they are unchanged, so
+    writes invalidate exactly the entries depending on them.
+
+    Counters are read from the database by a background thread once
+    per interval, and right after writes made by this process. Writes
+    also bump the namespace counters of the shared cache, in memory
+    shared by every worker and the prober, which entries are checked
+    against too, so their writes invalidate entries at once. Without
+    the shared cache, writes from other processes are seen within one
+    interval.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+    # Class parameters
+    _entries = collections.OrderedDict()
+    _size = 0
+    _limit = 0
+    _memory = 0
+    _entry_memory = 0
+    _ttl = 0
+    _generations = None
+    _Session = None
+    _lock = threading.Lock()
+    _stopping = None
+    _refresher = None
+
+    @classmethod
+    def start(cls, session_factory, entries, memory, entry_memory, ttl, interval):
+        """
+        Starts the generation counter refresher.
+
+        Args:
+            session_factory (sqlalchemy.orm.sessionmaker): The session factory.
+            entries (int): The maximum number of entries.
+            memory (int): The maximum size of all bodies, in bytes.
+            entry_memory (int): The maximum size of a single body, in bytes.
+            ttl (float): Seconds an entry may be served.
+            interval (float): Seconds between generation counter reads.
+        """
+        cls._entries, cls._size = collections.OrderedDict(), 0
+        cls._limit, cls._memory, cls._entry_memory, cls._ttl = entries, memory, entry_memory, ttl
+        cls._Session = session_factory
+        cls._generations = None
+        cls._stopping = threading.Event()
+
+        cls._refresher = threading.Thread(target=cls._run, args=(interval,), name='response-cache', daemon=True)
+        cls._refresher.start()
+
+    @classmethod
+    def stop(cls):
+        """
+        Stops the refresher and drops every entry.
+        """
+        if cls._refresher is None:
+            return
+
+        cls._stopping.set()
+        cls._refresher.join()
+        cls._refresher = None
+
+        cls._entries, cls._size, cls._generations = collections.OrderedDict(), 0, None
+
+    @classmethod
+    def refresh(cls):
+        """
+        Reads the current generation counters.
+        """
+        with cls._lock:
+            session = cls._Session()
+
+            try:
+                cls._generations = generations.read(session)
+
+            except SQLAlchemyError as e:
+                # Serve nothing from possibly stale entries
+                cls._generations = None
+                logger.warning(f'Could not read generation counters: {str(e)}')
+
+            finally:
+                session.close()
+
+    @classmethod
+    def _run(cls, interval):
+        """
+        Background refresher loop.
+        """
+        while True:
+            cls.refresh()
+
+            if cls._stopping.wait(interval):
+                break
+
+    @classmethod
+    def versions(cls, tables):
+        """
+        Returns the current generation counters of some tables, with
+        their shared cache namespace counters.
+
+        Args:
+            tables (tuple): The generation counter names.
+
+        Returns:
+            tuple: The counter values, None if they are unknown.
+        """
+        current = cls._generations
+
+        if current is None:
+            return None
+
+        return tuple((current.get(table, 0), SharedCache.stamp((table,))) for table in tables)
+
+    @staticmethod
+    def etag(key, versions):
+        """
+        Computes the strong entity tag of a response.
+
+        Args:
+            key (tuple): The cache key.
+            versions (tuple): The generation counters the response depends on.
+
+        Returns:
+            str: The quoted entity tag.
+        """
+        digest = hashlib.blake2b(repr((key, versions)).encode(), digest_size=12).hexdigest()
+
+        return f'"{digest}"'
+
+    @classmethod
+    def get(cls, key, versions):
+        """
+        Returns a cached response, if it is still current.
+
+        Args:
+            key (tuple): The cache key.
+            versions (tuple): The current generation counters it depends on.
+
+        Returns:
+            tuple: The (etag, content type, body) entry, None on misses.
+        """
+        entry = cls._entries.get(key)
+
+        if entry is None:
+            return None
+
+        etag, content_type, body, rendered, expires = entry
+
+        # Drop outdated entries
+        if rendered != versions or expires < time.monotonic():
+            cls._discard(key)
+            return None
+
+        cls._entries.move_to_end(key)
+
+        return etag, content_type, body
+
+    @classmethod
+    def put(cls, key, versions, etag, content_type, body):
+        """
+        Stores a rendered response, evicting the least recently
+        used entries beyond the configured limits.
+
+        Args:
+            key (tuple): The cache key.
+            versions (tuple): The generation counters it was rendered from.
+            etag (str): The response entity tag.
+            content_type (str): The response content type.
+            body (bytes): The response body.
+        """
+        if cls._refresher is None or len(body) > cls._entry_memory:
+            return
+
+        cls._discard(key)
+
+        cls._entries[key] = (etag, content_type, body, versions, time.monotonic() + cls._ttl)
+        cls._size += len(body)
+
+        while len(cls._entries) > cls._limit or cls._size > cls._memory:
+            cls._discard(next(iter(cls._entries)))
+
+    @classmethod
+    def _discard(cls, key):
+        """
+        Removes an entry.
+
+        Args:
+            key (tuple): The cache key.
+        """
+        entry = cls._entries.pop(key, None)
+
+        if entry is not None:
+            cls._size -= len(entry[2])
+
+    @classmethod
+    def maxbody(cls):
+        """
+        Returns the maximum size of a cached body.
+
+        Returns:
+            int: The size, in bytes.
+        """
+        return cls._entry_memory
+
+    @classmethod
+    def entries(cls):
+        """
+        Returns the number of cached responses.
+
+        Returns:
+            int: The number of entries.
+        """
+        return len(cls._entries)
+
+    @classmethod
+    def memory(cls):
+        """
+        Returns the size of the cached bodies.
+
+        Returns:
+            int: The size, in bytes.
+        """
+        return cls._size
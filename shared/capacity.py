@@ -0,0 +1,382 @@
+# Batteries
+import collections
+
+# Third-party Imports
+import sqlalchemy
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Local Imports
+from .datastore import insertignore
+from .models import CapacitySummary, ContentorizedHosts, Host, HostCabinet
+
+# Summarized host resources
+RESOURCES = ('cpucores', 'ram', 'disk_size')
+
+# Summary counters: host count, resources, and resources allocated to guests
+COUNTERS = ('hosts',) + RESOURCES + tuple(f'used_{resource}' for resource in RESOURCES)
+
+# Summary dimensions, with integer keys for cabinets and accounts
+DIMENSIONS = ('type', 'account', 'cabinet')
+
+# Physical host type, whose resources are allocated to guests
+PHYSICAL = 'bm'
+
+
+class CapacityDelta(object):
+    """
+    Accumulates the capacity summary changes of a transaction, so
+    they are written in the same transaction as the host writes.
+
+    Every host counts towards its type and account. Physical hosts
+    racked in a cabinet count towards its capacity. Guests racked in
+    it, or else running directly on its physical hosts, count towards
+    its allocated resources, as in projections.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty delta.
+        """
+        self._changes = collections.defaultdict(lambda: [0] * len(COUNTERS))
+
+    def _add(self, dimension, name, values, sign):
+        """
+        Adds counter values to a summary row.
+
+        Args:
+            dimension (str): The summary dimension.
+            name (object): The summary row name.
+            values (list): The counter values.
+            sign (int): 1 to add the values, -1 to subtract them.
+        """
+        counters = self._changes[(dimension, str(name))]
+
+        for index, value in enumerate(values):
+            counters[index] += sign * value
+
+    def host(self, host, cabinet_id=None, sign=1):
+        """
+        Counts a host.
+
+        Args:
+            host (dict): The host type, account_id and resources.
+            cabinet_id (int, optional): The cabinet the host is racked in. Defaults to None.
+            sign (int, optional): -1 to uncount the host. Defaults to 1.
+        """
+        values = [1] + [host.get(resource) or 0 for resource in RESOURCES] + [0] * len(RESOURCES)
+
+        self._add('type', host['type'], values, sign)
+
+        if host.get('account_id') is not None:
+            self._add('account', host['account_id'], values, sign)
+
+        if cabinet_id is not None:
+            self._add('cabinet', cabinet_id, values if host['type'] == PHYSICAL else allocated(host), sign)
+
+    def guests(self, session, pairs, hosts, racked=None, sign=1):
+        """
+        Counts the resources of guests as allocated in the cabinet
+        their host is racked in, if it is a physical host. Guests
+        racked themselves are allocated in their own cabinet instead.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            pairs (list): The (host id, guest id) links.
+            hosts (dict): The guest type, account_id and resources, by guest id.
+            racked (dict, optional): Known (cabinet id, type) by host id, others are read. Defaults to None.
+            sign (int, optional): -1 to uncount the guests. Defaults to 1.
+        """
+        racked = dict(racked or {})
+
+        # Read the cabinets of hosts outside the batch
+        missing = {host for pair in pairs for host in pair if host not in racked}
+        if missing:
+            racked.update(cabinets(session, missing))
+
+        for parent, child in pairs:
+            cabinet_id, kind = racked.get(parent, (None, None))
+
+            if cabinet_id is not None and kind == PHYSICAL and racked.get(child, (None, None))[0] is None:
+                self._add('cabinet', cabinet_id, allocated(hosts[child]), sign)
+
+    def apply(self, session):
+        """
+        Writes the accumulated changes within the session transaction.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+        """
+        table = CapacitySummary.__table__
+
+        for (dimension, name), values in self._changes.items():
+
+            # Skip rows which did not change
+            if not any(values):
+                continue
+
+            update = (
+                table.update()
+                .where(table.c.dimension == dimension)
+                .where(table.c.name == name)
+                .values({table.c[counter]: table.c[counter] + value for counter, value in zip(COUNTERS, values) if value}))
+
+            # Create row on first use, concurrent first uses create it once
+            if not session.execute(update).rowcount:
+                session.execute(insertignore(table, session.get_bind().dialect).values(
+                    dimension=dimension, name=name, **{counter: 0 for counter in COUNTERS}))
+                session.execute(update)
+
+        self._changes.clear()
+
+
+def allocated(host):
+    """
+    Returns the counter values of a guest allocated in a cabinet.
+
+    Args:
+        host (dict): The guest resources.
+
+    Returns:
+        list: The counter values.
+    """
+    return [0] * (1 + len(RESOURCES)) + [host.get(resource) or 0 for resource in RESOURCES]
+
+
+def cabinets(session, host_ids):
+    """
+    Retrieves the cabinets some hosts are racked in.
+
+    Args:
+        session (sqlalchemy.orm.Session): The database session.
+        host_ids (iterable): The host ids.
+
+    Returns:
+        dict: The (cabinet id, host type) by host id, for racked hosts.
+    """
+    return {
+        host_id: (cabinet_id, kind)
+        for host_id, cabinet_id, kind in session.query(HostCabinet.host_id, HostCabinet.cabinet_id, Host.type).join(
+            Host, Host.id == HostCabinet.host_id).filter(HostCabinet.host_id.in_(host_ids))
+    }
+
+
+def aggregate(bind, dimension):
+    """
+    Computes the summary of a dimension from the host table with GROUP BY.
+
+    Args:
+        bind (sqlalchemy.engine.Connectable): The session, engine or connection.
+        dimension (str): The summary dimension.
+
+    Returns:
+        dict: The counter values by row name.
+    """
+    host = Host.__table__
+    sums = [sqlalchemy.func.count()] + [sqlalchemy.func.sum(sqlalchemy.func.coalesce(host.c[resource], 0)) for resource in RESOURCES]
+
+    if dimension == 'type':
+        query = sqlalchemy.select([host.c.type] + sums).group_by(host.c.type)
+
+    elif dimension == 'account':
+        query = sqlalchemy.select([host.c.account_id] + sums).where(
+            host.c.account_id.isnot(None)).group_by(host.c.account_id)
+
+    else:
+        racked = HostCabinet.__table__
+        query = sqlalchemy.select([racked.c.cabinet_id] + sums).select_from(
+            racked.join(host, host.c.id == racked.c.host_id)).where(
+            host.c.type == PHYSICAL).group_by(racked.c.cabinet_id)
+
+    totals = collections.defaultdict(lambda: [0] * len(COUNTERS))
+
+    for name, *values in bind.execute(query):
+        totals[str(name)][:1 + len(RESOURCES)] = [int(value or 0) for value in values]
+
+    # Allocations of racked guests, and of unracked guests running directly on racked physical hosts
+    if dimension == 'cabinet':
+        links, guest = ContentorizedHosts.__table__, Host.__table__.alias()
+        hosting = racked.join(host, host.c.id == racked.c.host_id)
+        placed = sqlalchemy.union_all(
+            sqlalchemy.select([racked.c.cabinet_id, racked.c.host_id]).select_from(hosting).where(host.c.type != PHYSICAL),
+            sqlalchemy.select([racked.c.cabinet_id, links.c.virt_id]).select_from(
+                hosting.join(links, links.c.bm_id == racked.c.host_id)).where(host.c.type == PHYSICAL).where(
+                links.c.virt_id.notin_(sqlalchemy.select([racked.c.host_id])))
+        ).alias('placed')
+
+        query = sqlalchemy.select(
+            [placed.c.cabinet_id] + [sqlalchemy.func.sum(sqlalchemy.func.coalesce(guest.c[resource], 0)) for resource in RESOURCES]
+        ).select_from(placed.join(guest, guest.c.id == placed.c.host_id)).group_by(placed.c.cabinet_id)
+
+        for name, *values in bind.execute(query):
+            totals[str(name)][1 + len(RESOURCES):] = [int(value or 0) for value in values]
+
+    return dict(totals)
+
+
+def rebuild(connection):
+    """
+    Rebuilds every summary from the host table.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+    """
+    table = CapacitySummary.__table__
+
+    connection.execute(table.delete())
+
+    rows = [
+        {'dimension': dimension, 'name': name, **dict(zip(COUNTERS, values))}
+        for dimension in DIMENSIONS
+        for name, values in aggregate(connection, dimension).items()
+    ]
+
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+def totals(session, dimension):
+    """
+    Reads the summary of a dimension.
+
+    Args:
+        session (sqlalchemy.orm.Session): The database session.
+        dimension (str): The summary dimension.
+
+    Returns:
+        dict: The counter values by row name.
+    """
+    columns = [getattr(CapacitySummary, counter) for counter in COUNTERS]
+
+    return {
+        name: list(values)
+        for name, *values in session.query(CapacitySummary.name, *columns).filter(
+            CapacitySummary.dimension == dimension)
+    }
+
+
+def project(records, dimension):
+    """
+    Computes the summary changes of proposed hosts, for what-if
+    calculations. Vectorized with NumPy when it is installed.
+
+    Args:
+        records (list): The proposed hosts, with their type, resources, account_id and cabinet_id.
+        dimension (str): The summary dimension.
+
+    Returns:
+        dict: The counter values by row name.
+    """
+    field = {'type': 'type', 'account': 'account_id', 'cabinet': 'cabinet_id'}[dimension]
+    records = [record for record in records if record.get(field) is not None]
+
+    if not records:
+        return {}
+
+    if numpy is not None:
+        return _vectorized(records, dimension, field)
+
+    totals = collections.defaultdict(lambda: [0] * len(COUNTERS))
+
+    for record in records:
+        counters = totals[str(record[field])]
+        resources = [record.get(resource) or 0 for resource in RESOURCES]
+
+        # Guests only allocate cabinet resources
+        if dimension == 'cabinet' and record['type'] != PHYSICAL:
+            offset = 1 + len(RESOURCES)
+        else:
+            offset, counters[0] = 1, counters[0] + 1
+
+        for index, value in enumerate(resources):
+            counters[offset + index] += value
+
+    return dict(totals)
+
+
+def _vectorized(records, dimension, field):
+    """
+    Computes the summary changes of proposed hosts with NumPy.
+
+    Args:
+        records (list): The proposed hosts, all with a value for the dimension field.
+        dimension (str): The summary dimension.
+        field (str): The record field holding the row name.
+
+    Returns:
+        dict: The counter values by row name.
+    """
+    count = len(records)
+
+    # Group on integer keys, host types are numbered as first seen
+    if dimension == 'type':
+        codes = {}
+        keys = numpy.fromiter(
+            (codes.setdefault(record[field], len(codes)) for record in records), dtype=numpy.int64, count=count)
+        labels = {code: name for name, code in codes.items()}
+    else:
+        keys = numpy.fromiter((record[field] for record in records), dtype=numpy.int64, count=count)
+        labels = None
+
+    names, groups = numpy.unique(keys, return_inverse=True)
+
+    # One column per resource, and a mask of the hosts counted as capacity
+    resources = [
+        numpy.fromiter((record.get(resource) or 0 for record in records), dtype=numpy.int64, count=count)
+        for resource in RESOURCES
+    ]
+
+    if dimension == 'cabinet':
+        physical = numpy.fromiter((record['type'] == PHYSICAL for record in records), dtype=bool, count=count)
+    else:
+        physical = numpy.ones(count, dtype=bool)
+
+    columns = [physical.astype(numpy.int64)]
+    columns += [numpy.where(physical, column, 0) for column in resources]
+    columns += [numpy.where(physical, 0, column) for column in resources]
+
+    # Sum in int64, weighted bincount would sum in float64 and round above 2 ** 53
+    sums = numpy.zeros((len(names), len(columns)), dtype=numpy.int64)
+    numpy.add.at(sums, groups, numpy.stack(columns, axis=1))
+
+    return {
+        str(name if labels is None else labels[name]): [int(value) for value in row]
+        for name, row in zip(names.tolist(), sums)
+    }
+
+
+def report(dimension, *summaries):
+    """
+    Formats summaries, added together, as report rows.
+
+    Args:
+        dimension (str): The summary dimension.
+        summaries (dict): The counter values by row name.
+
+    Returns:
+        list: The report rows, cabinet rows including allocated and free resources.
+    """
+    merged = collections.defaultdict(lambda: [0] * len(COUNTERS))
+
+    for summary in summaries:
+        for name, values in summary.items():
+            merged[name] = [total + value for total, value in zip(merged[name], values)]
+
+    rows = []
+    for name, values in merged.items():
+        row = {dimension: name if dimension == 'type' else int(name), 'hosts': values[0]}
+        row.update(zip(RESOURCES, values[1:1 + len(RESOURCES)]))
+
+        if dimension == 'cabinet':
+            row['used'] = dict(zip(RESOURCES, values[1 + len(RESOURCES):]))
+            row['free'] = {resource: row[resource] - row['used'][resource] for resource in RESOURCES}
+
+        rows.append(row)
+
+    return sorted(rows, key=lambda row: row[dimension])
@@ -0,0 +1,216 @@
+# Batteries
+import collections
+
+# Third-party Imports
+import sqlalchemy
+
+# Local Imports
+from .models import ContentorizedHosts, Host, HostClosure
+
+# Minimum server versions supporting recursive common table expressions
+RECURSIVE_CTE = {
+    'sqlite': (3, 8, 3),
+    'postgresql': (8, 4),
+    'mysql': (8, 0),
+    'mssql': (9,),
+    'oracle': (11, 2),
+}
+
+# Deepest containment walked, guards against link cycles
+MAX_DEPTH = 32
+
+
+class ContainmentCycle(Exception):
+    """
+    Thrown when a link would make a host run on one of its guests.
+
+    Args:
+        builtins.Exception (class): Builtin exception class.
+    """
+    ...
+
+
+def recursive(bind):
+    """
+    Checks whether the database supports recursive common table expressions.
+
+    Args:
+        bind (sqlalchemy.engine.Connectable): The engine or connection.
+
+    Returns:
+        bool: Whether recursive CTEs are supported.
+    """
+    dialect = bind.dialect
+    minimum = RECURSIVE_CTE.get(dialect.name)
+
+    if minimum is None:
+        return False
+
+    # MariaDB reports itself as MySQL
+    if getattr(dialect, '_is_mariadb', False):
+        minimum = (10, 2, 2)
+
+    return tuple(dialect.server_version_info or ()) >= minimum
+
+
+def rebuild(connection):
+    """
+    Rebuilds the closure table from the containment links.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+    """
+    links = ContentorizedHosts.__table__
+    closure = HostClosure.__table__
+
+    connection.execute(closure.delete())
+
+    # Every path at once, extending paths by one link per step
+    if recursive(connection):
+        paths = sqlalchemy.select([
+            links.c.bm_id.label('ancestor_id'), links.c.virt_id.label('descendant_id'),
+            sqlalchemy.literal(1).label('depth')
+        ]).cte('paths', recursive=True)
+
+        step = links.alias()
+        paths = paths.union_all(
+            sqlalchemy.select([paths.c.ancestor_id, step.c.virt_id, paths.c.depth + 1])
+            .where(step.c.bm_id == paths.c.descendant_id)
+            .where(paths.c.depth < MAX_DEPTH))
+
+        connection.execute(closure.insert().from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            sqlalchemy.select([paths.c.ancestor_id, paths.c.descendant_id, paths.c.depth])))
+        return
+
+    guests = collections.defaultdict(list)
+    for parent, child in connection.execute(sqlalchemy.select([links.c.bm_id, links.c.virt_id])):
+        guests[parent].append(child)
+
+    rows = []
+    for ancestor in guests:
+        level, depth = guests[ancestor], 1
+        while level and depth <= MAX_DEPTH:
+            rows.extend({'ancestor_id': ancestor, 'descendant_id': host, 'depth': depth} for host in level)
+            level, depth = [child for host in level for child in guests.get(host, ())], depth + 1
+
+    if rows:
+        connection.execute(closure.insert(), rows)
+
+
+def link(session, pairs):
+    """
+    Inserts containment links and their closure rows within the
+    session transaction. Guests run on a single host, so links
+    form a forest and every pair of hosts has at most one path.
+
+    Args:
+        session (sqlalchemy.orm.Session): The database session.
+        pairs (list): The (host id, guest id) links.
+
+    Raises:
+        ContainmentCycle: If a guest would contain its host.
+    """
+    if not pairs:
+        return
+
+    hosts = {host for pair in pairs for host in pair}
+
+    # Paths reaching and leaving the linked hosts
+    above, below = {host: {} for host in hosts}, {host: {} for host in hosts}
+
+    for ancestor, descendant, depth in session.query(
+            HostClosure.ancestor_id, HostClosure.descendant_id, HostClosure.depth).filter(
+            HostClosure.descendant_id.in_(hosts)):
+        above[descendant][ancestor] = depth
+
+    for ancestor, descendant, depth in session.query(
+            HostClosure.ancestor_id, HostClosure.descendant_id, HostClosure.depth).filter(
+            HostClosure.ancestor_id.in_(hosts)):
+        below[ancestor][descendant] = depth
+
+    # Join each link with the paths above its parent and below its
+    # child, updating the paths of later links in the batch
+    rows = []
+    for parent, child in pairs:
+        heads = {parent: 0, **above[parent]}
+        tails = {child: 0, **below[child]}
+
+        if parent in tails:
+            raise ContainmentCycle(f'Host {parent} runs on host {child}.')
+
+        for ancestor, up in heads.items():
+            for descendant, down in tails.items():
+                rows.append({'ancestor_id': ancestor, 'descendant_id': descendant, 'depth': up + down + 1})
+
+                if descendant in above:
+                    above[descendant][ancestor] = up + down + 1
+                if ancestor in below:
+                    below[ancestor][descendant] = up + down + 1
+
+    session.bulk_insert_mappings(ContentorizedHosts, [{'bm_id': parent, 'virt_id': child} for parent, child in pairs])
+    session.bulk_insert_mappings(HostClosure, rows)
+
+
+def unlink(session, parent, child):
+    """
+    Deletes a containment link and the closure rows of the paths
+    through it, within the session transaction.
+
+    Args:
+        session (sqlalchemy.orm.Session): The database session.
+        parent (int): The host id.
+        child (int): The guest id.
+
+    Returns:
+        bool: Whether the link existed.
+    """
+    deleted = session.query(ContentorizedHosts).filter(
+        ContentorizedHosts.bm_id == parent, ContentorizedHosts.virt_id == child).delete(synchronize_session=False)
+
+    if not deleted:
+        return False
+
+    heads = [parent] + [row[0] for row in session.query(HostClosure.ancestor_id).filter(
+        HostClosure.descendant_id == parent)]
+    tails = [child] + [row[0] for row in session.query(HostClosure.descendant_id).filter(
+        HostClosure.ancestor_id == child)]
+
+    session.query(HostClosure).filter(
+        HostClosure.ancestor_id.in_(heads), HostClosure.descendant_id.in_(tails)).delete(synchronize_session=False)
+
+    return True
+
+
+def descendants(session, host_id, *columns):
+    """
+    Retrieves every host running on a host, transitively, in a single indexed query.
+
+    Args:
+        session (sqlalchemy.orm.Session): The database session.
+        host_id (int): The host id.
+        columns (sqlalchemy.Column): The host columns to retrieve, the id if none are given.
+
+    Returns:
+        list: The host columns and depth of each guest, closest first.
+    """
+    return session.query(*(columns or (Host.id,)), HostClosure.depth).join(
+        HostClosure, HostClosure.descendant_id == Host.id).filter(
+        HostClosure.ancestor_id == host_id).order_by(HostClosure.depth, Host.id).all()
+
+
+def ancestors(session, host_id, *columns):
+    """
+    Retrieves every host a host runs on, transitively, in a single indexed query.
+
+    Args:
+        session (sqlalchemy.orm.Session): The database session.
+        host_id (int): The host id.
+        columns (sqlalchemy.Column): The host columns to retrieve, the id if none are given.
+
+    Returns:
+        list: The host columns and depth of each host, closest first, the physical host last.
+    """
+    return session.query(*(columns or (Host.id,)), HostClosure.depth).join(
+        HostClosure, HostClosure.ancestor_id == Host.id).filter(
+        HostClosure.descendant_id == host_id).order_by(HostClosure.depth).all()
@@ -0,0 +1,225 @@
+# Batteries
+import functools
+import threading
+import time
+
+# Third-party Imports
+import sqlalchemy
+from loguru import logger
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStatistics(object):
+    """
+    Connection pool instrumentation for the current process.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+    # Class parameters
+    _lock = threading.Lock()
+    _checkouts = 0
+    _waiting = 0
+    _wait_total = 0.0
+    _wait_max = 0.0
+    _timeouts = 0
+
+    @classmethod
+    def record(cls, waited, timedout):
+        """
+        Records a connection checkout attempt.
+
+        Args:
+            waited (float): Seconds waited for a connection.
+            timedout (bool): Whether the pool was exhausted.
+        """
+        with cls._lock:
+            cls._checkouts += 0 if timedout else 1
+            cls._timeouts += 1 if timedout else 0
+            cls._wait_total += waited
+            cls._wait_max = max(cls._wait_max, waited)
+
+    @classmethod
+    def waiting(cls, delta):
+        """
+        Updates the number of checkouts waiting for a connection.
+
+        Args:
+            delta (int): The change in waiting checkouts.
+        """
+        with cls._lock:
+            cls._waiting += delta
+
+    @classmethod
+    def snapshot(cls, pool=None):
+        """
+        Returns the pool statistics.
+
+        Args:
+            pool (sqlalchemy.pool.QueuePool, optional): The pool to report occupation for. Defaults to None.
+
+        Returns:
+            dict: The pool statistics.
+        """
+        with cls._lock:
+            statistics = {
+                'checkouts': cls._checkouts,
+                'waiting': cls._waiting,
+                'wait_total': cls._wait_total,
+                'wait_max': cls._wait_max,
+                'timeouts': cls._timeouts,
+            }
+
+        if pool is not None:
+            statistics.update(size=pool.size(), checkedout=pool.checkedout(), overflow=pool.overflow())
+
+        return statistics
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    A QueuePool which records checkout wait times and exhaustion.
+
+    Args:
+        sqlalchemy.pool.QueuePool (class): SQLAlchemy queue pool class.
+    """
+
+    def _do_get(self):
+        """
+        Checks a connection out of the pool, recording the wait.
+
+        Raises:
+            sqlalchemy.exc.TimeoutError: If the pool is exhausted.
+
+        Returns:
+            sqlalchemy.pool._ConnectionRecord: The connection record.
+        """
+        start = time.perf_counter()
+        PoolStatistics.waiting(1)
+
+        try:
+            record = super()._do_get()
+
+        except sqlalchemy.exc.TimeoutError:
+            PoolStatistics.record(time.perf_counter() - start, True)
+            logger.warning(f'Database pool exhausted: {self.status()}')
+            raise
+
+        finally:
+            PoolStatistics.waiting(-1)
+
+        PoolStatistics.record(time.perf_counter() - start, False)
+
+        return record
+
+
+def _tune(options, backend, dbapi_connection, connection_record):
+    """
+    Tunes each new database connection.
+
+    Args:
+        options (dict): The datastore configuration.
+        backend (str): The database backend name.
+        dbapi_connection: The DBAPI connection.
+        connection_record: The pool connection record.
+    """
+    statements = []
+    timeout = options.get('statement_timeout', 0)
+
+    if backend == 'sqlite':
+        sqlite = options.get('sqlite', {})
+        statements = [
+            f'PRAGMA journal_mode={sqlite.get("journal_mode", "WAL")}',
+            f'PRAGMA synchronous={sqlite.get("synchronous", "NORMAL")}',
+            f'PRAGMA busy_timeout={int(sqlite.get("busy_timeout", 5000))}',
+            f'PRAGMA mmap_size={int(sqlite.get("mmap_size", 0))}',
+        ]
+
+    elif backend == 'postgresql' and timeout:
+        statements = [f'SET statement_timeout = {int(timeout)}']
+
+    elif backend == 'mysql' and timeout:
+        statements = [f'SET SESSION max_execution_time = {int(timeout)}']
+
+    cursor = dbapi_connection.cursor()
+
+    try:
+        for statement in statements:
+            cursor.execute(statement)
+    finally:
+        cursor.close()
+
+
+def create_engine(options, **kwargs):
+    """
+    Creates a database engine from the datastore configuration,
+    using the instrumented pool.
+
+    SQLite connections run in WAL mode with relaxed synchronization,
+    a busy timeout and memory mapped I/O by default, so several
+    workers may write without failing on locked databases.
+
+    Args:
+        options (dict): The datastore configuration.
+        kwargs: Overrides for the sqlalchemy.create_engine arguments.
+
+    Returns:
+        sqlalchemy.engine.Engine: The database engine.
+    """
+    url = sqlalchemy.engine.url.make_url(options['url'])
+    backend = url.get_backend_name()
+
+    arguments = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': options.get('pool_size', 5),
+        'max_overflow': options.get('max_overflow', 10),
+        'pool_timeout': options.get('pool_timeout', 30),
+        'pool_recycle': options.get('pool_recycle', 3600),
+        'pool_pre_ping': options.get('pool_pre_ping', False),
+    }
+
+    # Let the driver wait on locks as long as SQLite does, and let pooled
+    # connections be used by background threads, one at a time
+    if backend == 'sqlite':
+        arguments['connect_args'] = {
+            'timeout': options.get('sqlite', {}).get('busy_timeout', 5000) / 1000,
+            'check_same_thread': False,
+        }
+
+    arguments.update(kwargs)
+
+    # Pool sizing does not apply to other pool classes
+    if arguments['poolclass'] is not InstrumentedQueuePool:
+        for argument in ('pool_size', 'max_overflow', 'pool_timeout'):
+            arguments.pop(argument)
+
+    engine = sqlalchemy.create_engine(url, **arguments)
+    sqlalchemy.event.listen(engine, 'connect', functools.partial(_tune, options, backend))
+
+    return engine
+
+
+def insertignore(table, dialect):
+    """
+    Builds an INSERT statement which skips rows whose key already
+    exists, so concurrent transactions may create the same rows.
+    Other dialects get a plain INSERT.
+
+    Args:
+        table (sqlalchemy.Table): The table.
+        dialect (sqlalchemy.engine.Dialect): The database dialect.
+
+    Returns:
+        sqlalchemy.sql.expression.Insert: The statement.
+    """
+    if dialect.name == 'postgresql':
+        return postgresql.insert(table).on_conflict_do_nothing()
+
+    if dialect.name == 'sqlite':
+        return table.insert().prefix_with('OR IGNORE')
+
+    if dialect.name == 'mysql':
+        return table.insert().prefix_with('IGNORE')
+
+    return table.insert()
@@ -0,0 +1,79 @@
+# Local Imports
+from .datastore import insertignore
+from .models import Generation
+
+# Counters bumped by this process and not yet notified
+_bumped = set()
+
+# Callbacks notified of bumped counters
+_listeners = []
+
+
+def bump(session, name):
+    """
+    Increments a generation counter within the session transaction.
+    Readers compare counters to detect stale cached data without
+    reloading the data itself.
+
+    Args:
+        session (sqlalchemy.orm.Session): The database session.
+        name (str): The counter name.
+    """
+    def increment():
+        return session.query(Generation).filter(Generation.name == name).update(
+            {Generation.value: Generation.value + 1}, synchronize_session=False)
+
+    # Create counter on first use, concurrent first uses create it once
+    if not increment():
+        session.execute(insertignore(Generation.__table__, session.get_bind().dialect).values(name=name, value=0))
+        increment()
+
+    _bumped.add(name)
+
+
+def listen(callback):
+    """
+    Registers a callback notified of the counters bumped by this
+    process, so local caches may drop stale data right after writes.
+
+    Args:
+        callback (callable): Called with the set of bumped counter names.
+    """
+    _listeners.append(callback)
+
+
+def notify():
+    """
+    Notifies the listeners of the counters bumped since the last call.
+    Called once the request transaction is over.
+    """
+    if not _bumped:
+        return
+
+    names = set(_bumped)
+    _bumped.difference_update(names)
+
+    for callback in _listeners:
+        callback(names)
+
+
+def read(session, *names):
+    """
+    Reads generation counters.
+
+    Args:
+        session (sqlalchemy.orm.Session): The database session.
+        names (str): The counter names, every counter if none are given.
+
+    Returns:
+        dict: The counter values by name, missing counters are 0.
+    """
+    query = session.query(Generation.name, Generation.value)
+
+    if names:
+        query = query.filter(Generation.name.in_(names))
+
+    values = dict.fromkeys(names, 0)
+    values.update(query)
+
+    return values
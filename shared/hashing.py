@@ -0,0 +1,226 @@
+# Batteries
+import json
+import os
+import shutil
+import socket
+import tempfile
+
+# Third-party Imports
+from loguru import logger
+from passlib.hash import pbkdf2_sha256
+from passlib.utils.binary import ab64_encode
+
+
+class HashingUnavailable(Exception):
+    """
+    Thrown when the hashing process is busy or unreachable.
+
+    Args:
+        builtins.Exception (class): Builtin exception class.
+    """
+    ...
+
+
+class PasswordHasher(object):
+    """
+    Computes password hashes in the hashing process, so a burst of
+    signups and logins costs the API workers a socket round trip
+    instead of the pbkdf2 rounds.
+
+    The master process creates the hashing socket before forking. The
+    hashing process accepts on it and hashes on a pool of as many threads
+    as operations allowed in flight, replying busy beyond that, which is
+    refused immediately. Workers waiting for a hash are blocked, so there
+    must be fewer operations in flight than workers for the others to keep
+    answering health checks and reads.
+
+    Without a hashing socket, as in CLI usage, hashes are computed inline.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+    # Class parameters
+    _sock = None
+    _path = None
+    _rounds = 200000
+    _timeout = 30
+    _dummy = None
+    _pending = 0
+
+    @classmethod
+    def create(cls):
+        """
+        Creates the hashing socket. Called by the master process
+        before spawning children, which inherit it.
+        """
+        cls._path = os.path.join(tempfile.mkdtemp(prefix='ping-hashing-'), 'hashing.sock')
+
+        cls._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        cls._sock.bind(cls._path)
+        cls._sock.setblocking(False)
+        cls._sock.listen(128)
+        cls._sock.set_inheritable(True)
+
+        logger.debug(f'Created password hashing socket {cls._path}.')
+
+    @classmethod
+    def close(cls):
+        """
+        Releases the hashing socket. Called by the master process on exit.
+        """
+        if cls._sock is not None:
+            cls._sock.close()
+            shutil.rmtree(os.path.dirname(cls._path), ignore_errors=True)
+            cls._sock, cls._path = None, None
+
+    @classmethod
+    def listener(cls):
+        """
+        Returns the hashing socket the hashing process accepts on.
+
+        Returns:
+            socket.socket: The listening socket, None if not created.
+        """
+        return cls._sock
+
+    @classmethod
+    def start(cls, rounds, timeout=30):
+        """
+        Configures the worker hashing.
+
+        Args:
+            rounds (int): The number of pbkdf2 rounds for new hashes.
+            timeout (float, optional): Seconds to wait for the hashing process. Defaults to 30.
+        """
+        cls._rounds = rounds
+        cls._timeout = timeout
+        cls._dummy = None
+
+    @classmethod
+    def pending(cls):
+        """
+        Returns the number of hashing operations this worker waits for.
+
+        Returns:
+            int: The number of operations in flight.
+        """
+        return cls._pending
+
+    @staticmethod
+    def compute(request):
+        """
+        Computes a hashing request.
+
+        Args:
+            request (dict): The operation, 'hash' or 'verify', and its arguments.
+
+        Raises:
+            ValueError: On an unknown operation or malformed hash.
+
+        Returns:
+            object: The hash or the verification result.
+        """
+        if request['op'] == 'hash':
+            return pbkdf2_sha256.using(rounds=request['rounds'], salt_size=16).hash(request['password'])
+
+        if request['op'] == 'verify':
+            return pbkdf2_sha256.verify(request['password'], request['hash'])
+
+        raise ValueError(f'Unknown hashing operation {request["op"]}.')
+
+    @classmethod
+    def _call(cls, request):
+        """
+        Computes a hashing request on the hashing process, or inline
+        without one.
+
+        Args:
+            request (dict): The operation and its arguments.
+
+        Raises:
+            HashingUnavailable: If the hashing process is busy or unreachable.
+
+        Returns:
+            object: The operation result.
+        """
+        if cls._path is None:
+            return cls.compute(request)
+
+        cls._pending += 1
+
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(cls._timeout)
+                sock.connect(cls._path)
+                sock.sendall(json.dumps(request).encode() + b'\n')
+
+                with sock.makefile('rb') as stream:
+                    reply = json.loads(stream.readline() or b'{"busy": true}')
+
+        except (OSError, ValueError) as e:
+            raise HashingUnavailable(f'Password hashing unavailable: {str(e)}')
+
+        finally:
+            cls._pending -= 1
+
+        if reply.get('busy'):
+            raise HashingUnavailable('Too many hashing operations in flight.')
+
+        if 'error' in reply:
+            raise ValueError(reply['error'])
+
+        return reply['result']
+
+    @classmethod
+    def hash(cls, password):
+        """
+        Hashes a password.
+
+        Args:
+            password (str): The plain text password.
+
+        Raises:
+            HashingUnavailable: If the hashing process is busy or unreachable.
+
+        Returns:
+            str: The password hash.
+        """
+        return cls._call({'op': 'hash', 'password': password, 'rounds': cls._rounds})
+
+    @classmethod
+    def verify(cls, password, hashed):
+        """
+        Verifies a password against its hash. Without a hash, as for
+        unknown users, a hash no password matches is verified instead,
+        so both cases take as long.
+
+        Args:
+            password (str): The plain text password.
+            hashed (str): The password hash, None if there is none.
+
+        Raises:
+            HashingUnavailable: If the hashing process is busy or unreachable.
+
+        Returns:
+            bool: True if the password matches the hash.
+        """
+        if hashed is None:
+            hashed = cls._unmatchable()
+
+        return cls._call({'op': 'verify', 'password': password, 'hash': hashed}) and hashed is not cls._dummy
+
+    @classmethod
+    def _unmatchable(cls):
+        """
+        Returns a hash with the configured rounds and a random salt,
+        whose checksum was not derived from any password.
+
+        Returns:
+            str: The hash.
+        """
+        if cls._dummy is None:
+            cls._dummy = (
+                f'$pbkdf2-sha256${cls._rounds}${ab64_encode(os.urandom(16)).decode()}'
+                f'${ab64_encode(bytes(32)).decode()}')
+
+        return cls._dummy
@@ -0,0 +1,125 @@
+# Batteries
+import threading
+import time
+
+# Third-party Imports
+import sqlalchemy
+from loguru import logger
+
+# Local Imports
+from . import serialization
+from .accesslog import AccessLog
+from .datastore import PoolStatistics
+from .hashing import PasswordHasher
+from .metrics import Metrics
+
+
+class HealthMonitor(object):
+    """
+    Background readiness checks for the API worker.
+
+    A thread periodically checks database connectivity and reads the
+    pool, worker and queue state, storing the result as an already
+    serialized snapshot. Readiness probes only return that snapshot,
+    so they never touch the database themselves.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+    # Class parameters
+    _engine = None
+    _interval = 1.0
+    _state = (False, b'{"ready":false}', 0.0)
+    _stopping = None
+    _checker = None
+
+    @classmethod
+    def start(cls, engine, interval):
+        """
+        Starts the background checks.
+
+        Args:
+            engine (sqlalchemy.engine.Engine): The database engine to check.
+            interval (float): Seconds between checks.
+        """
+        cls._engine, cls._interval = engine, interval
+        cls._stopping = threading.Event()
+
+        cls._checker = threading.Thread(target=cls._run, name='health', daemon=True)
+        cls._checker.start()
+
+    @classmethod
+    def stop(cls):
+        """
+        Stops the background checks.
+        """
+        if cls._checker is None:
+            return
+
+        cls._stopping.set()
+        cls._checker.join()
+        cls._checker = None
+
+    @classmethod
+    def snapshot(cls):
+        """
+        Returns the last readiness snapshot. A snapshot older than three
+        check intervals means the checks are stuck and is not ready.
+
+        Returns:
+            tuple: Whether the worker is ready and the serialized snapshot.
+        """
+        ready, body, checked = cls._state
+
+        return ready and time.monotonic() - checked < 3 * cls._interval, body
+
+    @classmethod
+    def _check(cls):
+        """
+        Checks the worker subsystems and stores the snapshot.
+        """
+        start = time.perf_counter()
+        error = None
+
+        # Check database connectivity
+        try:
+            with cls._engine.connect() as connection:
+                connection.execute(sqlalchemy.text('SELECT 1'))
+        except sqlalchemy.exc.SQLAlchemyError as e:
+            error = str(e)
+
+        latency = time.perf_counter() - start
+        pool = PoolStatistics.snapshot(cls._engine.pool)
+
+        body = {
+            'ready': error is None,
+            'checked': time.time(),
+            'database': {'connected': error is None, 'latency': round(latency, 6), 'error': error},
+            'pool': {
+                'size': pool['size'],
+                'checkedout': pool['checkedout'],
+                'overflow': max(pool['overflow'], 0),
+                'waiting': pool['waiting'],
+                'timeouts': pool['timeouts'],
+                'saturated': pool['waiting'] > 0,
+            },
+            'workers': Metrics.workers(),
+            'queues': {'hashing': PasswordHasher.pending(), 'access_log': AccessLog.pending()},
+        }
+
+        # Replace the snapshot in a single assignment
+        cls._state = (error is None, serialization.dumps(body), time.monotonic())
+
+    @classmethod
+    def _run(cls):
+        """
+        Background check loop.
+        """
+        while True:
+            try:
+                cls._check()
+            except Exception as e:
+                logger.warning(f'Health check failed: {str(e)}')
+
+            if cls._stopping.wait(cls._interval):
+                break
@@ -0,0 +1,662 @@
+# Batteries
+import bisect
+import ipaddress
+import time
+
+# Local Imports
+from . import generations
+from .models import FreeBlock, IpAddress, Range
+
+# Generation counter bumped on every IPAM write
+GENERATION = 'ipam'
+
+# Offset of the IPv4-mapped IPv6 address block (::ffff:0:0/96)
+IPV4_MAPPED = 0xffff << 32
+
+# Free block sizes are capped to fit a signed 64-bit column
+MAX_BLOCK_SIZE = 2 ** 63 - 1
+
+# Attempts at taking a free block before giving up on contention
+ALLOCATION_ATTEMPTS = 16
+
+
+class RangeOverlap(Exception):
+    """
+    Thrown when a range overlaps existing ranges.
+
+    Args:
+        builtins.Exception (class): Builtin exception class.
+    """
+
+    def __init__(self, ranges):
+        """
+        Creates the exception.
+
+        Args:
+            ranges (list): The overlapped ranges.
+        """
+        super().__init__(f'Range overlaps {len(ranges)} existing range(s).')
+        self.ranges = ranges
+
+
+class RangeExhausted(Exception):
+    """
+    Thrown when a range has no free block large enough for an allocation.
+
+    Args:
+        builtins.Exception (class): Builtin exception class.
+    """
+    ...
+
+
+class AddressUnavailable(Exception):
+    """
+    Thrown when an address cannot be assigned.
+
+    Args:
+        builtins.Exception (class): Builtin exception class.
+    """
+    ...
+
+
+def toint(address):
+    """
+    Converts an IP address into its 128-bit integer representation.
+    IPv4 addresses are mapped into the ::ffff:0:0/96 block.
+
+    Args:
+        address (str|ipaddress._BaseAddress): The IP address.
+
+    Raises:
+        ValueError: If the address is invalid.
+
+    Returns:
+        int: The 128-bit integer.
+    """
+    address = ipaddress.ip_address(address)
+    return int(address) + (IPV4_MAPPED if address.version == 4 else 0)
+
+
+def fromint(value, family):
+    """
+    Converts a 128-bit integer back into an IP address.
+
+    Args:
+        value (int): The 128-bit integer.
+        family (int): The IP version, 4 or 6.
+
+    Returns:
+        ipaddress._BaseAddress: The IP address.
+    """
+    return ipaddress.IPv4Address(value - IPV4_MAPPED) if family == 4 else ipaddress.IPv6Address(value)
+
+
+def pack(address):
+    """
+    Packs an IP address as a 16 byte big-endian integer, which
+    sorts bytewise in the same order as the addresses.
+
+    Args:
+        address (str|ipaddress._BaseAddress|int): The IP address or its integer representation.
+
+    Raises:
+        ValueError: If the address is invalid.
+
+    Returns:
+        bytes: The packed address.
+    """
+    return (address if isinstance(address, int) else toint(address)).to_bytes(16, 'big')
+
+
+def unpack(packed, family):
+    """
+    Unpacks a packed IP address.
+
+    Args:
+        packed (bytes): The packed address.
+        family (int): The IP version, 4 or 6.
+
+    Returns:
+        ipaddress._BaseAddress: The IP address.
+    """
+    return fromint(int.from_bytes(packed, 'big'), family)
+
+
+def network(start_ip, netmask=None):
+    """
+    Parses a network from CIDR notation or from its start address and netmask.
+
+    Args:
+        start_ip (str): The network address or CIDR.
+        netmask (str, optional): The netmask or prefix length. Defaults to None.
+
+    Raises:
+        ValueError: If the network is invalid.
+
+    Returns:
+        ipaddress._BaseNetwork: The network.
+    """
+    return ipaddress.ip_network(start_ip if netmask is None else f'{start_ip}/{netmask}', strict=False)
+
+
+def usable(rng):
+    """
+    Returns the first and last assignable addresses of a range, as integers.
+    IPv4 network and broadcast addresses are not assignable.
+
+    Args:
+        rng (shared.models.Range): The range.
+
+    Returns:
+        tuple: The (first, last) integers.
+    """
+    first, last = int.from_bytes(rng.first, 'big'), int.from_bytes(rng.last, 'big')
+
+    if rng.family == 4 and rng.prefixlen < 31:
+        return first + 1, last - 1
+
+    return first, last
+
+
+def freeblock(range_id, first, last):
+    """
+    Builds a free block row.
+
+    Args:
+        range_id (int): The range identifier.
+        first (int): The first free address.
+        last (int): The last free address.
+
+    Returns:
+        dict: The free block row, None if the block is empty.
+    """
+    if first > last:
+        return None
+
+    return {
+        'range_id': range_id, 'first_ip': pack(first), 'last_ip': pack(last),
+        'size': min(last - first + 1, MAX_BLOCK_SIZE)
+    }
+
+
+class IPAM(object):
+    """
+    IP address management on top of the packed address columns.
+
+    Ranges never overlap, so the range containing an address is the
+    one with the greatest first address not above it. This makes
+    containment and overlap checks a single index seek.
+
+    Unassigned addresses are kept as a run-length free list per range,
+    so allocations are index seeks regardless of the range size.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+    # Range columns needed by serialize, queried without building ORM instances
+    COLUMNS = (Range.range_id, Range.start_ip, Range.netmask, Range.family, Range.prefixlen, Range.first, Range.last)
+
+    @staticmethod
+    def containing(session, address):
+        """
+        Retrieves the range containing an address.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            address (str|int): The IP address or its integer representation.
+
+        Raises:
+            ValueError: If the address is invalid.
+
+        Returns:
+            shared.models.Range: The range, None if no range contains the address.
+        """
+        packed = pack(address)
+
+        # Seek the closest range starting at or before the address
+        rng = session.query(Range).filter(Range.first <= packed).order_by(Range.first.desc()).first()
+
+        return rng if rng is not None and rng.last >= packed else None
+
+    @classmethod
+    def overlapping(cls, session, net):
+        """
+        Retrieves the ranges overlapping a network.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            net (ipaddress._BaseNetwork): The network.
+
+        Returns:
+            list: The overlapped ranges, ordered by first address.
+        """
+        first, last = toint(net.network_address), toint(net.broadcast_address)
+
+        # Range containing the network start, if any
+        ranges = [rng for rng in (cls.containing(session, first),) if rng is not None]
+
+        # Ranges starting inside the network
+        ranges.extend(
+            session.query(Range)
+            .filter(Range.first > pack(first), Range.first <= pack(last))
+            .order_by(Range.first)
+        )
+
+        return ranges
+
+    @classmethod
+    def create(cls, session, net):
+        """
+        Creates a range for a network.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            net (ipaddress._BaseNetwork): The network.
+
+        Raises:
+            RangeOverlap: If the network overlaps existing ranges.
+
+        Returns:
+            shared.models.Range: The new range, added to the session.
+        """
+        # Ranges may not overlap
+        overlapped = cls.overlapping(session, net)
+        if overlapped:
+            raise RangeOverlap(overlapped)
+
+        rng = Range(
+            start_ip=str(net.network_address), netmask=str(net.netmask),
+            family=net.version, prefixlen=net.prefixlen,
+            first=pack(net.network_address), last=pack(net.broadcast_address))
+        session.add(rng)
+        session.flush()
+
+        # Every assignable address starts free
+        session.execute(FreeBlock.__table__.insert(), [freeblock(rng.range_id, *usable(rng))])
+
+        # Signal cached copies
+        generations.bump(session, GENERATION)
+
+        return rng
+
+    @staticmethod
+    def lookup(session, address):
+        """
+        Retrieves an assigned address.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            address (str): The IP address.
+
+        Raises:
+            ValueError: If the address is invalid.
+
+        Returns:
+            shared.models.IpAddress: The assigned address, None if not assigned.
+        """
+        return session.query(IpAddress).filter(IpAddress.packed == pack(address)).first()
+
+    @staticmethod
+    def nextfree(session, rng):
+        """
+        Finds the lowest unassigned address of a range.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            rng (shared.models.Range): The range.
+
+        Returns:
+            ipaddress._BaseAddress: The address, None if the range is full.
+        """
+        first = session.query(FreeBlock.first).filter(
+            FreeBlock.range_id == rng.range_id).order_by(FreeBlock.first).limit(1).scalar()
+
+        return None if first is None else unpack(first, rng.family)
+
+    @staticmethod
+    def _take(session, range_id, block, first, last):
+        """
+        Removes the [first, last] interval from a free block. The block
+        is only taken if it is unchanged, so concurrent allocators never
+        hand out the same address.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            range_id (int): The range identifier.
+            block (tuple): The packed (first, last) bounds of the free block.
+            first (int): The first address to take.
+            last (int): The last address to take.
+
+        Returns:
+            bool: False if the block was concurrently modified.
+        """
+        taken = session.query(FreeBlock).filter(
+            FreeBlock.first == block[0], FreeBlock.last == block[1]).delete(synchronize_session=False)
+
+        if not taken:
+            return False
+
+        # Return the remaining parts of the block to the free list
+        start, end = int.from_bytes(block[0], 'big'), int.from_bytes(block[1], 'big')
+        remaining = [freeblock(range_id, start, first - 1), freeblock(range_id, last + 1, end)]
+        remaining = [row for row in remaining if row is not None]
+
+        if remaining:
+            session.execute(FreeBlock.__table__.insert(), remaining)
+
+        return True
+
+    @classmethod
+    def allocate(cls, session, rng, host_id, count=1):
+        """
+        Assigns the lowest free address, or the best fitting block
+        of contiguous addresses, of a range to a host.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            rng (shared.models.Range): The range.
+            host_id (int): The host identifier.
+            count (int, optional): The number of contiguous addresses. Defaults to 1.
+
+        Raises:
+            RangeExhausted: If no free block is large enough.
+            AddressUnavailable: On persistent contention with other allocators.
+
+        Returns:
+            list: The assigned addresses.
+        """
+        for _ in range(ALLOCATION_ATTEMPTS):
+
+            query = session.query(FreeBlock.first, FreeBlock.last).filter(FreeBlock.range_id == rng.range_id)
+
+            # Single addresses come from the lowest block, blocks from the smallest fitting one
+            if count == 1:
+                block = query.order_by(FreeBlock.first).first()
+            else:
+                block = query.filter(FreeBlock.size >= count).order_by(FreeBlock.size, FreeBlock.first).first()
+
+            if block is None:
+                raise RangeExhausted(f'No block of {count} free address(es) in range {rng.range_id}.')
+
+            first = int.from_bytes(block.first, 'big')
+
+            if cls._take(session, rng.range_id, block, first, first + count - 1):
+                break
+
+        else:
+            raise AddressUnavailable('Could not allocate address due to concurrent allocations.')
+
+        # Assign addresses
+        values = range(first, first + count)
+        session.execute(IpAddress.__table__.insert(), [
+            {'address': str(fromint(value, rng.family)), 'packed': pack(value), 'range_id': rng.range_id, 'host_id': host_id}
+            for value in values
+        ])
+
+        # Signal cached copies
+        generations.bump(session, GENERATION)
+
+        return [fromint(value, rng.family) for value in values]
+
+    @staticmethod
+    def _block(session, range_id, value):
+        """
+        Seeks the free block of a range containing an address.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            range_id (int): The range identifier.
+            value (int): The integer representation of the address.
+
+        Returns:
+            tuple: The first and last packed addresses of the block, None if the address is not free.
+        """
+        block = session.query(FreeBlock.first, FreeBlock.last).filter(
+            FreeBlock.range_id == range_id, FreeBlock.first <= pack(value)
+        ).order_by(FreeBlock.first.desc()).first()
+
+        if block is None or int.from_bytes(block.last, 'big') < value:
+            return None
+
+        return block
+
+    @classmethod
+    def free(cls, session, range_id, address):
+        """
+        Checks whether an address is free in a range, without reserving it.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            range_id (int): The range identifier.
+            address (str|int): The IP address or its integer representation.
+
+        Raises:
+            ValueError: If the address is invalid.
+
+        Returns:
+            bool: True if the address may be reserved.
+        """
+        return cls._block(session, range_id, address if isinstance(address, int) else toint(address)) is not None
+
+    @classmethod
+    def reserve(cls, session, range_id, address):
+        """
+        Removes a specific address from the free list of a range,
+        before it is assigned to a host.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            range_id (int): The range identifier.
+            address (str|int): The IP address or its integer representation.
+
+        Raises:
+            ValueError: If the address is invalid.
+            AddressUnavailable: If the address is assigned, not assignable or outside the range.
+        """
+        value = address if isinstance(address, int) else toint(address)
+
+        for _ in range(ALLOCATION_ATTEMPTS):
+            block = cls._block(session, range_id, value)
+
+            if block is None:
+                raise AddressUnavailable(f'Address {address} is not free in range {range_id}.')
+
+            if cls._take(session, range_id, block, value, value):
+                return
+
+        raise AddressUnavailable('Could not reserve address due to concurrent allocations.')
+
+    @classmethod
+    def release(cls, session, address):
+        """
+        Unassigns an address, returning it to the free list of its range.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            address (str): The IP address.
+
+        Raises:
+            ValueError: If the address is invalid.
+
+        Returns:
+            bool: False if the address was not assigned.
+        """
+        value = toint(address)
+        assigned = session.query(IpAddress.range_id).filter(IpAddress.packed == pack(value)).first()
+
+        # Only one release may delete the address
+        if assigned is None or not session.query(IpAddress).filter(
+                IpAddress.packed == pack(value)).delete(synchronize_session=False):
+            return False
+
+        first, last = value, value
+
+        # Merge with the adjacent free blocks, unless concurrently taken
+        previous = session.query(FreeBlock.first, FreeBlock.last).filter(
+            FreeBlock.range_id == assigned.range_id, FreeBlock.first < pack(value)
+        ).order_by(FreeBlock.first.desc()).first()
+        following = session.query(FreeBlock.first, FreeBlock.last).filter(
+            FreeBlock.range_id == assigned.range_id, FreeBlock.first == pack(value + 1)).first()
+
+        # The preceding block is only adjacent if it ends right before the address
+        if previous is not None and int.from_bytes(previous.last, 'big') != value - 1:
+            previous = None
+
+        for block in (previous, following):
+            if block is not None and session.query(FreeBlock).filter(
+                    FreeBlock.first == block.first, FreeBlock.last == block.last).delete(synchronize_session=False):
+                first = min(first, int.from_bytes(block.first, 'big'))
+                last = max(last, int.from_bytes(block.last, 'big'))
+
+        session.execute(FreeBlock.__table__.insert(), [freeblock(assigned.range_id, first, last)])
+
+        # Signal cached copies
+        generations.bump(session, GENERATION)
+
+        return True
+
+    @staticmethod
+    def serialize(rng):
+        """
+        Serializes a range.
+
+        Args:
+            rng (shared.models.Range): The range, or a row of the IPAM.COLUMNS.
+
+        Returns:
+            dict: The serialized range.
+        """
+        return {
+            'id': rng.range_id,
+            'network': f'{rng.start_ip}/{rng.prefixlen}',
+            'start_ip': rng.start_ip,
+            'netmask': rng.netmask,
+            'family': rng.family,
+            'prefixlen': rng.prefixlen,
+            'first': str(unpack(rng.first, rng.family)),
+            'last': str(unpack(rng.last, rng.family)),
+        }
+
+
+class IPAMCache(object):
+    """
+    Per-process in-memory copy of the Range and IpAddress tables.
+
+    Ranges are kept as a sorted array of non-overlapping intervals
+    searched by bisection, addresses as a hash map. The 'ipam'
+    generation counter is checked at most once per interval, and
+    the tables are only reloaded when it changed.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+    # Class parameters
+    _interval = 1.0
+    _checked = 0.0
+    _version = None
+    _starts = []
+    _ends = []
+    _ranges = []
+    _addresses = {}
+
+    @classmethod
+    def configure(cls, interval):
+        """
+        Sets the staleness check interval.
+
+        Args:
+            interval (float): Seconds between generation counter checks.
+        """
+        cls._interval = interval
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Forces a generation check on the next access. Called after
+        IPAM writes made by this process are committed.
+        """
+        cls._checked = 0.0
+
+    @classmethod
+    def _load(cls, session):
+        """
+        Loads the Range and IpAddress tables.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+        """
+        starts, ends, ranges = [], [], []
+
+        for rng in session.query(*IPAM.COLUMNS).order_by(Range.first):
+            starts.append(int.from_bytes(rng.first, 'big'))
+            ends.append(int.from_bytes(rng.last, 'big'))
+            ranges.append(IPAM.serialize(rng))
+
+        addresses = {
+            int.from_bytes(packed, 'big'): (host_id, range_id)
+            for packed, host_id, range_id in session.query(
+                IpAddress.packed, IpAddress.host_id, IpAddress.range_id).yield_per(10000)
+        }
+
+        cls._starts, cls._ends, cls._ranges, cls._addresses = starts, ends, ranges, addresses
+
+    @classmethod
+    def refresh(cls, session):
+        """
+        Reloads the cache if the 'ipam' generation changed. The
+        database is only queried once per check interval.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+        """
+        now = time.monotonic()
+
+        if now - cls._checked < cls._interval:
+            return
+
+        # Read generation before data, a concurrent write triggers another reload
+        version = generations.read(session, GENERATION)[GENERATION]
+
+        if version != cls._version:
+            cls._load(session)
+            cls._version = version
+
+        cls._checked = now
+
+    @classmethod
+    def containing(cls, address):
+        """
+        Retrieves the range containing an address.
+
+        Args:
+            address (str|int): The IP address or its integer representation.
+
+        Raises:
+            ValueError: If the address is invalid.
+
+        Returns:
+            dict: The serialized range, None if no range contains the address.
+        """
+        value = address if isinstance(address, int) else toint(address)
+        index = bisect.bisect_right(cls._starts, value) - 1
+
+        return cls._ranges[index] if index >= 0 and cls._ends[index] >= value else None
+
+    @classmethod
+    def host(cls, address):
+        """
+        Retrieves the host an address is assigned to.
+
+        Args:
+            address (str|int): The IP address or its integer representation.
+
+        Raises:
+            ValueError: If the address is invalid.
+
+        Returns:
+            int: The host identifier, None if the address is not assigned.
+        """
+        value = address if isinstance(address, int) else toint(address)
+        host_id, _ = cls._addresses.get(value, (None, None))
+
+        return host_id
@@ -0,0 +1,493 @@
+# Batteries
+import bisect
+import contextlib
+import glob
+import json
+import os
+import tempfile
+import threading
+
+# Third-party Imports
+import sqlalchemy
+from loguru import logger
+
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Queries per request histogram bucket upper bounds
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+# Name of the file holding the totals of exited processes
+RETAINED = 'retained'
+
+# Metric types retained once their process exits
+CUMULATIVE = ('counter', 'histogram')
+
+# Exported metrics as name: (type, help)
+METRICS = {
+    'ping_http_requests_total': ('counter', 'HTTP requests by route, method and status.'),
+    'ping_http_request_duration_seconds': ('histogram', 'HTTP request latency by route and method.'),
+    'ping_db_queries_per_request': ('histogram', 'Database queries issued per HTTP request by route.'),
+    'ping_db_pool_checkouts_total': ('counter', 'Database connections checked out of the pool.'),
+    'ping_db_pool_timeouts_total': ('counter', 'Database connection checkouts failed on an exhausted pool.'),
+    'ping_db_pool_wait_seconds_total': ('counter', 'Seconds spent waiting for database connections.'),
+    'ping_db_pool_checkedout': ('gauge', 'Database connections currently checked out.'),
+    'ping_db_pool_waiting': ('gauge', 'Checkouts currently waiting for a database connection.'),
+    'ping_hashing_pending': ('gauge', 'Password hashing operations in flight.'),
+    'ping_access_log_pending': ('gauge', 'Access log records waiting to be written.'),
+    'ping_access_log_dropped_total': ('counter', 'Access log records discarded by the overflow policy.'),
+    'ping_cache_requests_total': ('counter', 'Cacheable requests by result: hit, miss or not_modified.'),
+    'ping_cache_entries': ('gauge', 'Responses held by the response cache.'),
+    'ping_cache_bytes': ('gauge', 'Bytes of response bodies held by the response cache.'),
+    'ping_shared_cache_requests_total': ('counter', 'Shared cache lookups by result: hit or miss.'),
+    'ping_auth_tokens_total': ('counter', 'Token verifications by result: cached, verified or rejected.'),
+    'ping_probes_total': ('counter', 'Reachability probes by method and result: up or down.'),
+    'ping_probe_rtt_seconds': ('histogram', 'Round trip time of answered reachability probes by method.'),
+    'ping_probe_targets': ('gauge', 'Addresses probed by the last sweep.'),
+    'ping_probe_down': ('gauge', 'Addresses found down by the last sweep.'),
+    'ping_probe_sweep_seconds': ('gauge', 'Duration of the last sweep.'),
+    'ping_workers': ('gauge', 'Processes publishing metrics, API workers and prober.'),
+}
+
+
+class Metrics(object):
+    """
+    In-process metrics registry with counters and fixed-bucket
+    histograms.
+
+    Metrics are updated by the request loop only, so updates take no
+    locks; readers copy the registry before walking it. Values owned by
+    other components, such as the connection pool, are registered as
+    functions and read when a snapshot is taken.
+
+    Each API worker periodically publishes its snapshot as a file in a
+    directory created by the master process, on shared memory when
+    available. Collecting merges every published snapshot, so a single
+    scrape covers all workers.
+
+    Snapshots are named after the publishing process id. Whenever the
+    master collects an exited child, however it exited, it folds the
+    counters and histograms of its last snapshot into the retained
+    totals and removes the snapshot, so totals survive reloads and
+    respawns and dead workers are not reported.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+    # Class parameters
+    _counters = {}
+    _histograms = {}
+    _functions = {}
+    _local = threading.local()
+    _directory = None
+    _temporary = False
+    _name = None
+    _stopping = None
+    _publisher = None
+
+    @classmethod
+    def configure(cls, directory=None):
+        """
+        Creates the directory where workers publish their snapshots.
+        Called by the master process before spawning workers.
+
+        Args:
+            directory (str, optional): The snapshot directory. Defaults to a
+                temporary directory, on shared memory when available.
+        """
+        cls._temporary = not directory
+
+        # Create a private directory by default
+        if cls._temporary:
+            shm = '/dev/shm' if os.path.isdir('/dev/shm') else None
+            directory = tempfile.mkdtemp(prefix='ping-metrics-', dir=shm)
+
+        os.makedirs(directory, exist_ok=True)
+        cls._directory = directory
+
+        # Drop snapshots from previous runs
+        cls._clear()
+
+    @classmethod
+    def _clear(cls):
+        """
+        Removes every published snapshot and the retained totals.
+        """
+        for path in glob.glob(os.path.join(cls._directory, '*.json')) + [os.path.join(cls._directory, RETAINED)]:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+
+    @classmethod
+    def cleanup(cls):
+        """
+        Removes every published snapshot, and the directory itself if
+        it was created by configure. Called by the master process on exit.
+        """
+        if cls._directory is None:
+            return
+
+        cls._clear()
+
+        if cls._temporary:
+            with contextlib.suppress(OSError):
+                os.rmdir(cls._directory)
+
+    @classmethod
+    def increment(cls, name, labels=(), value=1):
+        """
+        Increments a counter.
+
+        Args:
+            name (str): The metric name.
+            labels (tuple, optional): The (label, value) pairs. Defaults to ().
+            value (float, optional): The increment. Defaults to 1.
+        """
+        key = (name, labels)
+        cls._counters[key] = cls._counters.get(key, 0) + value
+
+    @classmethod
+    def observe(cls, name, value, labels=(), buckets=LATENCY_BUCKETS):
+        """
+        Records an observation in a histogram.
+
+        Args:
+            name (str): The metric name.
+            value (float): The observed value.
+            labels (tuple, optional): The (label, value) pairs. Defaults to ().
+            buckets (tuple, optional): The bucket upper bounds. Defaults to LATENCY_BUCKETS.
+        """
+        key = (name, labels)
+        histogram = cls._histograms.get(key)
+
+        # Per bucket counts, the overflow bucket and the sum
+        if histogram is None:
+            histogram = cls._histograms[key] = [buckets, [0] * (len(buckets) + 1), 0]
+
+        histogram[1][bisect.bisect_left(buckets, value)] += 1
+        histogram[2] += value
+
+    @classmethod
+    def register(cls, name, function):
+        """
+        Registers a function which returns the current value of a
+        metric owned by another component.
+
+        Args:
+            name (str): The metric name.
+            function (callable): Returns the metric value.
+        """
+        cls._functions[name] = function
+
+    @classmethod
+    def instrument(cls, engine):
+        """
+        Counts the queries issued through a database engine.
+
+        Args:
+            engine (sqlalchemy.engine.Engine): The database engine.
+        """
+        sqlalchemy.event.listen(engine, 'before_cursor_execute', cls._query)
+
+    @classmethod
+    def _query(cls, *args):
+        """
+        Counts a query for the current request.
+        """
+        cls._local.queries = getattr(cls._local, 'queries', 0) + 1
+
+    @classmethod
+    def begin(cls):
+        """
+        Resets the query count of the current request.
+        """
+        cls._local.queries = 0
+
+    @classmethod
+    def request(cls, route, method, status, elapsed):
+        """
+        Records a served request.
+
+        Args:
+            route (str): The matched route template.
+            method (str): The request method.
+            status (str): The response status line.
+            elapsed (float): The request time, in seconds.
+        """
+        cls.increment('ping_http_requests_total', (('route', route), ('method', method), ('status', status[:3])))
+        cls.observe('ping_http_request_duration_seconds', elapsed, (('route', route), ('method', method)))
+        cls.observe(
+            'ping_db_queries_per_request', getattr(cls._local, 'queries', 0), (('route', route),), QUERY_BUCKETS)
+
+    @classmethod
+    def snapshot(cls):
+        """
+        Returns the current values of this process' metrics.
+
+        Returns:
+            list: The metrics as [name, labels, value] entries, where histogram
+                values are [buckets, counts, sum].
+        """
+        metrics = [[name, labels, value] for (name, labels), value in cls._counters.copy().items()]
+        metrics += [
+            [name, labels, [buckets, list(counts), total]]
+            for (name, labels), (buckets, counts, total) in cls._histograms.copy().items()
+        ]
+
+        for name, function in cls._functions.copy().items():
+            try:
+                metrics.append([name, (), function()])
+            except Exception as e:
+                logger.warning(f'Could not read metric {name}: {str(e)}')
+
+        return metrics
+
+    @classmethod
+    def start(cls, name, interval):
+        """
+        Starts publishing this process' snapshot periodically.
+        Does nothing if the master did not configure a directory.
+
+        Args:
+            name (str): The snapshot name, suffixed with the process id.
+            interval (float): Seconds between publications.
+        """
+        if cls._directory is None:
+            return
+
+        cls._name = f'{name}-{os.getpid()}'
+        cls._stopping = threading.Event()
+
+        cls._publisher = threading.Thread(target=cls._run, args=(interval,), name='metrics', daemon=True)
+        cls._publisher.start()
+
+    @classmethod
+    def stop(cls):
+        """
+        Stops publishing, leaving a final snapshot for the master to
+        fold into the retained totals.
+        """
+        if cls._publisher is None:
+            return
+
+        cls._stopping.set()
+        cls._publisher.join()
+        cls._publisher = None
+
+        try:
+            cls._publish()
+        except OSError as e:
+            logger.warning(f'Could not publish metrics: {str(e)}')
+
+    @classmethod
+    def retire(cls, pid):
+        """
+        Folds the counters and histograms of an exited process into the
+        retained totals and removes its snapshot. Called by the master
+        for every child it collects.
+
+        Args:
+            pid (int): The exited process id.
+        """
+        if cls._directory is None:
+            return
+
+        paths = glob.glob(os.path.join(cls._directory, f'*-{pid}.json'))
+
+        # Leftovers of a publication interrupted by a kill
+        for path in glob.glob(os.path.join(cls._directory, f'*-{pid}.json.tmp')):
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+
+        if not paths:
+            return
+
+        retained = _merge({}, _read(os.path.join(cls._directory, RETAINED)))
+
+        for path in paths:
+            _merge(retained, [
+                entry for entry in _read(path) if METRICS.get(entry[0], ('untyped', ''))[0] in CUMULATIVE])
+
+        # Replace the retained totals atomically, workers read them
+        path = os.path.join(cls._directory, RETAINED)
+
+        try:
+            with open(f'{path}.tmp', 'w') as snapshot:
+                json.dump([
+                    [name, labels, value] for name, series in retained.items() for labels, value in series.items()
+                ], snapshot)
+
+            os.replace(f'{path}.tmp', path)
+
+        except OSError as e:
+            logger.warning(f'Could not retain metrics of process {pid}: {str(e)}')
+            return
+
+        for path in paths:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+
+    @classmethod
+    def _publish(cls):
+        """
+        Writes this process' snapshot, replacing the previous one atomically.
+        """
+        path = os.path.join(cls._directory, f'{cls._name}.json')
+
+        with open(f'{path}.tmp', 'w') as snapshot:
+            json.dump(cls.snapshot(), snapshot)
+
+        os.replace(f'{path}.tmp', path)
+
+    @classmethod
+    def _run(cls, interval):
+        """
+        Background publisher loop.
+        """
+        while True:
+            try:
+                cls._publish()
+            except OSError as e:
+                logger.warning(f'Could not publish metrics: {str(e)}')
+
+            if cls._stopping.wait(interval):
+                break
+
+    @classmethod
+    def workers(cls):
+        """
+        Returns the number of workers publishing metrics.
+
+        Returns:
+            int: The number of workers, 1 when snapshots are not published.
+        """
+        if cls._directory is None:
+            return 1
+
+        return len(glob.glob(os.path.join(cls._directory, '*.json')))
+
+    @classmethod
+    def collect(cls):
+        """
+        Merges the snapshots of every worker and the retained totals of
+        exited ones. The calling worker contributes its current values
+        instead of its last publication.
+
+        Returns:
+            dict: The merged metrics as {name: {labels: value}}.
+        """
+        snapshots = {cls._name: cls.snapshot()}
+
+        # Read the snapshots published by the other workers, if any
+        if cls._directory is not None:
+            for path in glob.glob(os.path.join(cls._directory, '*.json')):
+                name = os.path.basename(path)[:-len('.json')]
+
+                if name != cls._name:
+                    snapshots[name] = _read(path)
+
+        merged = {'ping_workers': {(): len(snapshots)}}
+
+        # Sum counters, gauges and histograms across workers
+        for snapshot in snapshots.values():
+            _merge(merged, snapshot)
+
+        if cls._directory is not None:
+            _merge(merged, _read(os.path.join(cls._directory, RETAINED)))
+
+        return merged
+
+    @classmethod
+    def render(cls):
+        """
+        Renders the metrics of every worker in the Prometheus text format.
+
+        Returns:
+            str: The exposition text.
+        """
+        lines = []
+
+        for name, series in sorted(cls.collect().items()):
+            kind, description = METRICS.get(name, ('untyped', ''))
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+
+            for labels, value in sorted(series.items()):
+                if kind != 'histogram':
+                    lines.append(f'{name}{_labels(labels)} {value}')
+                    continue
+
+                # Histogram buckets are cumulative
+                buckets, counts, total = value
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels + (("le", str(bound)),))} {cumulative}')
+
+                lines.append(f'{name}_sum{_labels(labels)} {total}')
+                lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _read(path):
+    """
+    Reads a published snapshot.
+
+    Args:
+        path (str): The snapshot path.
+
+    Returns:
+        list: The snapshot entries, empty if it could not be read.
+    """
+    try:
+        with open(path) as snapshot:
+            return json.load(snapshot)
+    except (OSError, ValueError):
+        return []
+
+
+def _merge(merged, snapshot):
+    """
+    Sums a snapshot into merged metrics.
+
+    Args:
+        merged (dict): The merged metrics as {name: {labels: value}}, updated in place.
+        snapshot (list): The snapshot entries as [name, labels, value].
+
+    Returns:
+        dict: The merged metrics.
+    """
+    for name, labels, value in snapshot:
+        series = merged.setdefault(name, {})
+        labels = tuple(tuple(label) for label in labels)
+
+        if not isinstance(value, list):
+            series[labels] = series.get(labels, 0) + value
+            continue
+
+        buckets, counts, total = value
+        current = series.setdefault(labels, [buckets, [0] * len(counts), 0])
+        current[1] = [a + b for a, b in zip(current[1], counts)]
+        current[2] += total
+
+    return merged
+
+
+def _labels(labels):
+    """
+    Formats metric labels.
+
+    Args:
+        labels (tuple): The (label, value) pairs.
+
+    Returns:
+        str: The formatted labels, empty if there are none.
+    """
+    if not labels:
+        return ''
+
+    escaped = (
+        (label, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for label, value in labels)
+
+    return '{' + ','.join(f'{label}="{value}"' for label, value in escaped) + '}'
@@ -0,0 +1,345 @@
+# Third-party Imports
+import sqlalchemy
+
+# Local Imports
+from . import capacity, containment, ipam
+from .models import Base, SchemaVersion
+
+# The host type the baseline schema allowed, a single comma separated value
+LEGACY_HOST_TYPE = 'bm,vm,ct'
+
+
+def _addcolumns(connection, table, *names):
+    """
+    Adds model columns to an existing table, skipping existing ones.
+    Columns are added as nullable so existing rows can be backfilled.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+        table (str): The table name.
+        names (str): The column names as declared in the models.
+    """
+    # Retrieve columns already present in the database
+    existing = {column['name'] for column in sqlalchemy.inspect(connection).get_columns(table)}
+    preparer = connection.dialect.identifier_preparer
+
+    for name in names:
+        if name not in existing:
+            column = Base.metadata.tables[table].c[name]
+            connection.execute(
+                f'ALTER TABLE {preparer.quote(table)} ADD COLUMN {preparer.quote(name)} '
+                f'{column.type.compile(dialect=connection.dialect)}')
+
+
+def _createindexes(connection, table, *names):
+    """
+    Creates the named indexes of a model table, skipping existing ones.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+        table (str): The table name.
+        names (str): The index names as declared in the models.
+    """
+    # Retrieve indexes already present in the database
+    existing = {index['name'] for index in sqlalchemy.inspect(connection).get_indexes(table)}
+
+    for index in Base.metadata.tables[table].indexes:
+        if index.name in names and index.name not in existing:
+            index.create(connection)
+
+
+def _lookupindexes(connection):
+    """
+    Creates the indexes for the hot lookup columns.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+    """
+    _createindexes(connection, 'host', 'ix_host_hostname', 'ix_host_type')
+    _createindexes(connection, 'ipaddress', 'ix_ipaddress_host_id', 'ix_ipaddress_range_id')
+    _createindexes(connection, 'user', 'ix_user_account_id')
+    _createindexes(connection, 'host_cabinet', 'ix_host_cabinet_host_id')
+    _createindexes(connection, 'contentorized_hosts', 'ix_contentorized_hosts_virt_id')
+
+
+def _packedaddresses(connection):
+    """
+    Stores IP addresses and range bounds as packed 128-bit integers.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+    """
+    ranges = Base.metadata.tables['range']
+    addresses = Base.metadata.tables['ipaddress']
+
+    # Add packed columns
+    _addcolumns(connection, 'range', 'family', 'prefixlen', 'first_ip', 'last_ip')
+    _addcolumns(connection, 'ipaddress', 'packed')
+
+    # Backfill ranges
+    for rng in connection.execute(sqlalchemy.select([ranges.c.id, ranges.c.start_ip, ranges.c.netmask])).fetchall():
+        net = ipam.network(rng.start_ip, rng.netmask)
+        connection.execute(ranges.update().where(ranges.c.id == rng.id).values(
+            family=net.version, prefixlen=net.prefixlen,
+            first_ip=ipam.pack(net.network_address), last_ip=ipam.pack(net.broadcast_address)))
+
+    # Backfill addresses
+    for address, in connection.execute(sqlalchemy.select([addresses.c.address])).fetchall():
+        connection.execute(addresses.update().where(addresses.c.address == address).values(
+            packed=ipam.pack(address)))
+
+    _createindexes(connection, 'range', 'ix_range_first_ip')
+    _createindexes(connection, 'ipaddress', 'ix_ipaddress_packed')
+
+
+def _generations(connection):
+    """
+    Creates the generation counters table.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+    """
+    Base.metadata.tables['generation'].create(connection, checkfirst=True)
+
+
+def _freeblocks(connection):
+    """
+    Creates the free address blocks table and builds the free list
+    of every range from its assigned addresses.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+    """
+    ranges = Base.metadata.tables['range']
+    addresses = Base.metadata.tables['ipaddress']
+    blocks = Base.metadata.tables['free_block']
+
+    blocks.create(connection, checkfirst=True)
+
+    columns = [ranges.c.id, ranges.c.family, ranges.c.prefixlen, ranges.c.first_ip.label('first'),
+               ranges.c.last_ip.label('last')]
+
+    for rng in connection.execute(sqlalchemy.select(columns)).fetchall():
+        start, end = ipam.usable(rng)
+        used = connection.execute(
+            sqlalchemy.select([addresses.c.packed])
+            .where(addresses.c.packed >= ipam.pack(start))
+            .where(addresses.c.packed <= ipam.pack(end))
+            .order_by(addresses.c.packed))
+
+        # Free blocks are the gaps between assigned addresses
+        rows = []
+        for packed, in used:
+            value = int.from_bytes(packed, 'big')
+            rows.append(ipam.freeblock(rng.id, start, value - 1))
+            start = value + 1
+
+        rows.append(ipam.freeblock(rng.id, start, end))
+        rows = [row for row in rows if row is not None]
+
+        if rows:
+            connection.execute(blocks.insert(), rows)
+
+
+def _revokedtokens(connection):
+    """
+    Creates the revoked tokens table.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+    """
+    Base.metadata.tables['revoked_token'].create(connection, checkfirst=True)
+
+
+def _hostclosure(connection):
+    """
+    Creates the host containment closure table and fills it from
+    the existing containment links.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+    """
+    Base.metadata.tables['host_closure'].create(connection, checkfirst=True)
+
+    containment.rebuild(connection)
+
+
+def _legacytype(hosts):
+    """
+    Maps the legacy host type from the containment links: guests
+    of another host become virtual machines and the others bare
+    metal, containers cannot be told apart from virtual machines.
+
+    Args:
+        hosts (sqlalchemy.sql.expression.TableClause): The host table.
+
+    Returns:
+        sqlalchemy.sql.expression.Case: The mapped type expression.
+    """
+    guests = Base.metadata.tables['contentorized_hosts']
+
+    return sqlalchemy.case([
+        (hosts.c.type != LEGACY_HOST_TYPE, hosts.c.type),
+        (hosts.c.id.in_(sqlalchemy.select([guests.c.virt_id])), 'vm'),
+    ], else_='bm')
+
+
+def _hosttypes(connection):
+    """
+    Replaces the baseline host type constraint, which only allowed
+    the legacy type, mapping the legacy rows. SQLite constraints can
+    only be replaced by copying the table.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+    """
+    model = Base.metadata.tables['host']
+    preparer = connection.dialect.identifier_preparer
+
+    if connection.dialect.name == 'sqlite':
+        schema = connection.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'host'").scalar()
+
+        if f"'{LEGACY_HOST_TYPE}'" not in schema:
+            return
+
+        # Copy the columns present, the model may be ahead of the database
+        existing = {column['name'] for column in sqlalchemy.inspect(connection).get_columns('host')}
+        names = [column.name for column in model.columns if column.name in existing]
+        hosts = sqlalchemy.table('host', *[sqlalchemy.column(name) for name in names])
+
+        copy = model.tometadata(Base.metadata, name='host_new')
+
+        try:
+            connection.execute(sqlalchemy.schema.CreateTable(copy))
+            connection.execute(copy.insert().from_select(
+                names, sqlalchemy.select([_legacytype(hosts) if name == 'type' else hosts.c[name] for name in names])))
+        finally:
+            Base.metadata.remove(copy)
+
+        connection.execute('DROP TABLE host')
+        connection.execute('ALTER TABLE host_new RENAME TO host')
+
+        _createindexes(connection, 'host', *[index.name for index in model.indexes])
+
+    elif connection.dialect.name == 'mysql':
+        column = {column['name']: column for column in sqlalchemy.inspect(connection).get_columns('host')}['type']
+
+        if LEGACY_HOST_TYPE not in getattr(column['type'], 'enums', ()):
+            return
+
+        hosts = sqlalchemy.table('host', sqlalchemy.column('id'), sqlalchemy.column('type'))
+        target = model.c.type.type.compile(dialect=connection.dialect)
+
+        # Allow both the legacy and the new types while mapping
+        connection.execute(
+            f"ALTER TABLE {preparer.quote('host')} MODIFY type ENUM('{LEGACY_HOST_TYPE}', 'bm', 'vm', 'ct') NOT NULL")
+        connection.execute(hosts.update().values(type=_legacytype(hosts)))
+        connection.execute(f"ALTER TABLE {preparer.quote('host')} MODIFY type {target} NOT NULL")
+
+
+def _capacitysummary(connection):
+    """
+    Adds host accounts and creates the capacity summaries table,
+    filled from the existing hosts.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+    """
+    _addcolumns(connection, 'host', 'account_id')
+    _createindexes(connection, 'host', 'ix_host_account_id')
+
+    Base.metadata.tables['capacity_summary'].create(connection, checkfirst=True)
+
+    # Legacy host types cannot be summarized
+    _hosttypes(connection)
+
+    capacity.rebuild(connection)
+
+
+def _reachability(connection):
+    """
+    Creates the address reachability table.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+    """
+    Base.metadata.tables['reachability'].create(connection, checkfirst=True)
+
+
+# Schema migrations as (version, description, function), in order
+MIGRATIONS = [
+    (1, 'Add indexes for hot lookup columns', _lookupindexes),
+    (2, 'Store IP addresses as packed integers', _packedaddresses),
+    (3, 'Add generation counters', _generations),
+    (4, 'Add free address blocks', _freeblocks),
+    (5, 'Add revoked tokens', _revokedtokens),
+    (6, 'Add host containment closure', _hostclosure),
+    (7, 'Add capacity summaries', _capacitysummary),
+    (8, 'Add address reachability', _reachability),
+    (9, 'Replace the legacy host type constraint', _hosttypes),
+]
+
+
+def current(connection):
+    """
+    Retrieves the schema version of the database.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The database connection.
+
+    Returns:
+        int: The schema version, 0 if never migrated.
+    """
+    # Create the version table on unversioned databases
+    SchemaVersion.__table__.create(connection, checkfirst=True)
+
+    version = connection.execute(sqlalchemy.select([sqlalchemy.func.max(SchemaVersion.version)])).scalar()
+
+    return version or 0
+
+
+def stamp(engine):
+    """
+    Marks the database as up to date. Used after creating the
+    schema from scratch, which already includes every migration.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The database engine.
+    """
+    with engine.begin() as connection:
+        version = current(connection)
+
+        for number, description, _ in MIGRATIONS:
+            if number > version:
+                connection.execute(SchemaVersion.__table__.insert(), version=number, description=description)
+
+
+def migrate(engine):
+    """
+    Applies pending migrations, each in its own transaction.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The database engine.
+
+    Returns:
+        list: The (version, description) of the applied migrations.
+    """
+    applied = []
+
+    with engine.connect() as connection:
+        version = current(connection)
+
+    for number, description, function in MIGRATIONS:
+
+        # Skip applied migrations
+        if number <= version:
+            continue
+
+        # Apply migration and record it
+        with engine.begin() as connection:
+            function(connection)
+            connection.execute(SchemaVersion.__table__.insert(), version=number, description=description)
+
+        applied.append((number, description))
+
+    return applied
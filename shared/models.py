@@ -2,12 +2,17 @@
 import time
 
 # Third-party Imports
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, Boolean, Float, String, Enum, ForeignKey, LargeBinary, Index
+from sqlalchemy.dialects import mysql
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
 
 # Create Base model class
 Base = declarative_base()
 
+# IP addresses as 128-bit big-endian integers, IPv4 addresses are IPv4-mapped
+PackedAddress = LargeBinary(16).with_variant(mysql.VARBINARY(16), 'mysql')
+
 
 def unixtime():
     """
@@ -27,6 +32,21 @@ class Account(Base):
     created = Column('created', Integer, default=unixtime)
 
 
+class CapacitySummary(Base):
+
+    __tablename__ = 'capacity_summary'
+
+    dimension = Column('dimension', String(16), primary_key=True)
+    name = Column('name', String(32), primary_key=True)
+    hosts = Column('hosts', Integer, nullable=False, default=0)
+    cpucores = Column('cpucores', BigInteger, nullable=False, default=0)
+    ram = Column('ram', BigInteger, nullable=False, default=0)
+    disk_size = Column('disk_size', BigInteger, nullable=False, default=0)
+    used_cpucores = Column('used_cpucores', BigInteger, nullable=False, default=0)
+    used_ram = Column('used_ram', BigInteger, nullable=False, default=0)
+    used_disk_size = Column('used_disk_size', BigInteger, nullable=False, default=0)
+
+
 class Cabinet(Base):
 
     __tablename__ = 'cabinet'
@@ -35,13 +55,25 @@ class Cabinet(Base):
     name = Column('name', String(255), nullable=False)
     height = Column('height', Integer, nullable=False)
 
+    # Hosts racked in the cabinet, links are written through HostCabinet
+    hosts = relationship('Host', secondary='host_cabinet', order_by='Host.id', viewonly=True)
+
 
 class ContentorizedHosts(Base):
 
     __tablename__ = 'contentorized_hosts'
 
     bm_id = Column('bm_id', Integer, ForeignKey('host.id'), primary_key=True)
-    virt_id = Column('virt_id', Integer, ForeignKey('host.id'), primary_key=True)
+    virt_id = Column('virt_id', Integer, ForeignKey('host.id'), primary_key=True, index=True)
+
+
+class HostClosure(Base):
+
+    __tablename__ = 'host_closure'
+
+    ancestor_id = Column('ancestor_id', Integer, ForeignKey('host.id'), primary_key=True)
+    descendant_id = Column('descendant_id', Integer, ForeignKey('host.id'), primary_key=True, index=True)
+    depth = Column('depth', Integer, nullable=False)
 
 
 class HostCabinet(Base):
@@ -49,18 +81,70 @@ class HostCabinet(Base):
     __tablename__ = 'host_cabinet'
 
     cabinet_id = Column('cabinet_id', Integer, ForeignKey('cabinet.id'), primary_key=True)
-    host_id = Column('host_id', Integer, ForeignKey('host.id'), primary_key=True)
+    host_id = Column('host_id', Integer, ForeignKey('host.id'), primary_key=True, index=True)
+
+
+class FreeBlock(Base):
+
+    __tablename__ = 'free_block'
+    __table_args__ = (
+        Index('ix_free_block_range_first', 'range_id', 'first_ip'),
+        Index('ix_free_block_range_size', 'range_id', 'size'),
+    )
+
+    first = Column('first_ip', PackedAddress, primary_key=True)
+    last = Column('last_ip', PackedAddress, nullable=False)
+    range_id = Column('range_id', Integer, ForeignKey('range.id'), nullable=False)
+    size = Column('size', BigInteger, nullable=False)
+
+
+class Generation(Base):
+
+    __tablename__ = 'generation'
+
+    name = Column('name', String(64), primary_key=True)
+    value = Column('value', Integer, nullable=False, default=0)
+
+
+class Reachability(Base):
+
+    __tablename__ = 'reachability'
+
+    address = Column('address', String(40), primary_key=True)
+    up = Column('up', Boolean, nullable=False, index=True)
+    rtt = Column('rtt', Float, nullable=True)
+    method = Column('method', String(4), nullable=True)
+    checked = Column('checked', Integer, nullable=False)
+    changed = Column('changed', Integer, nullable=False)
+    history = Column('history', LargeBinary, nullable=False)
+
+
+class RevokedToken(Base):
+
+    __tablename__ = 'revoked_token'
+
+    id = Column('id', String(16), primary_key=True)
+    expires = Column('expires', Integer, nullable=False, index=True)
 
 
 class Host(Base):
     __tablename__ = 'host'
 
     id = Column('id', Integer, primary_key=True)
-    type = Column('type', Enum('bm,vm,ct'), nullable=False)
-    hostname = Column('hostname', String(255), nullable=True)
+    type = Column('type', Enum('bm', 'vm', 'ct', name='host_type'), nullable=False, index=True)
+    hostname = Column('hostname', String(255), nullable=True, index=True)
     cpucores = Column('cpucores', Integer, nullable=True)
     ram = Column('ram', Integer, nullable=True)
     disk_size = Column('disk_size', Integer, nullable=True)
+    account_id = Column('account_id', Integer, ForeignKey('account.id'), nullable=True, index=True)
+
+    # Virtual machines and containers running on the host, links are written through ContentorizedHosts
+    guests = relationship(
+        'Host', secondary='contentorized_hosts', primaryjoin='Host.id == ContentorizedHosts.bm_id',
+        secondaryjoin='Host.id == ContentorizedHosts.virt_id', order_by='Host.id', viewonly=True)
+
+    # Assigned IP addresses
+    addresses = relationship('IpAddress', order_by='IpAddress.packed', viewonly=True)
 
 
 class IpAddress(Base):
@@ -68,8 +152,9 @@ class IpAddress(Base):
     __tablename__ = 'ipaddress'
 
     address = Column('address', String(40), primary_key=True)
-    range_id = Column('range_id', Integer, ForeignKey('range.id'), nullable=False)
-    host_id = Column('host_id', Integer, ForeignKey('host.id'), nullable=False)
+    packed = Column('packed', PackedAddress, nullable=False, unique=True, index=True)
+    range_id = Column('range_id', Integer, ForeignKey('range.id'), nullable=False, index=True)
+    host_id = Column('host_id', Integer, ForeignKey('host.id'), nullable=False, index=True)
 
 
 class Range(Base):
@@ -79,6 +164,19 @@ class Range(Base):
     range_id = Column('id', Integer, primary_key=True)
     start_ip = Column('start_ip', String(40), nullable=False)
     netmask = Column('netmask', String(50), nullable=False)
+    family = Column('family', Integer, nullable=False)
+    prefixlen = Column('prefixlen', Integer, nullable=False)
+    first = Column('first_ip', PackedAddress, nullable=False, unique=True, index=True)
+    last = Column('last_ip', PackedAddress, nullable=False)
+
+
+class SchemaVersion(Base):
+
+    __tablename__ = 'schema_version'
+
+    version = Column('version', Integer, primary_key=True, autoincrement=False)
+    description = Column('description', String(255), nullable=False)
+    applied = Column('applied', Integer, default=unixtime)
 
 
 class User(Base):
@@ -86,7 +184,7 @@ class User(Base):
     __tablename__ = 'user'
 
     id = Column('id', Integer, primary_key=True)
-    account_id = Column('account_id', Integer, nullable=False)
+    account_id = Column('account_id', Integer, nullable=False, index=True)
     username = Column('username', String(16), unique=True, nullable=False)
     password = Column('password', String(100), nullable=False)
     name = Column('name', String(50), nullable=True)
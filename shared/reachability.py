@@ -0,0 +1,47 @@
+# Batteries
+import struct
+
+# Generation counter bumped after every sweep
+GENERATION = 'reachability'
+
+# History sample: unix time and round trip time in tenths of milliseconds
+SAMPLE = struct.Struct('<IH')
+
+# Round trip time of failed probes, and the largest one recorded
+DOWN = 0xFFFF
+SLOWEST = 0xFFFE
+
+
+def append(history, when, rtt, size):
+    """
+    Appends a probe result to a history, keeping its latest samples.
+
+    Args:
+        history (bytes): The encoded history.
+        when (int): The probe unix time.
+        rtt (float): The round trip time in seconds, None if the probe failed.
+        size (int): The number of samples to keep.
+
+    Returns:
+        bytes: The encoded history.
+    """
+    value = DOWN if rtt is None else min(int(round(rtt * 10000)), SLOWEST)
+
+    return (history + SAMPLE.pack(when, value))[-size * SAMPLE.size:]
+
+
+def decode(history):
+    """
+    Decodes a history.
+
+    Args:
+        history (bytes): The encoded history.
+
+    Returns:
+        list: The (unix time, round trip time in seconds) samples, oldest
+            first. The round trip time is None for failed probes.
+    """
+    return [
+        (when, None if value == DOWN else value / 10000)
+        for when, value in SAMPLE.iter_unpack(history)
+    ]
@@ -0,0 +1,128 @@
+# Batteries
+import importlib.util
+import os
+import sys
+import threading
+
+# Third-party Imports
+from loguru import logger
+
+
+# Events which mean a source file changed
+CHANGE_EVENTS = ('IN_CLOSE_WRITE', 'IN_MODIFY', 'IN_MOVED_TO', 'IN_MOVED_FROM', 'IN_DELETE')
+
+# Source file extensions to watch
+WATCH_EXTENSIONS = ('.py',)
+
+# Modules kept across reloads, either running the master or holding state it set up
+KEEP_MODULES = ('__main__', 'config', 'master', 'shared.hashing', 'shared.metrics', 'shared.process',
+                'shared.reloader', 'shared.sharedcache')
+
+
+def purge(base):
+    """
+    Removes the project modules from the import cache, so the next
+    imports load the code currently on disk. Called by freshly
+    forked workers in development mode.
+
+    Args:
+        base (str): The project root directory.
+    """
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None) or ''
+
+        if path.startswith(base + os.sep) and name not in KEEP_MODULES:
+            del sys.modules[name]
+
+
+class Reloader(object):
+    """
+    Development mode source watcher.
+
+    Watches the source trees with inotify and reports changes once a
+    burst of events has settled, so saving several files results in
+    a single reload.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+    # Class parameters
+    _stopping = None
+    _watcher = None
+
+    @staticmethod
+    def available():
+        """
+        Checks whether source reloading can run. The inotify package
+        is a development requirement only.
+
+        Returns:
+            bool: True if the inotify package is installed.
+        """
+        return importlib.util.find_spec('inotify') is not None
+
+    @classmethod
+    def start(cls, paths, debounce, callback):
+        """
+        Starts watching the source trees.
+
+        Args:
+            paths (list): The directories to watch recursively.
+            debounce (float): Seconds without changes before reporting them.
+            callback (callable): Called from the watcher thread once changes settle.
+        """
+        # Only needed during development
+        try:
+            import inotify.adapters
+        except ImportError:
+            logger.error('Source reloading requires the inotify package, not reloading.')
+            return
+
+        tree = inotify.adapters.InotifyTrees(paths, block_duration_s=debounce)
+        cls._stopping = threading.Event()
+
+        cls._watcher = threading.Thread(target=cls._run, args=(tree, callback), name='reloader', daemon=True)
+        cls._watcher.start()
+
+        logger.info(f'Watching {", ".join(paths)} for source changes.')
+
+    @classmethod
+    def stop(cls):
+        """
+        Stops watching the source trees.
+        """
+        if cls._watcher is None:
+            return
+
+        cls._stopping.set()
+        cls._watcher.join()
+        cls._watcher = None
+
+    @classmethod
+    def _run(cls, tree, callback):
+        """
+        Background watcher loop. The event generator yields None once no
+        event arrived for the debounce period, which ends a burst.
+
+        Args:
+            tree (inotify.adapters.InotifyTrees): The watched trees.
+            callback (callable): Called once changes settle.
+        """
+        changed = None
+
+        for event in tree.event_gen():
+            if cls._stopping.is_set():
+                break
+
+            # Report a settled burst of changes
+            if event is None:
+                if changed is not None:
+                    logger.info(f'Detected changes in {changed}, reloading API workers.')
+                    callback()
+                    changed = None
+                continue
+
+            _, types, path, filename = event
+
+            if filename.endswith(WATCH_EXTENSIONS) and any(name in types for name in CHANGE_EVENTS):
+                changed = os.path.join(path, filename)
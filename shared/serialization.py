@@ -0,0 +1,76 @@
+# Batteries
+import json
+
+# Third-party Imports
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+# Use the fastest available JSON library
+if orjson is not None:
+    ENCODER = 'orjson'
+    _dumps, loads = orjson.dumps, orjson.loads
+
+elif ujson is not None:
+    ENCODER = 'ujson'
+    _dumps, loads = ujson.dumps, ujson.loads
+
+else:
+    ENCODER = 'json'
+    _dumps, loads = json.dumps, json.loads
+
+
+def dumps(obj):
+    """
+    Encodes an object as UTF-8 JSON.
+
+    Args:
+        obj (object): The object to encode.
+
+    Returns:
+        bytes: The encoded object.
+    """
+    if orjson is not None:
+        return _dumps(obj)
+
+    if ujson is not None:
+        return _dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode()
+
+    return _dumps(obj, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def row(names, values):
+    """
+    Encodes a query column tuple as a JSON object, without
+    building ORM instances.
+
+    Args:
+        names (list): The column names.
+        values (tuple): The column values, as returned by Query for column entities.
+
+    Returns:
+        bytes: The encoded object.
+    """
+    return dumps(dict(zip(names, values)))
+
+
+def rows(names, values):
+    """
+    Encodes query column tuples as a JSON array of objects, in a
+    single encoder call.
+
+    Args:
+        names (list): The column names.
+        values (iterable): The column tuples.
+
+    Returns:
+        bytes: The encoded array.
+    """
+    return dumps([dict(zip(names, value)) for value in values])
@@ -0,0 +1,337 @@
+# Batteries
+import hashlib
+import mmap
+import multiprocessing
+import struct
+import time
+import zlib
+
+# Third-party Imports
+from loguru import logger
+
+# Local Imports
+from .metrics import Metrics
+
+
+# Slot header: sequence, key hash, stamp, expiry, key length and value length
+SLOT = struct.Struct('<IQQdHH')
+
+# Slot sequence, and sequence with key hash
+SEQUENCE = struct.Struct('<I')
+HASH = struct.Struct('<IQ')
+
+# Namespace counter
+COUNTER = struct.Struct('<Q')
+
+# Namespace counters, names sharing a counter invalidate each other
+COUNTERS = 64
+
+# Slots per bucket, a key may be stored in any slot of its bucket
+WAYS = 4
+
+# Copies of a slot a reader attempts before giving up on it
+READ_ATTEMPTS = 64
+
+# Seconds to wait for a writer lock, held for microseconds by live writers
+LOCK_TIMEOUT = 0.5
+
+
+class SharedCache(object):
+    """
+    Cache of small lookup results shared by every API worker.
+
+    Entries live in a fixed size hash table on an anonymous shared
+    memory segment, created by the master process before forking, so
+    workers share a single warm copy. Keys hash to a bucket of a few
+    slots, and full buckets evict the entry closest to expiring.
+
+    Writers serialize on striped locks, one stripe per group of
+    buckets. Readers take no locks: each slot carries a sequence
+    number which writers make odd while updating it, and readers retry
+    when it was odd or changed while they copied the slot, up to a
+    bound past which the lookup misses.
+
+    A writer killed while holding its stripe lock leaves it locked.
+    Writers give up on a stripe whose lock is not released in time:
+    puts to it are skipped, so its lookups fall back to the database,
+    and invalidations proceed without the lock.
+
+    Entries are stamped with the counters of the namespaces they
+    depend on. Invalidating a namespace increments its counter, in
+    the segment, so stale entries miss in every worker at once.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+    # Class parameters
+    _memory = None
+    _locks = ()
+    _abandoned = set()
+    _buckets = 0
+    _slot_size = 0
+    _offset = 0
+    _ttl = 0
+
+    @classmethod
+    def create(cls, slots, slot_size, stripes, ttl):
+        """
+        Creates the shared memory segment. Called by the master
+        process before spawning workers.
+
+        Args:
+            slots (int): The number of slots.
+            slot_size (int): The size of each slot, header included, in bytes.
+            stripes (int): The number of writer locks.
+            ttl (float): Seconds an entry may be served.
+        """
+        cls._buckets = max(slots // WAYS, 1)
+        cls._slot_size, cls._ttl = slot_size, ttl
+        cls._offset = COUNTERS * COUNTER.size
+
+        cls._memory = mmap.mmap(-1, cls._offset + cls._buckets * WAYS * slot_size)
+        cls._locks = tuple(multiprocessing.Lock() for _ in range(stripes))
+
+    @classmethod
+    def close(cls):
+        """
+        Releases the shared memory segment. Called by the master process on exit.
+        """
+        if cls._memory is None:
+            return
+
+        cls._memory.close()
+        cls._memory, cls._locks, cls._abandoned = None, (), set()
+
+    @classmethod
+    def stamp(cls, namespaces):
+        """
+        Returns the current stamp of some namespaces. Read it before
+        the data to cache, so concurrent writes leave the entry stale.
+
+        Args:
+            namespaces (tuple): The namespaces an entry depends on.
+
+        Returns:
+            int: The stamp, None if the cache does not exist.
+        """
+        if cls._memory is None:
+            return None
+
+        # Counters only grow, so their sum changes with any of them
+        return sum(
+            COUNTER.unpack_from(cls._memory, cls._counter(namespace) * COUNTER.size)[0]
+            for namespace in namespaces)
+
+    @classmethod
+    def invalidate(cls, *namespaces):
+        """
+        Invalidates every entry depending on some namespaces.
+        Call once the writes are committed.
+
+        Args:
+            namespaces (str): The namespaces.
+        """
+        if cls._memory is None:
+            return
+
+        for namespace in namespaces:
+            index = cls._counter(namespace)
+            locked = cls._acquire(index % len(cls._locks))
+
+            # Entries must go stale even if the lock holder died
+            try:
+                value = COUNTER.unpack_from(cls._memory, index * COUNTER.size)[0]
+                COUNTER.pack_into(cls._memory, index * COUNTER.size, value + 1)
+            finally:
+                if locked:
+                    cls._locks[index % len(cls._locks)].release()
+
+    @classmethod
+    def get(cls, key, stamp):
+        """
+        Retrieves an entry.
+
+        Args:
+            key (str): The entry key.
+            stamp (int): The current stamp of the namespaces it depends on.
+
+        Returns:
+            bytes: The entry value, None on misses.
+        """
+        if cls._memory is None:
+            return None
+
+        encoded = key.encode()
+        digest, bucket = cls._hash(encoded)
+        now = time.monotonic()
+
+        for offset in cls._slots(bucket):
+
+            # Only copy slots whose key hash matches
+            if HASH.unpack_from(cls._memory, offset)[1] != digest:
+                continue
+
+            entry = cls._read(offset)
+
+            if entry is None:
+                continue
+
+            hashed, stored, expires, name, value = entry
+
+            if hashed == digest and name == encoded:
+                if stored == stamp and expires > now:
+                    Metrics.increment('ping_shared_cache_requests_total', (('result', 'hit'),))
+                    return value
+                break
+
+        Metrics.increment('ping_shared_cache_requests_total', (('result', 'miss'),))
+
+        return None
+
+    @classmethod
+    def put(cls, key, stamp, value):
+        """
+        Stores an entry, unless it does not fit a slot.
+
+        Args:
+            key (str): The entry key.
+            stamp (int): The stamp read before the value was computed.
+            value (bytes): The entry value.
+        """
+        if cls._memory is None:
+            return
+
+        encoded = key.encode()
+
+        if SLOT.size + len(encoded) + len(value) > cls._slot_size:
+            return
+
+        digest, bucket = cls._hash(encoded)
+        memory = cls._memory
+        stripe = bucket % len(cls._locks)
+
+        if not cls._acquire(stripe):
+            return
+
+        try:
+            # Reuse the key slot, or evict the entry closest to expiring
+            victim, earliest = None, None
+            for offset in cls._slots(bucket):
+                _, hashed, _, expires, length, _ = SLOT.unpack_from(memory, offset)
+
+                if hashed == digest and memory[offset + SLOT.size:offset + SLOT.size + length] == encoded:
+                    victim = offset
+                    break
+
+                if earliest is None or expires < earliest:
+                    victim, earliest = offset, expires
+
+            # Odd sequence numbers make readers retry
+            sequence = SEQUENCE.unpack_from(memory, victim)[0]
+            SEQUENCE.pack_into(memory, victim, (sequence + 1) & 0xFFFFFFFF)
+
+            SLOT.pack_into(
+                memory, victim, (sequence + 1) & 0xFFFFFFFF, digest, stamp, time.monotonic() + cls._ttl,
+                len(encoded), len(value))
+            memory[victim + SLOT.size:victim + SLOT.size + len(encoded) + len(value)] = encoded + value
+
+            SEQUENCE.pack_into(memory, victim, (sequence + 2) & 0xFFFFFFFF)
+
+        finally:
+            cls._locks[stripe].release()
+
+    @classmethod
+    def _acquire(cls, stripe):
+        """
+        Acquires a writer lock, giving up on it for good if it is not
+        released in time, as happens when its holder was killed.
+
+        Args:
+            stripe (int): The lock index.
+
+        Returns:
+            bool: True if the lock was acquired.
+        """
+        if stripe in cls._abandoned:
+            return False
+
+        if cls._locks[stripe].acquire(timeout=LOCK_TIMEOUT):
+            return True
+
+        cls._abandoned.add(stripe)
+        logger.warning(f'Shared cache lock {stripe} was not released in {LOCK_TIMEOUT}s, bypassing it.')
+
+        return False
+
+    @classmethod
+    def _read(cls, offset):
+        """
+        Copies a slot consistently.
+
+        Args:
+            offset (int): The slot offset.
+
+        Returns:
+            tuple: The key hash, stamp, expiry, key and value, None if the slot
+                is empty or kept being written while copied.
+        """
+        memory = cls._memory
+
+        for _ in range(READ_ATTEMPTS):
+            sequence, hashed, stamp, expires, length, size = SLOT.unpack_from(memory, offset)
+            start = offset + SLOT.size
+            key, value = memory[start:start + length], memory[start + length:start + length + size]
+
+            # Retry while being written or if overwritten while copied
+            if sequence & 1 or SEQUENCE.unpack_from(memory, offset)[0] != sequence:
+                continue
+
+            if not hashed:
+                return None
+
+            return hashed, stamp, expires, key, value
+
+        return None
+
+    @classmethod
+    def _slots(cls, bucket):
+        """
+        Returns the slot offsets of a bucket.
+
+        Args:
+            bucket (int): The bucket index.
+
+        Returns:
+            range: The slot offsets.
+        """
+        start = cls._offset + bucket * WAYS * cls._slot_size
+
+        return range(start, start + WAYS * cls._slot_size, cls._slot_size)
+
+    @classmethod
+    def _hash(cls, key):
+        """
+        Hashes a key, identically in every process.
+
+        Args:
+            key (bytes): The encoded key.
+
+        Returns:
+            tuple: The non zero 64 bit hash and the bucket index.
+        """
+        digest = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little') or 1
+
+        return digest, digest % cls._buckets
+
+    @staticmethod
+    def _counter(namespace):
+        """
+        Returns the counter index of a namespace.
+
+        Args:
+            namespace (str): The namespace.
+
+        Returns:
+            int: The counter index.
+        """
+        return zlib.crc32(namespace.encode()) % COUNTERS
@@ -0,0 +1,227 @@
+# Batteries
+import base64
+import collections
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+
+# Third-party Imports
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+
+# Local Imports
+from . import generations
+from .datastore import insertignore
+from .metrics import Metrics
+from .models import RevokedToken
+
+# Generation counter bumped on every revocation
+GENERATION = 'auth'
+
+
+class InvalidToken(Exception):
+    """
+    Thrown when a token is malformed, forged, expired or revoked.
+
+    Args:
+        builtins.Exception (class): Builtin exception class.
+    """
+    ...
+
+
+class Tokens(object):
+    """
+    Stateless, HMAC signed access tokens.
+
+    A token carries the user and account identifiers, its expiry and a
+    random identifier, followed by an HMAC-SHA256 signature over them,
+    so any worker sharing the secret verifies it without the database.
+
+    Recently verified tokens are kept in a small LRU, so most requests
+    only cost a dictionary lookup. Revoked token identifiers are kept
+    in memory until they expire, and reloaded by a background thread
+    whenever the 'auth' generation counter changes.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+    # Class parameters
+    _secret = None
+    _ttl = 3600
+    _size = 0
+    _verified = collections.OrderedDict()
+    _revoked = {}
+    _version = None
+    _Session = None
+    _stopping = None
+    _refresher = None
+
+    @classmethod
+    def start(cls, secret, ttl, size, session_factory, interval):
+        """
+        Configures token signing and starts the revocation refresher.
+
+        Args:
+            secret (str): The signing secret, shared by every worker.
+            ttl (int): Seconds a token is valid for.
+            size (int): The number of verified tokens to remember.
+            session_factory (sqlalchemy.orm.sessionmaker): The session factory.
+            interval (float): Seconds between revocation checks.
+        """
+        cls._secret, cls._ttl, cls._size = secret.encode(), ttl, size
+        cls._verified, cls._revoked, cls._version = collections.OrderedDict(), {}, None
+        cls._Session = session_factory
+        cls._stopping = threading.Event()
+
+        cls._refresher = threading.Thread(target=cls._run, args=(interval,), name='tokens', daemon=True)
+        cls._refresher.start()
+
+    @classmethod
+    def stop(cls):
+        """
+        Stops the revocation refresher.
+        """
+        if cls._refresher is None:
+            return
+
+        cls._stopping.set()
+        cls._refresher.join()
+        cls._refresher = None
+
+    @classmethod
+    def _sign(cls, body):
+        """
+        Signs a token body.
+
+        Args:
+            body (str): The token body.
+
+        Returns:
+            str: The URL safe signature.
+        """
+        digest = hmac.new(cls._secret, body.encode(), hashlib.sha256).digest()
+
+        return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+    @classmethod
+    def issue(cls, user_id, account_id):
+        """
+        Issues a token.
+
+        Args:
+            user_id (int): The user identifier.
+            account_id (int): The user account identifier.
+
+        Returns:
+            tuple: The token and its expiry, as a unix timestamp.
+        """
+        expires = int(time.time()) + cls._ttl
+        body = f'{user_id}.{account_id}.{expires}.{secrets.token_hex(8)}'
+
+        return f'{body}.{cls._sign(body)}', expires
+
+    @classmethod
+    def verify(cls, token):
+        """
+        Verifies a token.
+
+        Args:
+            token (str): The token.
+
+        Raises:
+            InvalidToken: If the token is malformed, forged, expired or revoked.
+
+        Returns:
+            dict: The token claims: user_id, account_id, expires and id.
+        """
+        claims = cls._verified.get(token)
+
+        # Verify signature on first sight only
+        if claims is None:
+            body, _, signature = token.rpartition('.')
+
+            if not token.isascii() or not hmac.compare_digest(signature, cls._sign(body)):
+                Metrics.increment('ping_auth_tokens_total', (('result', 'rejected'),))
+                raise InvalidToken('Invalid token.')
+
+            user_id, account_id, expires, identifier = body.split('.')
+            claims = {'user_id': int(user_id), 'account_id': int(account_id), 'expires': int(expires), 'id': identifier}
+
+            cls._verified[token] = claims
+            if len(cls._verified) > cls._size:
+                cls._verified.popitem(last=False)
+
+            Metrics.increment('ping_auth_tokens_total', (('result', 'verified'),))
+        else:
+            cls._verified.move_to_end(token)
+            Metrics.increment('ping_auth_tokens_total', (('result', 'cached'),))
+
+        if claims['expires'] <= time.time():
+            cls._verified.pop(token, None)
+            raise InvalidToken('Token expired.')
+
+        if claims['id'] in cls._revoked:
+            raise InvalidToken('Token revoked.')
+
+        return claims
+
+    @classmethod
+    def revoke(cls, session, claims):
+        """
+        Revokes a token within the session transaction, and
+        immediately in this process.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session.
+            claims (dict): The verified token claims.
+        """
+        now = int(time.time())
+
+        # Forget revocations of tokens which expired on their own
+        session.query(RevokedToken).filter(RevokedToken.expires <= now).delete(synchronize_session=False)
+
+        # Another worker may not know yet the token was already revoked
+        session.execute(
+            insertignore(RevokedToken.__table__, session.get_bind().dialect).values(
+                id=claims['id'], expires=claims['expires']))
+        generations.bump(session, GENERATION)
+
+        cls._revoked[claims['id']] = claims['expires']
+
+    @classmethod
+    def refresh(cls):
+        """
+        Reloads the revoked token identifiers if the 'auth' generation changed.
+        """
+        session = cls._Session()
+
+        try:
+            # Read generation before data, a concurrent revocation triggers another reload
+            version = generations.read(session, GENERATION)[GENERATION]
+
+            if version == cls._version:
+                return
+
+            now = int(time.time())
+            cls._revoked = dict(
+                session.query(RevokedToken.id, RevokedToken.expires).filter(RevokedToken.expires > now))
+            cls._version = version
+
+        except SQLAlchemyError as e:
+            logger.warning(f'Could not read revoked tokens: {str(e)}')
+
+        finally:
+            session.close()
+
+    @classmethod
+    def _run(cls, interval):
+        """
+        Background revocation refresher loop.
+        """
+        while True:
+            cls.refresh()
+
+            if cls._stopping.wait(interval):
+                break
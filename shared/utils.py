@@ -1,3 +1,6 @@
+# Batteries
+import copy
+
 # Third-party imports
 from loguru import logger
 from jsonschema import validators, Draft7Validator
@@ -19,22 +22,29 @@ class StreamToLogger(object):
             level (str, optional): The level of luguru logging to use. Defaults to "INFO".
         """
         self._level = level
+        self._partial = ''
 
     def write(self, buffer):
         """
-        Writes buffer contents into as log messages.
+        Writes complete lines of the buffer as a single log message,
+        keeping any unterminated line for the next write.
 
         Args:
             buffer ([type]): The buffer.
         """
-        for line in buffer.rstrip().splitlines():
-            logger.log(self._level, line.rstrip())
+        lines, _, self._partial = (self._partial + buffer).rpartition('\n')
+
+        if lines.strip():
+            logger.log(self._level, lines.rstrip())
 
     def flush(self):
         """
-        Override default behavior.
+        Writes the unterminated line, if any.
         """
-        pass
+        if self._partial.strip():
+            logger.log(self._level, self._partial.rstrip())
+
+        self._partial = ''
 
 
 def keyreplace(obj, old, new):
@@ -66,8 +76,8 @@ def extend_with_default(validator_class):
 
     def set_defaults(validator, properties, instance, schema):
         for property, subschema in properties.items():
-            if "default" in subschema:
-                instance.setdefault(property, subschema["default"])
+            if "default" in subschema and validator.is_type(instance, "object"):
+                instance.setdefault(property, copy.deepcopy(subschema["default"]))
 
         for error in validate_properties(validator, properties, instance, schema):
             yield error
@@ -76,3 +86,25 @@ def extend_with_default(validator_class):
 
 
 DefaultValidatingDraft7Validator = extend_with_default(Draft7Validator)
+
+
+def iterlines(stream, blocksize=65536):
+    """
+    Yields the lines of a binary stream, reading it in blocks.
+
+    Args:
+        stream (io.RawIOBase): The stream to read from.
+        blocksize (int, optional): The number of bytes per read. Defaults to 65536.
+
+    Yields:
+        bytes: Each line, without the line terminator.
+    """
+    buffer = b''
+
+    for block in iter(lambda: stream.read(blocksize), b''):
+        *lines, buffer = (buffer + block).split(b'\n')
+        yield from lines
+
+    # Last line may not be terminated
+    if buffer:
+        yield buffer
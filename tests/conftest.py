@@ -0,0 +1,6 @@
+# Batteries
+import os
+import sys
+
+# Import the application and the benchmark harness from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
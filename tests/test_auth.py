@@ -0,0 +1,79 @@
+"""
+Password verification on the hasher process.
+"""
+# Batteries
+import contextlib
+import os
+import signal
+import threading
+import time
+
+# Local Imports
+from benchmarks.server import PingServer
+
+
+def hasher(server):
+    """
+    Returns the process id of the hasher.
+
+    Args:
+        server (PingServer): The instance.
+
+    Returns:
+        int: The hasher pid.
+    """
+    for pid in server.children():
+        with contextlib.suppress(FileNotFoundError), open(f'/proc/{pid}/cmdline', 'rb') as file:
+            if file.read().startswith(b'ping: ping-hasher'):
+                return pid
+
+    raise AssertionError('the hasher is not running')
+
+
+def login(server, username, password):
+    """
+    Logs in.
+
+    Args:
+        server (PingServer): The instance.
+        username (str): The username.
+        password (str): The password.
+
+    Returns:
+        int: The response status.
+    """
+    return server.request('POST', '/api/auth/login', {'username': username, 'password': password})[0]
+
+
+def test_login_verifies_on_the_hasher():
+    with PingServer(hashing={'rounds': 1000, 'timeout': 1}) as server:
+        status, body = server.request(
+            'POST', '/api/accounts', {'name': 'account', 'username': 'user', 'password': 'secret'})
+        assert status == 201, body
+
+        assert login(server, 'user', 'secret') == 200
+        assert login(server, 'user', 'wrong') == 401
+        assert login(server, 'unknown', 'secret') == 401
+
+        # Logins wait for the hasher, and give up once it does not answer in time
+        pid = hasher(server)
+        os.kill(pid, signal.SIGSTOP)
+
+        try:
+            statuses, start = [], time.monotonic()
+            waiting = threading.Thread(target=lambda: statuses.append(login(server, 'user', 'secret')))
+            waiting.start()
+
+            # The other worker keeps serving meanwhile
+            status, _ = server.request('GET', '/api/health')
+            assert status == 200
+            assert time.monotonic() - start < 1
+
+            waiting.join()
+            assert statuses == [503]
+            assert time.monotonic() - start >= 1
+
+        finally:
+            os.kill(pid, signal.SIGCONT)
+
+        assert login(server, 'user', 'secret') == 200
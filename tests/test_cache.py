@@ -0,0 +1,55 @@
+"""
+Response cache invalidation across API workers.
+"""
+# Batteries
+import http.client
+import json
+
+# Local Imports
+from benchmarks.server import PingServer
+
+# Requests spread over the workers, enough to reach each of them
+REQUESTS = 32
+
+
+def get(server, path, etag=None):
+    """
+    Sends a GET request, conditional when given an entity tag.
+
+    Args:
+        server (PingServer): The instance.
+        path (str): The request path.
+        etag (str, optional): The 'If-None-Match' entity tag. Defaults to None.
+
+    Returns:
+        tuple: The response status, entity tag and body.
+    """
+    connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=10)
+
+    try:
+        connection.request('GET', path, headers={'If-None-Match': etag} if etag else {})
+        response = connection.getresponse()
+
+        return response.status, response.getheader('ETag'), response.read()
+
+    finally:
+        connection.close()
+
+
+def test_writes_invalidate_every_worker():
+    # Database counters are only polled long after the test is over
+    with PingServer(cache={'interval': 60}) as server:
+
+        # Cache the empty listing in every worker
+        etags = {get(server, '/api/hosts')[1] for _ in range(REQUESTS)}
+        assert len(etags) == 1
+
+        status, _ = server.request('POST', '/api/hosts', {'type': 'bm'})
+        assert status == 201
+
+        # Every worker serves the new host, and no stale copy is confirmed current
+        for _ in range(REQUESTS):
+            status, etag, body = get(server, '/api/hosts', next(iter(etags)))
+            assert status == 200, status
+            assert etag not in etags
+            assert len(json.loads(body)['hosts']) == 1, body
@@ -0,0 +1,64 @@
+"""
+Cabinet capacity counted the same by summaries, scans and projections.
+"""
+# Third-party Imports
+import sqlalchemy
+import sqlalchemy.orm
+
+# Local Imports
+from shared import capacity, containment
+from shared.models import Base, Cabinet, Host, HostCabinet
+
+# Hosts by id, with the cabinet they are racked in and the host they run on
+HOSTS = {
+    1: ({'type': 'bm', 'cpucores': 32, 'ram': 128, 'disk_size': 1000}, 1, None),
+    2: ({'type': 'vm', 'cpucores': 4, 'ram': 8, 'disk_size': 50}, 1, None),
+    3: ({'type': 'vm', 'cpucores': 8, 'ram': 16, 'disk_size': 100}, None, 1),
+    4: ({'type': 'ct', 'cpucores': 1, 'ram': 2, 'disk_size': 10}, None, 3),
+    5: ({'type': 'ct', 'cpucores': 2, 'ram': 2, 'disk_size': 20}, None, 2),
+    6: ({'type': 'bm', 'cpucores': 16, 'ram': 64, 'disk_size': 500}, 2, None),
+    7: ({'type': 'bm', 'cpucores': 64, 'ram': 256, 'disk_size': 2000}, None, None),
+}
+
+# The cabinet each host is counted in by projections, as capacity or allocated
+ALLOCATED = {1: 1, 2: 1, 3: 1, 4: None, 5: None, 6: 2, 7: None}
+
+
+def test_cabinet_capacity_agrees(tmp_path, monkeypatch):
+    engine = sqlalchemy.create_engine(f'sqlite:///{tmp_path}/ping.sqlite')
+    Base.metadata.create_all(engine)
+    session = sqlalchemy.orm.sessionmaker(bind=engine)()
+
+    session.add_all([Cabinet(id=1, name='c1', height=42), Cabinet(id=2, name='c2', height=42)])
+    session.add_all([Host(id=host_id, **host) for host_id, (host, _, _) in HOSTS.items()])
+    session.add_all([
+        HostCabinet(cabinet_id=cabinet_id, host_id=host_id)
+        for host_id, (_, cabinet_id, _) in HOSTS.items() if cabinet_id is not None])
+    session.flush()
+
+    pairs = [(parent, host_id) for host_id, (_, _, parent) in HOSTS.items() if parent is not None]
+    containment.link(session, pairs)
+
+    # Count the hosts as an import does
+    delta = capacity.CapacityDelta()
+    for host, cabinet_id, _ in HOSTS.values():
+        delta.host(host, cabinet_id)
+    delta.guests(session, pairs, {host_id: host for host_id, (host, _, _) in HOSTS.items()})
+    delta.apply(session)
+    session.commit()
+
+    summarized = capacity.totals(session, 'cabinet')
+    scanned = capacity.aggregate(session, 'cabinet')
+
+    # Physical hosts are capacity, racked guests and guests directly on racked physical hosts are allocated
+    assert scanned == {'1': [1, 32, 128, 1000, 12, 24, 150], '2': [1, 16, 64, 500, 0, 0, 0]}
+    assert summarized == scanned
+
+    records = [dict(host, cabinet_id=ALLOCATED[host_id]) for host_id, (host, _, _) in HOSTS.items()]
+    assert capacity.project(records, 'cabinet') == scanned
+
+    monkeypatch.setattr(capacity, 'numpy', None)
+    assert capacity.project(records, 'cabinet') == scanned
+
+    session.close()
+    engine.dispose()
@@ -0,0 +1,90 @@
+"""
+Concurrent address allocation through several API workers.
+"""
+# Batteries
+import json
+import random
+import threading
+
+# Third-party Imports
+import sqlalchemy
+
+# Local Imports
+from benchmarks.server import PingServer
+
+# Allocating threads, and allocations made by each
+THREADS, ALLOCATIONS = 16, 25
+
+
+def allocate(server, range_id, host_id, count, results, errors):
+    """
+    Allocates blocks of addresses, retrying on contention.
+
+    Args:
+        server (PingServer): The instance.
+        range_id (int): The range identifier.
+        host_id (int): The host identifier.
+        count (int): The number of allocations.
+        results (list): The allocated blocks, appended to.
+        errors (list): The unexpected responses, appended to.
+    """
+    for _ in range(count):
+        size = random.randint(1, 4)
+
+        while True:
+            status, body = server.request('POST', f'/api/ranges/{range_id}/allocate', {'host_id': host_id, 'count': size})
+
+            if status != 503:
+                break
+
+        if status != 201:
+            errors.append((status, body))
+            continue
+
+        results.append(json.loads(body)['addresses'])
+
+
+def test_parallel_allocations_assign_each_address_once():
+    with PingServer(api={'workers': 4}) as server:
+        status, body = server.request('POST', '/api/ranges', {'network': '10.8.0.0/22'})
+        assert status == 201, body
+        range_id = json.loads(body)['id']
+
+        status, body = server.request('POST', '/api/hosts/import', [{'type': 'bm'}])
+        host_id = json.loads(body)['results'][0]['id']
+
+        results, errors = [], []
+        threads = [
+            threading.Thread(target=allocate, args=(server, range_id, host_id, ALLOCATIONS, results, errors))
+            for _ in range(THREADS)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors
+        assert len(results) == THREADS * ALLOCATIONS
+
+        # Blocks are contiguous and no address was handed out twice
+        allocated = [address for block in results for address in block]
+        assert len(allocated) == len(set(allocated))
+
+        engine = sqlalchemy.create_engine(server.config['datastore']['url'])
+        with engine.connect() as connection:
+            rows = connection.execute('SELECT address FROM ipaddress').fetchall()
+            free = connection.execute('SELECT SUM(size) FROM free_block WHERE range_id = ?', range_id).scalar()
+        engine.dispose()
+
+        # Every assigned row was returned once, and the free list holds the rest
+        assert sorted(row[0] for row in rows) == sorted(allocated)
+        assert free + len(allocated) == 1022
+
+
+def test_allocation_size_is_capped():
+    with PingServer() as server:
+        status, body = server.request('POST', '/api/ranges', {'network': '10.0.0.0/8'})
+        range_id = json.loads(body)['id']
+
+        status, _ = server.request('POST', f'/api/ranges/{range_id}/allocate', {'host_id': 1, 'count': 1 << 20})
+        assert status == 400
@@ -0,0 +1,135 @@
+"""
+Supervision of the API workers by the master process.
+"""
+# Batteries
+import glob
+import os
+import signal
+import threading
+import time
+
+# Local Imports
+from benchmarks.server import PingServer
+
+# Seconds a killed worker may take to be replaced by a serving one
+RESPAWN_LIMIT = 5
+
+# Concurrent clients and reloads of the reload test
+CLIENTS, RELOADS = 8, 5
+
+
+def replacement(server, previous, timeout):
+    """
+    Waits for an API worker which was not running before to publish
+    its metrics, which it does right before serving.
+
+    Args:
+        server (PingServer): The instance.
+        previous (list): The API worker pids before.
+        timeout (float): Seconds to wait.
+
+    Returns:
+        int: The new worker pid, None if none started in time.
+    """
+    directory = server.config['metrics']['directory']
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        for pid in set(server.workers()) - set(previous):
+            if glob.glob(os.path.join(directory, f'*-{pid}.json')):
+                return pid
+
+        time.sleep(0.01)
+
+    return None
+
+
+def hammer(server, stop, counts, failures):
+    """
+    Requests the liveness check until stopped.
+
+    Args:
+        server (PingServer): The instance.
+        stop (threading.Event): Set to stop requesting.
+        counts (list): The number of requests sent, appended to.
+        failures (list): The failed requests, appended to.
+    """
+    sent = 0
+
+    while not stop.is_set():
+        sent += 1
+
+        try:
+            status, body = server.request('GET', '/api/health')
+            if status != 200:
+                failures.append((status, body))
+        except OSError as e:
+            failures.append(e)
+
+    counts.append(sent)
+
+
+def reloaded(server, previous, timeout):
+    """
+    Waits for a reload to replace every API worker.
+
+    Args:
+        server (PingServer): The instance.
+        previous (list): The API worker pids before the reload.
+        timeout (float): Seconds to wait.
+
+    Returns:
+        bool: True if no previous worker is left.
+    """
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        workers = server.workers()
+
+        if workers and not set(workers) & set(previous):
+            return True
+
+        time.sleep(0.05)
+
+    return False
+
+
+def test_reload_under_load_fails_no_request():
+    with PingServer(api={'workers': 2}) as server:
+        stop, counts, failures = threading.Event(), [], []
+        clients = [threading.Thread(target=hammer, args=(server, stop, counts, failures)) for _ in range(CLIENTS)]
+
+        for client in clients:
+            client.start()
+
+        try:
+            for _ in range(RELOADS):
+                workers = server.workers()
+                server.reload()
+                assert reloaded(server, workers, 30), 'the reload did not replace the workers'
+
+        finally:
+            stop.set()
+            for client in clients:
+                client.join()
+
+        print(f'{sum(counts)} requests across {RELOADS} reloads, {len(failures)} failed')
+
+        assert not failures, failures[:5]
+
+
+def test_killed_worker_is_respawned_promptly():
+    with PingServer(api={'workers': 2}, metrics={'interval': 0.1}) as server:
+        workers = server.workers()
+        assert len(workers) == 2
+
+        start = time.monotonic()
+        os.kill(workers[0], signal.SIGKILL)
+
+        pid = replacement(server, workers, RESPAWN_LIMIT)
+        latency = time.monotonic() - start
+        print(f'respawned worker {workers[0]} as {pid} in {latency * 1000:.0f} ms')
+
+        assert pid is not None, 'the killed worker was not respawned in time'
+        assert sorted(server.workers()) == sorted([workers[1], pid])
+        assert server.request('GET', '/api/health')[0] == 200
@@ -0,0 +1,74 @@
+"""
+Migration of a database created with the baseline schema.
+"""
+# Third-party Imports
+import sqlalchemy
+
+# Local Imports
+from shared import migrations
+
+# The baseline schema, as created before any migration
+BASELINE = [
+    'CREATE TABLE account (id INTEGER NOT NULL, name VARCHAR(255) NOT NULL, created INTEGER, PRIMARY KEY (id))',
+    'CREATE TABLE cabinet (id INTEGER NOT NULL, name VARCHAR(255) NOT NULL, height INTEGER NOT NULL, PRIMARY KEY (id))',
+    "CREATE TABLE host (id INTEGER NOT NULL, type VARCHAR(8) NOT NULL, hostname VARCHAR(255), cpucores INTEGER, "
+    "ram INTEGER, disk_size INTEGER, PRIMARY KEY (id), CHECK (type IN ('bm,vm,ct')))",
+    'CREATE TABLE range (id INTEGER NOT NULL, start_ip VARCHAR(40) NOT NULL, netmask VARCHAR(50) NOT NULL, '
+    'PRIMARY KEY (id))',
+    'CREATE TABLE user (id INTEGER NOT NULL, account_id INTEGER NOT NULL, username VARCHAR(16) NOT NULL, '
+    'password VARCHAR(100) NOT NULL, name VARCHAR(50), created INTEGER, PRIMARY KEY (id), UNIQUE (username))',
+    'CREATE TABLE contentorized_hosts (bm_id INTEGER NOT NULL, virt_id INTEGER NOT NULL, PRIMARY KEY (bm_id, virt_id), '
+    'FOREIGN KEY(bm_id) REFERENCES host (id), FOREIGN KEY(virt_id) REFERENCES host (id))',
+    'CREATE TABLE host_cabinet (cabinet_id INTEGER NOT NULL, host_id INTEGER NOT NULL, '
+    'PRIMARY KEY (cabinet_id, host_id), '
+    'FOREIGN KEY(cabinet_id) REFERENCES cabinet (id), FOREIGN KEY(host_id) REFERENCES host (id))',
+    'CREATE TABLE ipaddress (address VARCHAR(40) NOT NULL, range_id INTEGER NOT NULL, host_id INTEGER NOT NULL, '
+    'PRIMARY KEY (address), FOREIGN KEY(range_id) REFERENCES range (id), FOREIGN KEY(host_id) REFERENCES host (id))',
+]
+
+
+def test_baseline_database_migrates(tmp_path):
+    engine = sqlalchemy.create_engine(f'sqlite:///{tmp_path}/ping.sqlite')
+
+    with engine.begin() as connection:
+        for statement in BASELINE:
+            connection.execute(statement)
+
+        # A racked host running a guest, and an unlinked host, all of the only type allowed
+        connection.execute("INSERT INTO cabinet (id, name, height) VALUES (1, 'c1', 42)")
+        connection.execute(
+            "INSERT INTO host (id, type, hostname, cpucores, ram, disk_size) VALUES "
+            "(1, 'bm,vm,ct', 'metal', 32, 128, 1000), (2, 'bm,vm,ct', 'guest', 4, 8, 50), "
+            "(3, 'bm,vm,ct', 'spare', 8, 16, 100)")
+        connection.execute('INSERT INTO host_cabinet (cabinet_id, host_id) VALUES (1, 1)')
+        connection.execute('INSERT INTO contentorized_hosts (bm_id, virt_id) VALUES (1, 2)')
+        connection.execute("INSERT INTO range (id, start_ip, netmask) VALUES (1, '10.0.0.0', '255.255.255.0')")
+        connection.execute("INSERT INTO ipaddress (address, range_id, host_id) VALUES ('10.0.0.1', 1, 1)")
+
+    applied = migrations.migrate(engine)
+    assert [number for number, _ in applied] == [number for number, _, _ in migrations.MIGRATIONS]
+
+    with engine.begin() as connection:
+
+        # Legacy types were mapped from the containment links
+        types = connection.execute('SELECT id, type FROM host ORDER BY id').fetchall()
+        assert [tuple(row) for row in types] == [(1, 'bm'), (2, 'vm'), (3, 'bm')]
+
+        # New hosts can be created, and unknown types are still refused
+        connection.execute("INSERT INTO host (type, hostname) VALUES ('bm', 'new')")
+
+        try:
+            connection.execute("INSERT INTO host (type, hostname) VALUES ('bm,vm,ct', 'legacy')")
+        except sqlalchemy.exc.IntegrityError:
+            pass
+        else:
+            raise AssertionError('the legacy host type was accepted')
+
+        # Indexes survived the table copy, and capacity was summarized
+        indexes = {index['name'] for index in sqlalchemy.inspect(connection).get_indexes('host')}
+        assert {'ix_host_type', 'ix_host_hostname', 'ix_host_account_id'} <= indexes
+        assert connection.execute('SELECT COUNT(*) FROM capacity_summary').scalar() > 0
+
+    # Already migrated databases have nothing left to apply
+    assert migrations.migrate(engine) == []
+    engine.dispose()
@@ -0,0 +1,163 @@
+"""
+Reachability probing against local responders.
+"""
+# Batteries
+import asyncio
+import socket
+
+# Third-party Imports
+import pytest
+
+# Local Imports
+from modules.prober.engine import Echo, ProbeEngine
+
+# Engine settings: concurrency, rate, timeout, smallest and largest timeout, and retries
+SETTINGS = (64, 100, 0.5, 0.05, 1.0, 1)
+
+
+def freeport():
+    """
+    Returns a local TCP port nothing listens on.
+
+    Returns:
+        int: The port.
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def sweep(addresses, ports, icmp=False, echo=None):
+    """
+    Sweeps addresses with a new engine.
+
+    Args:
+        addresses (list): The IP addresses.
+        ports (list): The TCP fallback ports.
+        icmp (bool, optional): Whether to probe with ICMP. Defaults to False.
+        echo (object, optional): Replaces the IPv4 ICMP prober. Defaults to None.
+
+    Returns:
+        dict: The (round trip time, method) probe result by address.
+    """
+    engine = ProbeEngine(*SETTINGS, ports, icmp)
+    engine.open()
+
+    if echo is not None:
+        engine._echo[socket.AF_INET] = echo
+
+    try:
+        return await engine.sweep(addresses)
+    finally:
+        engine.close()
+
+
+class Responder(object):
+    """
+    Local TCP responder accepting and closing connections.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+
+    async def __aenter__(self):
+        self.accepted = 0
+        self.server = await asyncio.start_server(self._accept, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *args):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _accept(self, reader, writer):
+        self.accepted += 1
+        writer.close()
+
+
+class Silent(object):
+    """
+    ICMP prober whose probes are never answered.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+
+    def __init__(self):
+        self.timeouts = []
+
+    async def ping(self, address, timeout):
+        self.timeouts.append(timeout)
+        return None
+
+    def close(self):
+        pass
+
+
+class Failing(object):
+    """
+    ICMP prober failing on every probe.
+
+    Args:
+        builtins.object (class): Builtin object class.
+    """
+
+    async def ping(self, address, timeout):
+        raise AttributeError('sock_sendto')
+
+    def close(self):
+        pass
+
+
+def test_listening_port_is_up():
+    async def run():
+        async with Responder() as responder:
+            results = await sweep(['127.0.0.1'], [responder.port])
+            return results, responder.accepted
+
+    results, accepted = asyncio.run(run())
+
+    rtt, method = results['127.0.0.1']
+    assert method == 'tcp' and rtt is not None and rtt >= 0
+    assert accepted == 1
+
+
+def test_refused_port_is_up():
+    rtt, method = asyncio.run(sweep(['127.0.0.1'], [freeport()]))['127.0.0.1']
+
+    assert method == 'tcp' and rtt is not None
+
+
+def test_unanswered_address_is_down():
+    echo = Silent()
+    rtt, method = asyncio.run(sweep(['127.0.0.1'], [], echo=echo))['127.0.0.1']
+
+    # Each retry waits twice as long
+    assert (rtt, method) == (None, 'icmp')
+    assert echo.timeouts == [0.5, 1.0]
+
+
+def test_failing_probe_reports_its_address_down():
+    async def run():
+        async with Responder() as responder:
+            return await sweep(['127.0.0.1', '127.0.0.2'], [responder.port], echo=Failing())
+
+    results = asyncio.run(run())
+
+    assert results == {'127.0.0.1': (None, 'icmp'), '127.0.0.2': (None, 'icmp')}
+
+
+def test_icmp_echo_of_localhost():
+    async def run():
+        try:
+            Echo(asyncio.get_running_loop(), socket.AF_INET).close()
+        except OSError as e:
+            pytest.skip(f'ICMP sockets unavailable: {str(e)}')
+
+        return await sweep(['127.0.0.1', '127.0.0.2'], [], icmp=True)
+
+    results = asyncio.run(run())
+
+    for address in ('127.0.0.1', '127.0.0.2'):
+        rtt, method = results[address]
+        assert method == 'icmp' and rtt is not None and rtt >= 0